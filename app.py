@@ -3,20 +3,23 @@
 import time
 import json
 import datetime
-import re
-import unicodedata
-from typing import Optional, Tuple, Any, Dict, List
+from typing import Optional, Tuple, Any, Dict
 
 import requests
 import streamlit as st
 import extra_streamlit_components as stx
 import pandas as pd
-import plotly.express as px
 
 # --- NEU: Shelly Client statt Aqara ---
 from shelly_client import ShellyClient 
-
-from report_generator import generate_event_pdf
+from notifier import NtfyDispatcher
+
+from report_generator import ReportJobRunner
+from downsample import downsample_m4
+from event_archive import list_events, read_events
+from event_index import EventIndex, build_event_index
+from paper_forecast import format_runout
+from printers_config import PRINTERS
 from sheets_helpers import (
     get_data,
     get_data_admin,
@@ -24,11 +27,15 @@ from sheets_helpers import (
     set_setting,
     clear_google_sheet,
     log_reset_event,
+    load_reset_events,
+    get_data_hub,
 )
 from status_logic import (
     evaluate_status,
     maybe_play_sound,
-    compute_print_stats,
+    compute_print_stats_incremental,
+    update_print_rollup,
+    update_runout_forecast,
     humanize_minutes,
     _prepare_history_df,
 )
@@ -50,34 +57,10 @@ from ui_components import (
 PAGE_TITLE = "Fotobox Drucker Status"
 PAGE_ICON = "🖨️"
 NTFY_ACTIVE_DEFAULT = True
+# Max. Punkte im Verlaufsdiagramm (~ 4 pro Bucket, Bucket ≈ 3 px bei Tablet-Breite)
+HISTORY_CHART_BUCKETS = 300
 
-PRINTERS = {
-    "die Fotobox": {
-        "key": "standard",
-        "warning_threshold": 40,
-        "default_max_prints": 400,
-        "cost_per_roll_eur": 46.59,
-        "has_admin": True,
-        # --- ÄNDERUNG: Shelly aktiv, Aqara aus ---
-        "has_shelly": True, 
-        "has_aqara": False,
-        "has_dsr": True,
-        "media_factor": 1,
-        "fotoshare_url": "https://fotoshare.co/account/login",
-    },
-    "Weinkellerei": {
-        "key": "Weinkellerei",
-        "warning_threshold": 30,
-        "default_max_prints": 200,
-        "cost_per_roll_eur": 55,
-        "has_admin": True,
-        "has_shelly": False,
-        "has_aqara": False,
-        "has_dsr": False,
-        "media_factor": 0.5,
-        "fotoshare_url": "https://weinkellerei.tirol/fame",
-    },
-}
+# Box-Konfiguration: printers_config.py (gemeinsam mit monitor.py / fleet_reports.py)
 
 # --------------------------------------------------------------------
 # LOGIN
@@ -140,40 +123,35 @@ except Exception:
     DSR_CONTROL_TOPIC = None
     DSR_ENABLED = False
 
-def _sanitize_header_value(val: str, default: str = "ntfy") -> str:
-    if not isinstance(val, str): val = str(val)
-    val = val.replace("\r", " ").replace("\n", " ")
-    val = unicodedata.normalize("NFKC", val)
-    val = re.sub(r"[\U00010000-\U0010FFFF]", "", val)
-    val = val.encode("latin-1", "ignore").decode("latin-1")
-    val = val.strip()
-    if not val: val = default
-    return val
-
-def send_ntfy_push(title: str, message: str, tags: str = "warning", priority: str = "default") -> None:
+@st.cache_resource
+def get_ntfy_dispatcher() -> NtfyDispatcher:
+    """
+    Ein Push-Dispatcher (Queue + Hintergrund-Thread) für alle Sessions.
+    """
+    return NtfyDispatcher()
+
+def send_ntfy_push(title: str, message: str, tags: str = "warning", priority: str = "default", dedup: bool = True) -> None:
     if not st.session_state.get("ntfy_active", False):
         return
     topic = st.session_state.get("ntfy_topic")
     if not topic: return
-    try:
-        headers = {
-            "Title": _sanitize_header_value(title, default="Status"),
-            "Tags": _sanitize_header_value(tags, default="info"),
-            "Priority": _sanitize_header_value(priority, default="default"),
-        }
-        requests.post(f"https://ntfy.sh/{topic}", data=message.encode("utf-8"), headers=headers, timeout=5)
-    except Exception as e:
-        st.error(f"ntfy Fehler: {e}")
+    # Nicht-blockierend: Zustellung + Retries laufen im Dispatcher-Thread
+    get_ntfy_dispatcher().enqueue(topic, message, title=title, tags=tags, priority=priority, dedup=dedup)
 
 def send_dsr_command(cmd: str) -> None:
     if not DSR_ENABLED or not DSR_CONTROL_TOPIC: return
-    try:
-        requests.post(f"https://ntfy.sh/{DSR_CONTROL_TOPIC}", data=cmd.encode("utf-8"), timeout=5)
-    except Exception: pass
+    get_ntfy_dispatcher().enqueue(DSR_CONTROL_TOPIC, cmd, dedup=False)
 
 # --------------------------------------------------------------------
 # SHELLY INIT
 # --------------------------------------------------------------------
+@st.cache_resource
+def get_shelly_client(cloud_url: str, auth_key: str, device_id: str) -> ShellyClient:
+    """
+    Ein Client (inkl. gepoolter HTTP-Session) pro Zugangsdaten, über Reruns hinweg geteilt.
+    """
+    return ShellyClient(cloud_url, auth_key, device_id)
+
 def init_shelly():
     """
     Lädt Shelly Cloud Auth Key und Device ID aus Google Sheets.
@@ -187,7 +165,7 @@ def init_shelly():
         device_id = get_setting("shelly_device_id")
         
         if auth_key and device_id:
-            return ShellyClient(cloud_url, auth_key, device_id)
+            return get_shelly_client(str(cloud_url), str(auth_key), str(device_id))
             
     except Exception as e:
         print(f"Shelly Init Fehler: {e}")
@@ -239,7 +217,7 @@ def show_live_status(media_factor: int, cost_per_roll: float, sound_enabled: boo
         maybe_play_sound(status_mode, sound_enabled)
         heartbeat_info = f" (vor {minutes_diff} Min)" if minutes_diff is not None else ""
 
-        stats = compute_print_stats(df, window_min=30, media_factor=media_factor)
+        forecast = update_runout_forecast(st.session_state.sheet_id, df, media_factor, media_remaining)
         prints_since_reset = max(0, (st.session_state.max_prints or 0) - media_remaining)
         
         forecast_str = "–"
@@ -247,13 +225,11 @@ def show_live_status(media_factor: int, cost_per_roll: float, sound_enabled: boo
         if status_mode == "error":
             forecast_str = "Gestört"
         else:
-            ppm = stats.get("ppm_window") or stats.get("ppm_overall")
-            if ppm and ppm > 0 and media_remaining > 0:
-                minutes_left = media_remaining / ppm
-                now = datetime.datetime.now()
-                end_time = now + datetime.timedelta(minutes=minutes_left)
-                forecast_str = humanize_minutes(minutes_left)
-                end_time_str = f" (bis {end_time.strftime('%H:%M')})"
+            if forecast and media_remaining > 0:
+                forecast_str = humanize_minutes(forecast.minutes_left)
+                end_time_str = f" (bis {format_runout(forecast)})"
+                if forecast.idle:
+                    end_time_str += " · Pause"
             elif media_remaining > 0:
                 forecast_str = "Warte auf Drucke..."
             else:
@@ -292,6 +268,46 @@ def show_live_status(media_factor: int, cost_per_roll: float, sound_enabled: boo
 # --------------------------------------------------------------------
 # HISTORIE VIEW
 # --------------------------------------------------------------------
+def log_data_version(df: pd.DataFrame) -> tuple:
+    """
+    Günstiger Versions-Schlüssel für ein Log: Zeilenzahl + letzter Timestamp.
+    """
+    if df.empty:
+        return (0, "")
+    return (len(df), str(df.iloc[-1].get("Timestamp", "")))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def get_history_chart_data(sheet_id: str, data_version: tuple, media_factor: float, _df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Aufbereitete + per M4 reduzierte Verlaufsdaten für das Diagramm.
+    Gecacht pro Sheet und Datenstand -> Payload zum Browser bleibt begrenzt.
+    """
+    df_hist = _prepare_history_df(_df)
+    if df_hist.empty:
+        return df_hist, 0
+
+    x = df_hist.index.values.astype("datetime64[ns]").view("int64")
+    y = df_hist["MediaRemaining"].to_numpy(dtype="float64")
+    keep = downsample_m4(x, y, HISTORY_CHART_BUCKETS)
+
+    df_chart = df_hist.iloc[keep][["MediaRemaining"]].copy()
+    df_chart["RemainingPrints"] = df_chart["MediaRemaining"] * media_factor
+    return df_chart, len(df_hist)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_event_index(
+    sheet_id: str, data_version: tuple, meta_version: tuple, media_factor: float,
+    cost_per_roll: Optional[float], package_size: Optional[int], _df: pd.DataFrame, _resets: pd.DataFrame,
+) -> EventIndex:
+    """
+    Event-Index pro Datenstand (Log + Meta). Einmal aufgebaut, danach sind alle
+    Kennzahlen pro Event reine Lookups. Nicht kopiert -> nicht verändern!
+    """
+    return build_event_index(
+        _df, _resets, media_factor=media_factor,
+        cost_per_roll=cost_per_roll, default_package_size=package_size,
+    )
+
 def show_history(media_factor: int, cost_per_roll: float) -> None:
     df = get_data_admin(st.session_state.sheet_id)
     if df.empty:
@@ -299,13 +315,14 @@ def show_history(media_factor: int, cost_per_roll: float) -> None:
         return
 
     st.subheader("Verlauf & Analyse")
-    df_hist = _prepare_history_df(df)
+    df_hist, total_rows = get_history_chart_data(
+        st.session_state.sheet_id, log_data_version(df), media_factor, df
+    )
     if df_hist.empty:
         st.info("Keine auswertbaren Daten.")
         return
 
-    df_hist = df_hist.copy()
-    df_hist["RemainingPrints"] = df_hist["MediaRemaining"] * media_factor
+    import plotly.express as px  # erst hier laden – spart Zeit beim Kaltstart
 
     fig = px.line(
         df_hist, 
@@ -323,20 +340,98 @@ def show_history(media_factor: int, cost_per_roll: float) -> None:
         yaxis=dict(rangemode="tozero")
     )
     st.plotly_chart(fig, use_container_width=True)
+    if len(df_hist) < total_rows:
+        st.caption(f"Diagramm zeigt {len(df_hist)} von {total_rows} Messpunkten (Stufen bleiben erhalten).")
 
-    stats = compute_print_stats(df, window_min=30, media_factor=media_factor)
+    stats = compute_print_stats_incremental(st.session_state.sheet_id, df, window_min=30, media_factor=media_factor)
     last_remaining = int(df_hist["RemainingPrints"].iloc[-1])
     prints_since_reset = max(0, (st.session_state.max_prints or 0) - last_remaining)
 
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Log-Einträge", len(df_hist))
+    c1.metric("Log-Einträge", total_rows)
     c2.metric("Drucke seit Reset", prints_since_reset)
     c3.metric("Ø Drucke/Std (Total)", f"{stats['ppm_overall'] * 60:.1f}" if stats['ppm_overall'] else "–")
     c4.metric("Ø Drucke/Std (30 Min)", f"{stats['ppm_window'] * 60:.1f}" if stats['ppm_window'] else "–")
 
+    # Drucke pro Stunde aus den inkrementellen Rollups (nur neue Zeilen werden verarbeitet)
+    rollup = update_print_rollup(st.session_state.sheet_id, df, media_factor)
+    hourly = rollup.hourly()
+    if not hourly.empty:
+        st.markdown("#### Drucke pro Stunde")
+        st.bar_chart(hourly.rename("Drucke"), height=220)
+        peak = rollup.peak_window(60)
+        if peak:
+            st.caption(f"Spitzenlast: {peak[0]:%d.%m. %H:%M}–{peak[1]:%H:%M} mit {peak[2]:.0f} Drucken")
+
+    resets = load_reset_events(st.session_state.sheet_id)
+    index = get_event_index(
+        st.session_state.sheet_id, log_data_version(df), log_data_version(resets), media_factor,
+        cost_per_roll, st.session_state.max_prints, df, resets,
+    )
+    current = index.current()
+    if current:
+        c5, c6, c7 = st.columns(3)
+        c5.metric("Spitze Drucke/Std", f"{current['peak_prints_per_hour']:.0f}")
+        c6.metric("Störung (Min)", f"{current['error_minutes']:.0f}")
+        c7.metric("Kosten Event", f"{current['cost']:.2f} €" if pd.notna(current["cost"]) else "–")
+
+    if len(index) > 1:
+        st.markdown("#### Events in diesem Log")
+        reason_labels = {"reset": "Reset", "roll_change": "Rollenwechsel", "start": "Log-Beginn"}
+        ev = index.events
+        st.dataframe(pd.DataFrame({
+            "Beginn": ev["start"],
+            "Grund": ev["reason"].map(reason_labels),
+            "Dauer": ev["duration_min"].map(humanize_minutes),
+            "Drucke": ev["prints"].round().astype(int),
+            "Spitze/Std": ev["peak_prints_per_hour"].round().astype(int),
+            "Störung (Min)": ev["error_minutes"].round().astype(int),
+            "Kosten (€)": ev["cost"].round(2),
+        }).iloc[::-1], use_container_width=True, hide_index=True)
+
     st.markdown("#### Rohdaten (letzte 200 Zeilen)")
     st.dataframe(df.tail(200), use_container_width=True)
 
+ARCHIVE_DAYS = 90
+
+@st.cache_data(show_spinner=False)
+def get_archive_daily_prints(printer_key: str, event_ids: tuple, media_factor: float) -> pd.Series:
+    """
+    Drucke pro Tag über alle archivierten Events (Memory-Map, keine Sheets-Reads).
+    event_ids ist nur Cache-Key: neues Event -> neu rechnen.
+    """
+    since = datetime.datetime.now() - datetime.timedelta(days=ARCHIVE_DAYS)
+    df = read_events(printer_key, since=since, columns=["Timestamp", "MediaRemaining"])
+    if df.empty:
+        return pd.Series(dtype="float64")
+    df = df.dropna(subset=["Timestamp", "MediaRemaining"]).sort_values(["event_id", "Timestamp"])
+    # Nur Abnahmen zählen (Rollenwechsel innerhalb eines Events = Sprung nach oben)
+    drops = (-df.groupby("event_id")["MediaRemaining"].diff()).clip(lower=0).fillna(0)
+    return drops.groupby(df["Timestamp"].dt.date).sum() * media_factor
+
+def show_event_archive(printer_key: str, media_factor: float) -> None:
+    events = list_events(printer_key)
+    with st.expander(f"📦 Frühere Events ({len(events)})", expanded=False):
+        if events.empty:
+            st.caption("Noch keine archivierten Events – das Log wird bei jedem Papierwechsel-Reset gesichert.")
+            return
+
+        daily = get_archive_daily_prints(printer_key, tuple(events["event_id"]), media_factor)
+        if not daily.empty:
+            st.caption(f"Drucke pro Tag (letzte {ARCHIVE_DAYS} Tage)")
+            st.bar_chart(daily)
+
+        prints = ((events["media_first"] - events["media_last"]) * media_factor).clip(lower=0)
+        table = pd.DataFrame({
+            "Beginn": events["first_ts"],
+            "Ende": events["last_ts"],
+            "Drucke": prints.round().astype("Int64"),
+            "Log-Zeilen": events["rows"],
+            "Rolle": events["package_size"],
+            "Notiz": events["note"],
+        }).iloc[::-1]
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
 
 # --------------------------------------------------------------------
 # Fragment-Funktion für Shelly Steckdosen (Multi-Device & Offline-Status)
@@ -347,22 +442,14 @@ def fetch_shelly_cached(_client, shelly_config):
     """
     Holt den Status für ALLE konfigurierten Geräte.
     """
-    combined_status = {}
-    unique_ids = {_client.default_device_id}
+    unique_ids = [_client.default_device_id]
     
     for cfg in shelly_config.values():
         if "device_id" in cfg:
-            unique_ids.add(cfg["device_id"])
-            
-    for dev_id in unique_ids:
-        try:
-            # Holt Status + Online-Info (_is_online)
-            status = _client.get_status(specific_device_id=dev_id)
-            combined_status[dev_id] = status
-        except Exception:
-            combined_status[dev_id] = {"_is_online": False}
+            unique_ids.append(cfg["device_id"])
             
-    return combined_status
+    # Doppelte IDs nur einmal, ein v2-Request für bis zu 10 Geräte (Cloud-Limit 1 Request/s pro Account)
+    return _client.get_status_many(unique_ids)
 
 @st.fragment(run_every=15)
 def render_shelly_monitor(printer_key, shelly_client, shelly_config):
@@ -450,6 +537,42 @@ def render_shelly_monitor(printer_key, shelly_client, shelly_config):
             current_idx += 1
 
 
+# --------------------------------------------------------------------
+# REPORT JOBS (PDF-Rendering im Hintergrund)
+# --------------------------------------------------------------------
+@st.cache_resource
+def get_report_runner() -> ReportJobRunner:
+    """
+    Ein Prozess-Pool für alle Sessions – mehrere Boxen können parallel rendern.
+    """
+    return ReportJobRunner()
+
+@st.fragment(run_every=1)
+def render_report_job(job_id: str, printer_key: str):
+    runner = get_report_runner()
+    job = runner.status(job_id)
+    state = job["state"]
+
+    if state in ("queued", "running"):
+        label = "In der Warteschlange…" if state == "queued" else "PDF wird erstellt…"
+        # Kein Prozent-Balken: die Renderdauer ist vorher nicht bekannt
+        st.info(f"⏳ {label} ({job['elapsed']:.0f} s)")
+    else:
+        # Fertig -> einmal komplett neu rendern, damit der Download-Button
+        # außerhalb des 1s-Fragments liegt (PDF nicht jede Sekunde neu senden)
+        st.session_state[f"report_finished_{printer_key}"] = job_id
+        st.rerun()
+
+def render_report_result(job_id: str, printer_key: str):
+    runner = get_report_runner()
+    job = runner.status(job_id)
+    if job["state"] == "done":
+        pdf_bytes = runner.result(job_id)
+        st.download_button(label="⬇️ PDF jetzt herunterladen", data=pdf_bytes, file_name=f"report_{datetime.date.today()}.pdf", mime="application/pdf", use_container_width=True, key=f"dl_btn_{printer_key}")
+        st.caption(f"Erstellt in {job['elapsed']:.1f} s")
+    elif job["state"] == "error":
+        st.error(f"Report fehlgeschlagen: {job['error']}")
+
 # --------------------------------------------------------------------
 # ADMIN PANEL (MIT SHELLY & DIAGNOSE)
 # --------------------------------------------------------------------
@@ -571,14 +694,15 @@ def render_admin_panel(printer_cfg: Dict[str, Any], warning_threshold: int, prin
                 st.info(f"Wirklich Log löschen und auf {st.session_state.get('temp_package_size')}er Rolle setzen?")
                 cy, cn = st.columns(2)
                 if cy.button("Ja, Reset ✅", use_container_width=True, key=f"btn_yes_{printer_key}", type="primary"):
-                    st.session_state.max_prints = st.session_state.temp_package_size
-                    try: set_setting("package_size", st.session_state.max_prints)
-                    except: pass
-                    clear_google_sheet()
-                    log_reset_event(st.session_state.temp_package_size, st.session_state.temp_reset_note)
-                    st.session_state.confirm_reset = False
-                    st.session_state.last_warn_status = None
-                    st.rerun()
+                    # Log wird vorher ins Event-Archiv geschrieben; nur bei Erfolg geht der Reset weiter
+                    if clear_google_sheet(printer_key, st.session_state.temp_package_size, st.session_state.temp_reset_note):
+                        st.session_state.max_prints = st.session_state.temp_package_size
+                        try: set_setting("package_size", st.session_state.max_prints)
+                        except: pass
+                        log_reset_event(st.session_state.temp_package_size, st.session_state.temp_reset_note)
+                        st.session_state.confirm_reset = False
+                        st.session_state.last_warn_status = None
+                        st.rerun()
                 if cn.button("Abbrechen", use_container_width=True, key=f"btn_no_{printer_key}"):
                     st.session_state.confirm_reset = False
                     st.rerun()
@@ -592,7 +716,7 @@ def render_admin_panel(printer_cfg: Dict[str, Any], warning_threshold: int, prin
             if st.button("PDF Bericht erstellen", use_container_width=True, key=f"btn_pdf_{printer_key}"):
                 df_rep = get_data_admin(st.session_state.sheet_id)
                 media_factor = printer_cfg.get("media_factor", 1)
-                stats = compute_print_stats(df_rep, media_factor=media_factor)
+                stats = compute_print_stats_incremental(st.session_state.sheet_id, df_rep, media_factor=media_factor)
                 last_val = 0
                 if not df_rep.empty:
                     try: last_val = int(df_rep.iloc[-1].get("MediaRemaining", 0)) * media_factor
@@ -603,8 +727,17 @@ def render_admin_panel(printer_cfg: Dict[str, Any], warning_threshold: int, prin
                 if cpr and st.session_state.max_prints:
                     c_used = prints_done * (cpr / st.session_state.max_prints)
                     cost_str = f"{c_used:.2f} EUR"
-                pdf_bytes = generate_event_pdf(df=df_rep, printer_name=st.session_state.selected_printer, stats=stats, prints_since_reset=prints_done, cost_info=cost_str, media_factor=media_factor)
-                st.download_button(label="⬇️ PDF jetzt herunterladen", data=pdf_bytes, file_name=f"report_{datetime.date.today()}.pdf", mime="application/pdf", use_container_width=True, key=f"dl_btn_{printer_key}")
+                # Neu gerendert wird nur, wenn seit dem letzten Report neue Daten kamen
+                rows, last_ts = log_data_version(df_rep)
+                cache_key = (st.session_state.sheet_id, st.session_state.selected_printer, last_ts, rows, media_factor, st.session_state.max_prints)
+                rollup = update_print_rollup(st.session_state.sheet_id, df_rep, media_factor)
+                st.session_state[f"report_job_{printer_key}"] = get_report_runner().submit(cache_key, df=df_rep, printer_name=st.session_state.selected_printer, stats=stats, prints_since_reset=prints_done, cost_info=cost_str, media_factor=media_factor, hourly_prints=rollup.hourly(), peak_window=rollup.peak_window(60))
+
+            job_id = st.session_state.get(f"report_job_{printer_key}")
+            if job_id and st.session_state.get(f"report_finished_{printer_key}") == job_id:
+                render_report_result(job_id, printer_key)
+            elif job_id:
+                render_report_job(job_id, printer_key)
 
 
 
@@ -615,11 +748,23 @@ def render_admin_panel(printer_cfg: Dict[str, Any], warning_threshold: int, prin
             st.write("")
             st.caption("Konfiguriertes Topic")
             st.code(st.session_state.ntfy_topic or "Kein Topic", language="text")
+            hub_stats = get_data_hub().stats()
+            st.caption(
+                f"Data-Hub: {hub_stats['hits']} Treffer · {hub_stats['misses']} Misses · "
+                f"{hub_stats['coalesced']} zusammengelegt · {hub_stats['errors']} Fehler"
+            )
+            push_stats = get_ntfy_dispatcher().stats()
+            latency = push_stats["avg_latency"]
+            st.caption(
+                f"Push-Queue: {push_stats['queue_depth']} wartend · {push_stats['retry_pending']} im Retry · {push_stats['sent']} gesendet · "
+                f"{push_stats['failed']} fehlgeschlagen · Ø Latenz "
+                + (f"{latency:.1f} s" if latency is not None else "–")
+            )
             
             c_test, c_sim = st.columns(2)
             with c_test:
                 if st.button("🔔 Ping senden", use_container_width=True, key=f"btn_test_push_{printer_key}"):
-                    send_ntfy_push("Test", "Test erfolgreich", tags="tada")
+                    send_ntfy_push("Test", "Test erfolgreich", tags="tada", dedup=False)
                     st.toast("Ping gesendet")
             with c_sim:
                 sim_opt = st.selectbox("Simulieren", ["Fehler", "Low Paper", "Stale"], key=f"sim_{printer_key}", label_visibility="collapsed")
@@ -643,10 +788,11 @@ def render_admin_panel(printer_cfg: Dict[str, Any], warning_threshold: int, prin
                     st.markdown(f"**Auth Key (Maskiert):** `{client.auth_key[:5]}...{client.auth_key[-5:]}`")
                     st.markdown(f"**Device ID:** `{client.device_id}`")
                     
-                    test_urls = [
+                    test_urls = list(dict.fromkeys([
+                        f"{client.base_url}/device/rpc",                 # Konfigurierter Server (oder Mock)
                         "https://shelly-api-eu.shelly.cloud/device/rpc",  # Haupt-Server
                         "https://shelly-233-eu.shelly.cloud/device/rpc"   # Dein Server (Port 443!)
-                    ]
+                    ]))
 
                     success = False
                     
@@ -703,7 +849,9 @@ def run_screensaver_loop(media_factor: int):
         try: media_remaining = int(last.get("MediaRemaining", 0)) * media_factor
         except: media_remaining = 0
         status_mode, display_text, display_color, _, _ = evaluate_status(raw_status, media_remaining, full_timestamp)
-        render_screensaver_content(status_mode=status_mode, media_remaining=media_remaining, display_text=display_text, display_color=display_color, timestamp=display_timestamp)
+        forecast = update_runout_forecast(st.session_state.sheet_id, df, media_factor, media_remaining)
+        runout_text = f"Papier reicht bis {format_runout(forecast)}" if forecast and media_remaining > 0 and status_mode != "error" else ""
+        render_screensaver_content(status_mode=status_mode, media_remaining=media_remaining, display_text=display_text, display_color=display_color, timestamp=display_timestamp, runout_text=runout_text)
         if st.button("Beenden", key="btn_exit_saver"):
             st.session_state.screensaver_mode = False
             st.rerun()
@@ -841,6 +989,7 @@ def main():
             show_live_status(media_factor, cost_per_roll, sound_enabled, event_mode=False, cloud_url=fotoshare_url)
         with tab_hist:
             show_history(media_factor, cost_per_roll)
+            show_event_archive(printer_key, media_factor)
         render_admin_panel(printer_cfg, warning_threshold, printer_key)
 
 if __name__ == "__main__":
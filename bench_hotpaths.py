@@ -0,0 +1,156 @@
+# bench_hotpaths.py
+# Benchmarks für die Daten- und Status-Hotpaths gegen synthetische Logs
+# und ein In-Process-Fake von Google Sheets (fake_gspread.py).
+#
+#   python bench_hotpaths.py                              # Standard-Suite
+#   python bench_hotpaths.py --rows 1000 1000000 --latency 0.12
+#   python bench_hotpaths.py --cases fleet --fleet 10 50 100
+#
+# Ausgabe pro Fall: Latenz-Perzentile (p50/p95/p99), Spitzen-Speicher (tracemalloc)
+# und API-Calls pro Durchlauf gegen das Fake-Sheet.
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import sheets_helpers
+from data_hub import DataHub
+from fake_gspread import FakeClient, LOG_HEADERS, make_log_rows
+from report_generator import generate_event_pdf
+from status_logic import _prepare_history_df, compute_print_stats, evaluate_status
+from status_rules import evaluate_log
+
+CASES = ["history", "stats", "status", "single", "fleet", "pdf"]
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_FLEET = [5, 20, 50]
+FLEET_LOG_ROWS = 1_000
+STATUS_CALLS = 1_000
+
+
+def _fake_backend(latency: float) -> FakeClient:
+    """
+    Leitet sheets_helpers auf ein Fake-Backend um (nur in diesem Benchmark-Prozess).
+    """
+    client = FakeClient(latency=latency)
+    sheets_helpers.get_spreadsheet = client.open_by_key
+    return client
+
+
+def _fresh_caches(keep_row_cache: bool = False) -> None:
+    hub = DataHub()
+    sheets_helpers.get_data_hub = lambda: hub
+    if not keep_row_cache:
+        with sheets_helpers._latest_row_lock:
+            sheets_helpers._latest_row_cache.clear()
+
+
+def _log_frame(rows: list) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=LOG_HEADERS)
+    df["MediaRemaining"] = pd.to_numeric(df["MediaRemaining"])
+    return df
+
+
+def run_case(fn, repeat: int, setup=None, client: FakeClient = None) -> dict:
+    """
+    repeat Durchläufe für die Latenz, danach ein eigener Lauf unter tracemalloc
+    (tracemalloc bremst stark und verfälscht sonst die Zeiten).
+    """
+    samples = []
+    calls_before = client.calls if client else 0
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    calls = (client.calls - calls_before) / repeat if client else 0
+
+    if setup: setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {"n": repeat, "p50": p50, "p95": p95, "p99": p99, "peak_mb": peak / 2**20, "calls": calls}
+
+
+def print_row(case: str, size: str, res: dict) -> None:
+    print(
+        f"{case:<32} {size:>12} {res['n']:>4} {res['p50']:>10.2f} {res['p95']:>10.2f} "
+        f"{res['p99']:>10.2f} {res['peak_mb']:>9.1f} {res['calls']:>6.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks der Daten-/Status-Hotpaths (ohne Google Sheets).")
+    parser.add_argument("--rows", nargs="*", type=int, default=DEFAULT_ROWS, help="Log-Längen")
+    parser.add_argument("--fleet", nargs="*", type=int, default=DEFAULT_FLEET, help="Flottengrößen")
+    parser.add_argument("--latency", type=float, default=0.08, help="Simulierte Latenz pro API-Call (s)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--pdf-max-rows", type=int, default=100_000, help="PDF nur bis zu dieser Log-Länge")
+    parser.add_argument("--cases", nargs="*", default=CASES, choices=CASES)
+    args = parser.parse_args()
+
+    client = _fake_backend(args.latency)
+    print(f"{'Fall':<32} {'Größe':>12} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'Peak MB':>9} {'Calls':>6}")
+
+    for n_rows in args.rows:
+        rows = make_log_rows(n_rows)
+        df = _log_frame(rows)
+        size = f"{n_rows:,} Zeilen"
+
+        if "history" in args.cases:
+            print_row("_prepare_history_df", size, run_case(lambda: _prepare_history_df(df), args.repeat))
+        if "stats" in args.cases:
+            print_row("compute_print_stats", size,
+                      run_case(lambda: compute_print_stats(df, window_min=30, media_factor=2), args.repeat))
+            print_row("evaluate_log", size, run_case(lambda: evaluate_log(df, media_factor=2), args.repeat))
+        if "single" in args.cases:
+            sheet_id = f"bench-{n_rows}"
+            client.add_sheet(sheet_id, rows)
+            single = lambda: sheets_helpers.fetch_single_status(sheet_id, "bench", 2)
+            print_row("fetch_single_status (kalt)", size,
+                      run_case(single, args.repeat, setup=_fresh_caches, client=client))
+            _fresh_caches()
+            single()
+            print_row("fetch_single_status (warm)", size,
+                      run_case(single, args.repeat, setup=lambda: _fresh_caches(keep_row_cache=True), client=client))
+        if "pdf" in args.cases and n_rows <= args.pdf_max_rows:
+            stats = compute_print_stats(df, media_factor=2)
+            pdf = lambda: generate_event_pdf(df, "Benchmark", stats, 123, "12.34 EUR", media_factor=2)
+            print_row("generate_event_pdf", size, run_case(pdf, max(1, args.repeat // 5)))
+
+    if "status" in args.cases:
+        # evaluate_status ist O(1) pro Aufruf -> viele Aufrufe über wechselnde Zeilen
+        rows = make_log_rows(STATUS_CALLS)
+        def evaluate_all():
+            for ts, media, status in rows:
+                evaluate_status(status, int(media), ts, warning_threshold=20)
+        res = run_case(evaluate_all, args.repeat)
+        for key in ("p50", "p95", "p99"):
+            res[key] /= STATUS_CALLS
+        print_row("evaluate_status (pro Aufruf)", f"{STATUS_CALLS:,} Aufr.", res)
+
+    if "fleet" in args.cases:
+        log_rows = make_log_rows(FLEET_LOG_ROWS)
+        for n_boxes in args.fleet:
+            printers, secrets = {}, {}
+            for i in range(n_boxes):
+                key = f"box{i:03d}"
+                client.add_sheet(f"fleet-{key}", log_rows)
+                printers[key] = {"key": key, "media_factor": 2, "warning_threshold": 20}
+                secrets[key] = {"sheet_id": f"fleet-{key}"}
+            fleet = lambda: sheets_helpers.get_fleet_data_parallel(printers, secrets)
+            size = f"{n_boxes} Boxen"
+            print_row("get_fleet_data_parallel (kalt)", size,
+                      run_case(fleet, args.repeat, setup=_fresh_caches, client=client))
+            _fresh_caches()
+            fleet()
+            print_row("get_fleet_data_parallel (warm)", size,
+                      run_case(fleet, args.repeat, setup=lambda: _fresh_caches(keep_row_cache=True), client=client))
+
+
+if __name__ == "__main__":
+    main()
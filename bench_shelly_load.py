@@ -0,0 +1,160 @@
+# bench_shelly_load.py
+# Lasttest für Shelly- und ntfy-Pfade gegen die lokalen Mocks (mock_servers.py).
+#
+#   python bench_shelly_load.py --devices 100 --offline 0.1 --latency 0.15 --error-rate 0.02
+#
+# Fälle:
+#   dashboard  – N parallele Sessions holen wie render_shelly_monitor / fetch_shelly_cached
+#                den Status aller Geräte (ShellyClient.get_status_many)
+#   monitor    – check_shelly_health für jede simulierte Box, parallel wie im Daemon
+#                (inkl. HOST_LIMITS["shelly"])
+#   ntfy       – Push-Durchsatz des NtfyDispatcher
+import argparse
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+
+from mock_servers import DEVICE_PREFIX, NTFY_PORT, SHELLY_PORT, start_mock_servers
+
+CASES = ["dashboard", "monitor", "ntfy"]
+
+
+def _percentiles(samples: list) -> str:
+    if not samples:
+        return "keine Messwerte"
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return f"p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  p99 {p99:8.1f} ms  max {max(samples) * 1000:8.1f} ms"
+
+
+def _run_for(duration: float, workers: int, fn) -> list:
+    """
+    Ruft fn() in `workers` Threads so oft wie möglich für `duration` Sekunden auf.
+    Liefert die Latenzen aller Aufrufe.
+    """
+    deadline = time.monotonic() + duration
+
+    def loop():
+        samples = []
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        return samples
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(loop) for _ in range(workers)]
+        return [s for f in futures for s in f.result()]
+
+
+def bench_dashboard(args, mocks, device_ids):
+    from shelly_client import ShellyClient
+
+    shelly_config = {str(i): {"device_id": d, "channel": 0} for i, d in enumerate(device_ids)}
+    client = ShellyClient(mocks["shelly_url"], "loadtest", device_ids[0])
+
+    def fetch():
+        ids = [client.default_device_id] + [c["device_id"] for c in shelly_config.values()]
+        status = client.get_status_many(ids)
+        offline = sum(1 for s in status.values() if not s.get("_is_online"))
+        return offline
+
+    offline = fetch()
+    mocks["shelly_behaviour"].reset()
+    samples = _run_for(args.duration, args.sessions, fetch)
+    reqs = mocks["shelly_behaviour"].stats()
+    print(f"dashboard  {args.sessions} Sessions × {len(device_ids)} Geräte ({offline} offline gemeldet)")
+    print(f"           Refresh: {_percentiles(samples)}")
+    print(f"           {len(samples) / args.duration:.1f} Refreshes/s, "
+          f"{reqs['requests'] / args.duration:.0f} Requests/s, {reqs['errors']} Serverfehler")
+
+
+def bench_monitor(args, mocks, device_ids):
+    import monitor
+
+    shelly_config = {"0": {"check_power": True, "standby_min": 5, "name": "Drucker"}}
+    memories = {d: {} for d in device_ids}
+
+    def check(device_id):
+        t0 = time.perf_counter()
+        with monitor.HOST_LIMITS["shelly"]:
+            monitor.check_shelly_health(
+                None, "loadtest", device_id, shelly_config, "loadtest", device_id, memories[device_id]
+            )
+        return time.perf_counter() - t0
+
+    mocks["shelly_behaviour"].reset()
+    samples = []
+    cycles = 0
+    started = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(device_ids)) as pool:
+        while time.monotonic() - started < args.duration:
+            samples.extend(pool.map(check, device_ids))
+            cycles += 1
+    elapsed = time.monotonic() - started
+    reqs = mocks["shelly_behaviour"].stats()
+    print(f"monitor    {len(device_ids)} Boxen, {cycles} Zyklen (HOST_LIMITS['shelly'] aktiv)")
+    print(f"           Check (inkl. Warten auf Limit): {_percentiles(samples)}")
+    print(f"           {len(samples) / elapsed:.1f} Checks/s, Zyklus ⌀ {elapsed / max(cycles, 1):.2f} s, "
+          f"{reqs['errors']} Serverfehler")
+    monitor.NOTIFIER.flush(timeout=30)
+
+
+def bench_ntfy(args, mocks):
+    from notifier import NtfyDispatcher
+
+    dispatcher = NtfyDispatcher(base_url=mocks["ntfy_url"], max_queue=args.messages, backoff=0.1)
+    mocks["ntfy_behaviour"].reset()
+    started = time.monotonic()
+    for i in range(args.messages):
+        dispatcher.enqueue("loadtest", f"Nachricht {i}", title="Lasttest", dedup=False)
+    dispatcher.flush(timeout=args.duration * 10)
+    elapsed = time.monotonic() - started
+    stats = dispatcher.stats()
+    avg = (stats["avg_latency"] or 0) * 1000
+    print(f"ntfy       {args.messages} Pushes in {elapsed:.1f} s ({stats['sent'] / elapsed:.1f}/s), "
+          f"gesendet {stats['sent']}, fehlgeschlagen {stats['failed']}, verworfen {stats['dropped']}")
+    print(f"           Enqueue→Zustellung ⌀ {avg:.0f} ms, max {stats['max_latency'] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest Shelly / ntfy gegen lokale Mocks.")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--offline", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Shelly Requests/s pro Account (Cloud: ~1, 0 = ohne Limit)")
+    parser.add_argument("--sessions", type=int, default=5, help="Parallele Dashboard-Sessions")
+    parser.add_argument("--duration", type=float, default=20.0, help="Sekunden pro Fall")
+    parser.add_argument("--messages", type=int, default=200, help="Pushes im ntfy-Fall")
+    parser.add_argument("--cases", nargs="*", default=CASES, choices=CASES)
+    args = parser.parse_args()
+
+    mocks = start_mock_servers(
+        devices=args.devices, offline=args.offline, latency=args.latency,
+        error_rate=args.error_rate, shelly_port=SHELLY_PORT, ntfy_port=NTFY_PORT,
+    )
+    # Vor dem Import von shelly_client / notifier / monitor setzen (werden beim Import gelesen)
+    os.environ["SHELLY_CLOUD_URL"] = mocks["shelly_url"]
+    os.environ["NTFY_BASE_URL"] = mocks["ntfy_url"]
+    os.environ["SHELLY_RATE_PER_SEC"] = str(args.rate)
+
+    device_ids = [f"{DEVICE_PREFIX}{i:03d}" for i in range(args.devices)]
+    print(f"Mocks: Shelly {mocks['shelly_url']}, ntfy {mocks['ntfy_url']} – "
+          f"Latenz {args.latency * 1000:.0f} ms, Fehlerquote {args.error_rate:.0%}, offline {args.offline:.0%}")
+
+    if "dashboard" in args.cases:
+        bench_dashboard(args, mocks, device_ids)
+    if "monitor" in args.cases:
+        bench_monitor(args, mocks, device_ids)
+    if "ntfy" in args.cases:
+        bench_ntfy(args, mocks)
+
+    for server in mocks["servers"]:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_startup.py
+# Misst die Zeit bis zum ersten fertigen Render pro Einstiegs-Ansicht.
+# Jeder Lauf startet einen frischen Python-Prozess (= Kaltstart inkl. Imports).
+#
+#   python bench_startup.py                 # alle Ansichten, je 3 Läufe
+#   python bench_startup.py --views login screensaver --repeat 5
+#
+# Benötigt .streamlit/secrets.toml (wie die App selbst).
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+VIEWS = ["login", "screensaver", "fleet", "dashboard"]
+HEAVY_MODULES = ["matplotlib", "fpdf", "plotly"]
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+RENDER_TIMEOUT = 60
+
+
+def run_view(view: str) -> dict:
+    """
+    Läuft im Kind-Prozess: rendert die Ansicht einmal mit Streamlits AppTest.
+    """
+    started = time.perf_counter()
+    import toml
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=RENDER_TIMEOUT)
+    for section, values in toml.load(SECRETS_PATH).items():
+        at.secrets[section] = values
+
+    if view != "login":
+        at.session_state["is_logged_in"] = True
+    if view == "screensaver":
+        at.session_state["screensaver_mode"] = True
+
+    at.run()
+    if view == "fleet":
+        # Die Übersicht ist nur über die Sidebar-Navigation erreichbar
+        at.sidebar.radio[0].set_value("Alle Boxen").run()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "view": view,
+        "seconds": elapsed,
+        "exceptions": [str(e.value) for e in at.exception],
+        "heavy_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def measure(view: str) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", view],
+        capture_output=True, text=True, timeout=RENDER_TIMEOUT * 2,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip()[-500:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall"] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart-Benchmark der Streamlit-App.")
+    parser.add_argument("--views", nargs="*", default=VIEWS, choices=VIEWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=VIEWS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_view(args.child)))
+        return
+
+    print(f"{'Ansicht':<12} {'Render (Median)':>16} {'Prozess (Median)':>17}  schwere Module")
+    for view in args.views:
+        runs = []
+        for _ in range(args.repeat):
+            try:
+                runs.append(measure(view))
+            except Exception as e:
+                print(f"{view:<12} Fehler: {e}")
+                break
+        if not runs:
+            continue
+        render = statistics.median(r["seconds"] for r in runs)
+        wall = statistics.median(r["wall"] for r in runs)
+        heavy = ", ".join(runs[-1]["heavy_loaded"]) or "–"
+        print(f"{view:<12} {render:>14.2f} s {wall:>15.2f} s  {heavy}")
+        for err in runs[-1]["exceptions"]:
+            print(f"{'':<12} Exception: {err}")
+
+
+if __name__ == "__main__":
+    main()
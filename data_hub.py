@@ -0,0 +1,99 @@
+# data_hub.py
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DataHub:
+    """
+    Prozessweiter Snapshot-Cache für alle Sessions / Fragmente.
+    - Pro Key hält der Hub den zuletzt veröffentlichten Wert (Snapshot).
+    - Poller (z.B. der SheetSyncWorker) veröffentlichen neue Snapshots per publish().
+    - get() lädt bei fehlendem / zu altem Snapshot nach. Gleichzeitige Misses
+      für denselben Key werden zusammengelegt (Single-Flight): nur ein Loader läuft,
+      alle anderen warten auf dessen Ergebnis.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}  # key -> (value, published_at)
+        self._inflight = {}   # key -> Future
+        self._versions = {}   # key -> Zähler, wird bei invalidate() erhöht
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def publish(self, key, value) -> None:
+        with self._lock:
+            self._snapshots[key] = (value, time.monotonic())
+
+    def touch(self, key) -> None:
+        """
+        Markiert einen unveränderten Snapshot als frisch.
+        """
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is not None:
+                self._snapshots[key] = (snap[0], time.monotonic())
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def peek(self, key, default=None):
+        """
+        Letzter Snapshot ohne Nachladen (egal wie alt).
+        """
+        with self._lock:
+            snap = self._snapshots.get(key)
+        return snap[0] if snap is not None else default
+
+    def get(self, key, loader, max_age: float):
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is not None and time.monotonic() - snap[1] <= max_age:
+                self.hits += 1
+                return snap[0]
+
+            fut = self._inflight.get(key)
+            is_leader = fut is None
+            if is_leader:
+                self.misses += 1
+                fut = Future()
+                self._inflight[key] = fut
+                version = self._versions.get(key, 0)
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return fut.result()
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            # Während des Ladens invalidiert -> Ergebnis nicht als Snapshot übernehmen
+            if self._versions.get(key, 0) == version:
+                self._snapshots[key] = (value, time.monotonic())
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "keys": len(self._snapshots),
+                "inflight": len(self._inflight),
+            }
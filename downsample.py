@@ -0,0 +1,30 @@
+# downsample.py
+# Punkt-Reduktion für Verlaufsdiagramme (Plotly im Browser bleibt flüssig).
+# Ohne Streamlit-Abhängigkeit, damit Tests und Benchmarks sie direkt nutzen können.
+import numpy as np
+
+
+def downsample_m4(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    M4-Downsampling: teilt die Zeitachse in n_buckets gleich breite Abschnitte
+    und behält pro Abschnitt den ersten, letzten, kleinsten und größten Punkt.
+    So bleiben Stufen (z.B. im Papierstand) pixelgenau erhalten.
+    Erwartet nach x sortierte Arrays, liefert sortierte Indizes.
+    """
+    n = len(x)
+    if n_buckets <= 0 or n <= 4 * n_buckets:
+        return np.arange(n)
+
+    x = x.astype("float64")
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, n_buckets - 1)
+
+    # x ist sortiert -> Buckets liegen zusammenhängend
+    bounds = np.flatnonzero(np.diff(bucket)) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, n] - 1
+
+    # Innerhalb jedes Buckets nach y sortieren: erster = Minimum, letzter = Maximum
+    order = np.lexsort((y, bucket))
+    keep = np.concatenate([starts, ends, order[starts], order[ends]])
+    return np.unique(keep)
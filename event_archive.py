@@ -0,0 +1,181 @@
+# event_archive.py
+# Archiv abgeschlossener Events: vor jedem Papierwechsel-Reset wird das Log
+# als komprimierte Arrow/Feather-Datei abgelegt (eine Datei pro Box und Event).
+# Lesen per Memory-Map, damit Auswertungen über Monate ohne Sheets-Reads laufen.
+#
+#   event_archive/<printer_key>/<event_id>.feather
+#
+import datetime
+import json
+import os
+
+import pandas as pd
+
+ARCHIVE_DIR = "event_archive"
+ARCHIVE_COMPRESSION = "lz4"  # schnell beim Lesen; "zstd" wäre etwas kleiner
+ARCHIVE_META_KEY = b"fotobox_event"
+
+
+def _safe_key(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(name)).strip("_") or "box"
+
+
+def _to_archive_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Einheitliche Spalten-Typen: Timestamp als datetime, MediaRemaining als float,
+    Status als Kategorie (wird in Arrow dictionary-kodiert -> sehr kompakt).
+    """
+    out = pd.DataFrame(index=df.index)
+    out["Timestamp"] = pd.to_datetime(df.get("Timestamp"), errors="coerce")
+    out["MediaRemaining"] = pd.to_numeric(df.get("MediaRemaining"), errors="coerce")
+    out["Status"] = df.get("Status", pd.Series("", index=df.index)).fillna("").astype(str).astype("category")
+    return out.reset_index(drop=True)
+
+
+def archive_event(
+    df: pd.DataFrame,
+    printer_key: str,
+    sheet_id: str,
+    started: dict = None,
+    reset: dict = None,
+    archive_dir: str = ARCHIVE_DIR,
+):
+    """
+    Schreibt die Log-Zeilen eines Events ins Archiv und liefert den Dateipfad
+    (None, wenn es nichts zu archivieren gibt).
+    started: letzter Meta-Eintrag (Beginn dieses Events: Timestamp, PackageSize, Note)
+    reset:   der Reset, der das Event beendet (PackageSize / Note der neuen Rolle)
+    """
+    import pyarrow as pa
+    from pyarrow import feather
+
+    if df is None or df.empty:
+        return None
+
+    frame = _to_archive_frame(df)
+    ts = frame["Timestamp"].dropna()
+    media = frame["MediaRemaining"].dropna()
+    now = datetime.datetime.now()
+    first_ts = ts.min() if not ts.empty else None
+    event_id = f"{(first_ts or now):%Y%m%dT%H%M%S}-{now:%Y%m%dT%H%M%S}"
+
+    meta = {
+        "event_id": event_id,
+        "printer_key": printer_key,
+        "sheet_id": sheet_id,
+        "rows": len(frame),
+        "first_ts": first_ts.isoformat() if first_ts is not None else None,
+        "last_ts": ts.max().isoformat() if not ts.empty else None,
+        "media_first": float(media.iloc[0]) if not media.empty else None,
+        "media_last": float(media.iloc[-1]) if not media.empty else None,
+        "archived_at": now.isoformat(timespec="seconds"),
+        "started": started or {},
+        "reset": reset or {},
+    }
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    schema_meta = dict(table.schema.metadata or {})
+    schema_meta[ARCHIVE_META_KEY] = json.dumps(meta, default=str).encode("utf-8")
+    table = table.replace_schema_metadata(schema_meta)
+
+    folder = os.path.join(archive_dir, _safe_key(printer_key))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{event_id}.feather")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression=ARCHIVE_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_meta(path: str) -> dict:
+    """
+    Liest nur Schema + Metadaten aus dem Datei-Footer (keine Spaltendaten).
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        schema = pa.ipc.open_file(source).schema
+    raw = (schema.metadata or {}).get(ARCHIVE_META_KEY)
+    return json.loads(raw) if raw else {}
+
+
+def list_events(printer_key: str = None, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    Übersicht aller archivierten Events (eine Zeile pro Datei), nach Beginn sortiert.
+    """
+    cols = ["event_id", "printer_key", "first_ts", "last_ts", "rows",
+            "media_first", "media_last", "package_size", "note", "path"]
+    if not os.path.isdir(archive_dir):
+        return pd.DataFrame(columns=cols)
+
+    folders = [_safe_key(printer_key)] if printer_key else sorted(os.listdir(archive_dir))
+    records = []
+    for folder in folders:
+        folder_path = os.path.join(archive_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for fname in sorted(os.listdir(folder_path)):
+            if not fname.endswith(".feather"):
+                continue
+            path = os.path.join(folder_path, fname)
+            try:
+                meta = _read_meta(path)
+            except Exception as e:
+                print(f"Archiv-Datei nicht lesbar ({path}): {e}")
+                continue
+            started = meta.get("started") or {}
+            records.append({
+                "event_id": meta.get("event_id", fname[:-8]),
+                "printer_key": meta.get("printer_key", folder),
+                "first_ts": meta.get("first_ts"),
+                "last_ts": meta.get("last_ts"),
+                "rows": meta.get("rows", 0),
+                "media_first": meta.get("media_first"),
+                "media_last": meta.get("media_last"),
+                "package_size": started.get("PackageSize"),
+                "note": started.get("Note", ""),
+                "path": path,
+            })
+
+    events = pd.DataFrame(records, columns=cols)
+    events["first_ts"] = pd.to_datetime(events["first_ts"], errors="coerce")
+    events["last_ts"] = pd.to_datetime(events["last_ts"], errors="coerce")
+    return events.sort_values("first_ts", ignore_index=True)
+
+
+def read_events(
+    printer_key: str = None,
+    since=None,
+    until=None,
+    columns: list = None,
+    archive_dir: str = ARCHIVE_DIR,
+) -> pd.DataFrame:
+    """
+    Liest archivierte Log-Zeilen (optional nur Events im Zeitraum since..until
+    und nur ausgewählte Spalten). Dateien außerhalb des Zeitraums werden anhand
+    der Footer-Metadaten übersprungen, ohne sie zu lesen.
+    """
+    from pyarrow import feather
+
+    events = list_events(printer_key, archive_dir)
+    if since is not None:
+        events = events[events["last_ts"] >= pd.Timestamp(since)]
+    if until is not None:
+        events = events[events["first_ts"] <= pd.Timestamp(until)]
+    if events.empty:
+        return pd.DataFrame(columns=(columns or ["Timestamp", "MediaRemaining", "Status"]) + ["event_id"])
+
+    frames = []
+    for event_id, path in zip(events["event_id"], events["path"]):
+        part = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+        part["event_id"] = event_id
+        frames.append(part)
+
+    # Status-Kategorien unterscheiden sich pro Event -> pandas vereinheitlicht beim concat
+    df = pd.concat(frames, ignore_index=True)
+    if "Timestamp" in df.columns:
+        if since is not None:
+            df = df[df["Timestamp"] >= pd.Timestamp(since)]
+        if until is not None:
+            df = df[df["Timestamp"] <= pd.Timestamp(until)]
+    return df.reset_index(drop=True)
@@ -0,0 +1,166 @@
+# event_index.py
+# Zerlegt ein Drucker-Log in Events und berechnet die Kennzahlen pro Event einmalig.
+# Event-Grenzen: Resets aus dem Meta-Sheet (log_reset_event) und Rollenwechsel ohne
+# Reset (MediaRemaining springt nach oben). Ohne Streamlit-Abhängigkeit (wie status_rules).
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from print_events import drop_glitches
+from status_rules import HEARTBEAT_WARN_MINUTES, classify_series
+
+# Anstieg von MediaRemaining (Rohwert), ab dem ein Rollenwechsel angenommen wird
+ROLL_JUMP_MIN = 20
+
+EVENT_COLUMNS = [
+    "start", "end", "reason", "rows", "prints", "duration_min",
+    "peak_prints_per_hour", "error_minutes", "media_first", "media_last",
+    "package_size", "note", "cost",
+]
+
+
+class EventIndex:
+    """
+    Ergebnis von build_event_index: eine Zeile pro Event in `events`
+    (Index = Event-Nummer, 0 = ältestes) und die Event-Nummer jeder Log-Zeile.
+    Abfragen pro Event sind reine Dict-Lookups.
+    """
+
+    def __init__(self, events: pd.DataFrame, row_event: np.ndarray):
+        self.events = events
+        self.row_event = row_event
+        self._records = events.to_dict("index")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self, event_no: int) -> Optional[dict]:
+        if event_no < 0:
+            event_no += len(self._records)
+        return self._records.get(event_no)
+
+    def current(self) -> Optional[dict]:
+        """
+        Kennzahlen des laufenden (jüngsten) Events.
+        """
+        return self.stats(-1) if self._records else None
+
+
+def _prepare_log(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "Timestamp" not in df.columns or "MediaRemaining" not in df.columns:
+        return pd.DataFrame(columns=["Timestamp", "MediaRemaining", "Status"])
+    out = pd.DataFrame({
+        "Timestamp": pd.to_datetime(df["Timestamp"], errors="coerce"),
+        "MediaRemaining": pd.to_numeric(df["MediaRemaining"], errors="coerce"),
+        "Status": df["Status"] if "Status" in df.columns else "",
+    })
+    out = out.dropna(subset=["Timestamp", "MediaRemaining"])
+    return out.sort_values("Timestamp", kind="stable", ignore_index=True)
+
+
+def build_event_index(
+    df: pd.DataFrame,
+    resets: Optional[pd.DataFrame] = None,
+    media_factor: float = 1,
+    cost_per_roll: Optional[float] = None,
+    default_package_size: Optional[int] = None,
+    jump_min: float = ROLL_JUMP_MIN,
+) -> EventIndex:
+    """
+    Segmentiert das Log in einem Durchlauf (vektorisiert) und aggregiert pro Event:
+    Drucke, Dauer, Spitzen-Drucke/Std (gleitende 60 Min), Störungsminuten, Kosten.
+    resets: Meta-Sheet als DataFrame (Timestamp, PackageSize, Note).
+    """
+    log = _prepare_log(df)
+    # Offline-Werte (-1) und einzelne Ausreißer vor dem Differenzieren entfernen,
+    # sonst entstehen Schein-Drucke und Schein-Rollenwechsel
+    if not log.empty:
+        log = log[drop_glitches(log["MediaRemaining"].to_numpy(dtype="float64"))].reset_index(drop=True)
+    if log.empty:
+        return EventIndex(pd.DataFrame(columns=EVENT_COLUMNS), np.array([], dtype=np.int64))
+
+    ts = log["Timestamp"]
+    media = log["MediaRemaining"].to_numpy(dtype="float64")
+
+    # Resets aus dem Meta-Sheet: Anzahl Resets vor jeder Zeile
+    if resets is not None and not resets.empty and "Timestamp" in resets.columns:
+        resets = resets.assign(Timestamp=pd.to_datetime(resets["Timestamp"], errors="coerce"))
+        resets = resets.dropna(subset=["Timestamp"]).sort_values("Timestamp", ignore_index=True)
+    else:
+        resets = pd.DataFrame(columns=["Timestamp", "PackageSize", "Note"])
+    reset_no = np.searchsorted(resets["Timestamp"].to_numpy(dtype="datetime64[ns]"),
+                               ts.to_numpy(dtype="datetime64[ns]"), side="right")
+
+    # Neue Events: nach einem Reset oder bei einem Sprung nach oben (Rollenwechsel)
+    media_diff = np.diff(media, prepend=media[0])
+    by_reset = np.r_[True, reset_no[1:] != reset_no[:-1]]
+    by_jump = media_diff >= jump_min
+    new_event = by_reset | by_jump
+    row_event = np.cumsum(new_event) - 1
+
+    # Drucke = Abnahmen von MediaRemaining innerhalb eines Events
+    prints = np.where(new_event, 0.0, np.clip(-media_diff, 0, None)) * media_factor
+
+    # Störungsminuten: Zeit bis zur nächsten Zeile, solange der Status "error" ist
+    # (gekappt auf den Heartbeat, damit Nachtpausen nicht mitzählen)
+    gap_min = (ts.shift(-1) - ts).dt.total_seconds().to_numpy() / 60.0
+    ends_event = np.r_[row_event[1:] != row_event[:-1], True]
+    gap_min = np.where(ends_event, 0.0, np.nan_to_num(gap_min))
+    gap_min = np.minimum(gap_min, HEARTBEAT_WARN_MINUTES)
+    is_error = classify_series(log["Status"].astype(str)) == "error"
+    error_min = np.where(is_error, gap_min, 0.0)
+
+    rows = pd.DataFrame({
+        "event": row_event, "Timestamp": ts, "media": media,
+        "prints": prints, "error_min": error_min,
+    })
+    grouped = rows.groupby("event", sort=True)
+    events = pd.DataFrame({
+        "start": grouped["Timestamp"].min(),
+        "end": grouped["Timestamp"].max(),
+        "rows": grouped.size(),
+        "prints": grouped["prints"].sum(),
+        "error_minutes": grouped["error_min"].sum(),
+        "media_first": grouped["media"].first(),
+        "media_last": grouped["media"].last(),
+    })
+    events["duration_min"] = (events["end"] - events["start"]).dt.total_seconds() / 60.0
+
+    # Spitze: höchste Druckanzahl in einem gleitenden 60-Minuten-Fenster
+    rolling = (
+        pd.Series(prints, index=ts.to_numpy())
+        .groupby(row_event)
+        .rolling("60min")
+        .sum()
+    )
+    events["peak_prints_per_hour"] = rolling.groupby(level=0).max()
+
+    # Grund + Paketgröße / Notiz aus dem Reset, mit dem das Event begann
+    first_rows = np.flatnonzero(new_event)
+    first_reset = reset_no[first_rows]
+    after_reset = np.r_[reset_no[0] > 0, reset_no[1:] != reset_no[:-1]]
+    events["reason"] = np.where(
+        after_reset[first_rows], "reset",
+        np.where(by_jump[first_rows], "roll_change", "start"),
+    )
+    sizes = resets["PackageSize"] if "PackageSize" in resets.columns else pd.Series(dtype="object")
+    notes = resets["Note"] if "Note" in resets.columns else pd.Series(dtype="object")
+    sizes = pd.to_numeric(sizes, errors="coerce").to_numpy()
+    reset_idx = first_reset - 1
+    has_reset = (reset_idx >= 0) & (reset_idx < len(sizes))
+    pkg = np.full(len(first_rows), np.nan)
+    pkg[has_reset] = sizes[reset_idx[has_reset]]
+    if default_package_size:
+        pkg = np.where(np.isnan(pkg), default_package_size, pkg)
+    events["package_size"] = pkg
+    note_vals = notes.fillna("").astype(str).to_numpy()
+    events["note"] = [note_vals[i] if ok else "" for i, ok in zip(reset_idx, has_reset)]
+
+    events["cost"] = np.nan
+    if cost_per_roll:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            events["cost"] = np.where(pkg > 0, events["prints"] * cost_per_roll / pkg, np.nan)
+
+    events = events[EVENT_COLUMNS].reset_index(drop=True)
+    return EventIndex(events, row_event)
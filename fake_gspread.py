@@ -0,0 +1,190 @@
+# fake_gspread.py
+# In-Process-Nachbau der von uns genutzten gspread-API (Client / Spreadsheet / Worksheet)
+# für Benchmarks und lokale Experimente – ganz ohne Google Sheets.
+# Jeder API-Call schläft `latency` Sekunden, um die Netzwerk-Roundtrips zu simulieren.
+import datetime
+import random
+import re
+import threading
+import time
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import numericise_all
+
+LOG_HEADERS = ["Timestamp", "MediaRemaining", "Status"]
+
+_A1_RE = re.compile(r"^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+
+def _col_index(letters: str) -> int:
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - ord("A") + 1)
+    return idx - 1
+
+
+def make_log_rows(n_rows: int, start=None, interval_s: float = 30.0, media_start: int = 700, seed: int = 1) -> list:
+    """
+    Synthetisches Drucker-Log (ohne Header) wie es der Fotobox-Client schreibt:
+    Timestamp als Text, MediaRemaining fällt beim Drucken, gelegentlich Störungen.
+    """
+    rnd = random.Random(seed)
+    ts = start or datetime.datetime(2025, 6, 14, 14, 0, 0)
+    step = datetime.timedelta(seconds=interval_s)
+    media = media_start
+    rows = []
+    for _ in range(n_rows):
+        r = rnd.random()
+        if r < 0.35 and media > 0:
+            media -= 1
+            status = "Printing"
+        elif r < 0.37:
+            status = "Paper Jam"
+        elif r < 0.38:
+            status = "Cover Open"
+        else:
+            status = "Idle"
+        if media == 0:
+            media = media_start  # Rollenwechsel
+        rows.append([ts.strftime("%Y-%m-%d %H:%M:%S"), str(media), status])
+        ts += step
+    return rows
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title: str, values: list):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self._values = [list(r) for r in values]
+        self._lock = threading.Lock()
+
+    def _call(self):
+        self.spreadsheet.client.record_call()
+
+    def _range(self, a1: str) -> list:
+        m = _A1_RE.match(a1.split("!")[-1])
+        if not m:
+            raise ValueError(f"Bereich nicht unterstützt: {a1}")
+        c1, r1, c2, r2 = m.groups()
+        c2 = c2 or c1
+        row_start = int(r1) - 1 if r1 else 0
+        if m.group(3) is None:
+            row_end = row_start + 1 if r1 else len(self._values)
+        else:
+            row_end = int(r2) if r2 else len(self._values)
+        col_start, col_end = _col_index(c1), _col_index(c2) + 1
+        out = []
+        for row in self._values[row_start:row_end]:
+            cells = row[col_start:col_end]
+            while cells and cells[-1] == "":
+                cells.pop()
+            out.append(cells)
+        # Wie die echte API: leere Zeilen am Ende werden weggelassen
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def get_values(self, range_name: str = None) -> list:
+        self._call()
+        with self._lock:
+            return self._range(range_name) if range_name else [list(r) for r in self._values]
+
+    def batch_get(self, ranges: list) -> list:
+        self._call()
+        with self._lock:
+            return [self._range(r) for r in ranges]
+
+    def col_values(self, col: int) -> list:
+        self._call()
+        with self._lock:
+            vals = [row[col - 1] if len(row) >= col else "" for row in self._values]
+        while vals and vals[-1] == "":
+            vals.pop()
+        return vals
+
+    def get_all_records(self) -> list:
+        self._call()
+        with self._lock:
+            if not self._values:
+                return []
+            headers = self._values[0]
+            return [dict(zip(headers, numericise_all(list(r)))) for r in self._values[1:]]
+
+    def append_row(self, values: list, **kwargs) -> None:
+        self._call()
+        with self._lock:
+            self._values.append([str(v) for v in values])
+
+    def append_rows(self, values: list, **kwargs) -> None:
+        self._call()
+        with self._lock:
+            self._values.extend([str(v) for v in row] for row in values)
+
+    def update(self, range_name: str, values: list, **kwargs) -> None:
+        self._call()
+        m = _A1_RE.match(range_name)
+        row = int(m.group(2)) - 1
+        with self._lock:
+            while len(self._values) <= row:
+                self._values.append([])
+            self._values[row] = [str(v) for v in values[0]]
+
+    def batch_clear(self, ranges: list) -> None:
+        self._call()
+        with self._lock:
+            # Wir löschen nur ganze Log-Bereiche ab Zeile n (z.B. "A2:Z10000")
+            for a1 in ranges:
+                m = _A1_RE.match(a1)
+                start = int(m.group(2)) - 1 if m and m.group(2) else 0
+                del self._values[start:]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, sheet_id: str, log_rows: list):
+        self.client = client
+        self.id = sheet_id
+        self._worksheets = {"Log": FakeWorksheet(self, "Log", [LOG_HEADERS] + log_rows)}
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return next(iter(self._worksheets.values()))
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client.record_call()
+        try:
+            return self._worksheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title: str, rows: int = 100, cols: int = 10) -> FakeWorksheet:
+        ws = FakeWorksheet(self, title, [])
+        self._worksheets[title] = ws
+        return ws
+
+
+class FakeClient:
+    """
+    Ersatz für gspread.Client. Sheets werden per add_sheet() angelegt,
+    open_by_key() liefert sie wie die echte API.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._sheets = {}
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_sheet(self, sheet_id: str, log_rows: list) -> FakeSpreadsheet:
+        sh = FakeSpreadsheet(self, sheet_id, log_rows)
+        self._sheets[sheet_id] = sh
+        return sh
+
+    def open_by_key(self, sheet_id: str) -> FakeSpreadsheet:
+        self.record_call()
+        return self._sheets[sheet_id]
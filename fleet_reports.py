@@ -0,0 +1,150 @@
+# fleet_reports.py
+# Erstellt die Event-Reports für ALLE Boxen auf einmal (z.B. nach einem Wochenende).
+#
+#   python fleet_reports.py --out reports --summary
+#
+import argparse
+import concurrent.futures
+import datetime
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+from monitor import load_secrets, get_gspread_client, get_printer_settings_full, get_worksheet
+from report_generator import generate_event_pdf, generate_fleet_summary_pdf
+from print_events import PrintRollup
+from printers_config import PRINTERS
+from status_logic import compute_print_stats
+
+FETCH_WORKERS = 8
+
+
+def fetch_printer_log(gc, name, cfg, p_sec):
+    """Liest Log + Settings EINER Box (je Sheet genau ein Log-Read)."""
+    sheet_id = p_sec.get("sheet_id")
+    if not sheet_id:
+        return None
+    settings = get_printer_settings_full(gc, sheet_id)
+    ws = get_worksheet(gc, sheet_id)  # Spreadsheet-Handle aus dem Settings-Read wiederverwenden
+    df = pd.DataFrame(ws.get_all_records())
+    max_prints = settings.get("package_size") or cfg.get("default_max_prints", 0)
+    return {"name": name, "cfg": cfg, "df": df, "max_prints": max_prints}
+
+
+def build_report_job(job):
+    """Berechnet Kennzahlen + PDF-Parameter wie im Admin-Panel der App."""
+    df = job["df"]
+    cfg = job["cfg"]
+    media_factor = cfg.get("media_factor", 1)
+    max_prints = job["max_prints"] or 0
+
+    stats = compute_print_stats(df, media_factor=media_factor)
+    last_val = 0
+    if not df.empty:
+        try: last_val = int(df.iloc[-1].get("MediaRemaining", 0)) * media_factor
+        except Exception: pass
+    prints_done = max(0, max_prints - last_val)
+
+    cost_str = "N/A"
+    cpr = cfg.get("cost_per_roll_eur")
+    if cpr and max_prints:
+        cost_str = f"{prints_done * (cpr / max_prints):.2f} EUR"
+
+    rollup = PrintRollup(media_factor=media_factor)
+    rollup.update(df)
+
+    pdf_kwargs = {
+        "df": df,
+        "printer_name": job["name"],
+        "stats": stats,
+        "prints_since_reset": prints_done,
+        "cost_info": cost_str,
+        "media_factor": media_factor,
+        "hourly_prints": rollup.hourly(),
+        "peak_window": rollup.peak_window(60),
+    }
+    summary = {
+        "printer_name": job["name"],
+        "prints": prints_done,
+        "duration_min": stats.get("duration_min", 0),
+        "ppm": stats.get("ppm_overall"),
+        "cost_info": cost_str,
+        "log_rows": len(df),
+    }
+    return pdf_kwargs, summary
+
+
+def _safe_filename(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name).strip("_") or "box"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-Reports für alle Fotoboxen erstellen.")
+    parser.add_argument("--out", default="reports", help="Zielordner für die PDFs")
+    parser.add_argument("--summary", action="store_true", help="Zusätzlich eine Flotten-Übersicht erzeugen")
+    parser.add_argument("--printers", nargs="*", help="Nur diese Boxen (Name wie in PRINTERS)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Render-Prozesse")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    secrets = load_secrets()
+    gc = get_gspread_client(secrets)  # ein Client für alle Boxen
+    printer_secrets = secrets.get("printers", {})
+    selected = {n: c for n, c in PRINTERS.items() if not args.printers or n in args.printers}
+
+    os.makedirs(args.out, exist_ok=True)
+    date_str = datetime.date.today().isoformat()
+    summaries = {}
+
+    render_workers = args.workers or min(len(selected), os.cpu_count() or 1) or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool, \
+         concurrent.futures.ProcessPoolExecutor(
+             max_workers=render_workers, mp_context=multiprocessing.get_context("spawn")
+         ) as render_pool:
+
+        fetches = {
+            fetch_pool.submit(fetch_printer_log, gc, name, cfg, printer_secrets.get(cfg["key"], {})): name
+            for name, cfg in selected.items()
+        }
+
+        # Sobald ein Sheet geladen ist, startet dessen Rendering -> Wall-Time ≈ langsamste Box
+        renders = {}
+        for fut in concurrent.futures.as_completed(fetches):
+            name = fetches[fut]
+            try:
+                job = fut.result()
+            except Exception as e:
+                print(f"[{name}] Laden fehlgeschlagen: {e}")
+                continue
+            if job is None:
+                print(f"[{name}] Keine sheet_id – übersprungen.")
+                continue
+            pdf_kwargs, summaries[name] = build_report_job(job)
+            renders[render_pool.submit(generate_event_pdf, **pdf_kwargs)] = name
+
+        for fut in concurrent.futures.as_completed(renders):
+            name = renders[fut]
+            try:
+                pdf_bytes = fut.result()
+            except Exception as e:
+                print(f"[{name}] Report fehlgeschlagen: {e}")
+                continue
+            path = os.path.join(args.out, f"report_{_safe_filename(name)}_{date_str}.pdf")
+            with open(path, "wb") as f:
+                f.write(pdf_bytes)
+            print(f"[{name}] Report gespeichert: {path}")
+
+    if args.summary and summaries:
+        rows = [summaries[n] for n in selected if n in summaries]
+        path = os.path.join(args.out, f"fleet_summary_{date_str}.pdf")
+        with open(path, "wb") as f:
+            f.write(generate_fleet_summary_pdf(rows))
+        print(f"Flotten-Übersicht gespeichert: {path}")
+
+    print(f"Fertig in {time.monotonic() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# http_session.py
+# Gemeinsame requests-Session-Fabrik für Shelly-Client, Monitor und ntfy-Dispatcher.
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def build_session(pool_size: int = 10, retries: int = 2, backoff: float = 0.5) -> requests.Session:
+    """
+    Session mit Keep-Alive + Connection-Pool.
+    Wiederholt bei 429 / 5xx mit exponentiellem Backoff und hält sich an Retry-After
+    (z.B. Shelly Cloud: ca. 1 Request/Sekunde pro Account). retries=0 -> der
+    Aufrufer wiederholt selbst (NtfyDispatcher).
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,459 @@
+# ingest_server.py
+# Direkter Eingang für Statuszeilen der Fotobox – Alternative zum Sheets-Polling.
+#
+#   POST /ingest   {"printer": "standard", "rows": [{"Timestamp": "2025-06-14 21:03:11",
+#                   "MediaRemaining": 312, "Status": "Printing"}]}
+#                  Header "X-Ingest-Token: <token>" (Secrets: [ingest] token)
+#   GET  /events?after=<seq>&wait=<s>   Long-Poll für Dashboards (siehe IngestFeed)
+#   GET  /_stats
+#
+# Jede Zeile landet sofort im lokalen Puffer (IngestOutbox), geht ohne Umweg an die
+# Abonnenten (Alarm-Prüfung im Monitor, Long-Poll der Dashboards) und wird gesammelt
+# per append_rows ins Google Sheet weitergeleitet (bleibt also kompatibel).
+#
+# Läuft im Monitor-Prozess ([ingest] port in den Secrets) oder eigenständig:
+#   python ingest_server.py --port 8090
+# Standard ist 127.0.0.1. Für den Logger im LAN [ingest] host = "0.0.0.0" setzen –
+# das geht nur zusammen mit [ingest] token.
+import argparse
+import contextlib
+import datetime
+import hmac
+import ipaddress
+import json
+import math
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local_store import LOG_COLUMNS, IngestOutbox
+from status_rules import LOCAL_TZ
+
+INGEST_HOST = "127.0.0.1"  # andere Adressen nur mit Token (siehe start_ingest_server)
+INGEST_PORT = 8090
+FORWARD_INTERVAL = 5       # Sekunden zwischen zwei append_rows-Batches
+FORWARD_BATCH = 200        # voller Batch -> sofort weiterleiten
+FORWARD_MAX_BACKOFF = 300  # nach Sheets-Fehlern höchstens so lange warten
+MAX_ROWS_PER_REQUEST = 500
+MAX_BODY_BYTES = 1 << 20
+EVENTS_MAX_WAIT = 30       # Long-Poll: max. Wartezeit pro Request
+PRUNE_INTERVAL = 3600
+
+
+def _now_str() -> str:
+    return datetime.datetime.now(LOCAL_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def normalize_row(row: dict) -> dict:
+    """
+    Eingelieferte Zeile auf die Log-Spalten bringen. Fehlt der Timestamp,
+    gilt der Empfangszeitpunkt. Ungültige Zeilen -> ValueError.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Zeile muss ein Objekt sein")
+    try:
+        media = float(row.get("MediaRemaining"))
+    except (TypeError, ValueError):
+        media = math.nan
+    # inf / NaN (json.loads akzeptiert "Infinity" / "NaN") -> 400 statt OverflowError
+    if not math.isfinite(media):
+        raise ValueError(f"MediaRemaining ungültig: {row.get('MediaRemaining')!r}")
+    media = int(media)
+    return {
+        "Timestamp": str(row.get("Timestamp") or _now_str()),
+        "MediaRemaining": media,
+        "Status": str(row.get("Status") or ""),
+    }
+
+
+class IngestService:
+    """
+    Kern des Ingest-Servers (ohne HTTP): speichern, verteilen, weiterleiten.
+    printers: printer_key -> sheet_id (nur bekannte Boxen werden angenommen)
+    worksheet_getter(sheet_id): Worksheet zum Weiterleiten (None = nur lokal)
+    sheets_limit: optionaler Semaphore für Sheets-Requests (monitor.HOST_LIMITS)
+    """
+
+    def __init__(
+        self,
+        printers: dict,
+        worksheet_getter=None,
+        outbox: IngestOutbox = None,
+        token: str = None,
+        forward_interval: float = FORWARD_INTERVAL,
+        forward_batch: int = FORWARD_BATCH,
+        sheets_limit=None,
+    ):
+        self.printers = dict(printers)
+        self.worksheet_getter = worksheet_getter
+        self.outbox = outbox or IngestOutbox()
+        self.token = token or None
+        self.forward_interval = forward_interval
+        self.forward_batch = forward_batch
+        self.sheets_limit = sheets_limit or contextlib.nullcontext()
+
+        self._subscribers = []
+        self._dispatch_queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._last_seq = self.outbox.last_seq()
+        self._forward_wakeup = threading.Event()
+        self._headers = {}  # sheet_id -> Kopfzeile des Sheets
+        self._started = False
+        self._lock = threading.Lock()
+
+        self.received = 0
+        self.rejected = 0
+        self.forwarded = 0
+        self.forward_errors = 0
+        self.last_forward_error = None
+
+    # ------------------------------------------------------------------
+    # Eingang
+    # ------------------------------------------------------------------
+    def check_token(self, token) -> bool:
+        if not self.token:
+            return True
+        return bool(token) and hmac.compare_digest(str(token), self.token)
+
+    def subscribe(self, callback) -> None:
+        """
+        callback(printer_key, sheet_id, rows) – läuft im Verteiler-Thread,
+        rows ist die Liste der neuen Zeilen einer Box (älteste zuerst).
+        """
+        self._subscribers.append(callback)
+
+    def ingest(self, printer_key: str, rows: list) -> list:
+        """
+        Nimmt Zeilen einer Box an. Liefert die gespeicherten Zeilen inkl. seq.
+        Unbekannte Box / ungültige Zeilen -> KeyError / ValueError (nichts gespeichert).
+        """
+        sheet_id = self.printers.get(printer_key)
+        if not sheet_id:
+            self.rejected += 1
+            raise KeyError(printer_key)
+        if len(rows) > MAX_ROWS_PER_REQUEST:
+            self.rejected += 1
+            raise ValueError(f"Max. {MAX_ROWS_PER_REQUEST} Zeilen pro Request")
+        try:
+            records = [normalize_row(r) for r in rows]
+        except ValueError:
+            self.rejected += 1
+            raise
+        if not records:
+            return []
+
+        stored = self.outbox.add(sheet_id, printer_key, records)
+        with self._cond:
+            self._last_seq = max(self._last_seq, stored[-1]["seq"])
+            self._cond.notify_all()
+        self.received += len(stored)
+
+        self._dispatch_queue.put((printer_key, sheet_id, stored))
+        if self.outbox.counts()["pending"] >= self.forward_batch:
+            self._forward_wakeup.set()
+        return stored
+
+    def wait_events(self, after: int, timeout: float = EVENTS_MAX_WAIT):
+        """
+        Long-Poll: wartet bis zu timeout Sekunden auf Zeilen mit seq > after.
+        after < 0 -> nur die aktuelle seq (Einstiegspunkt für neue Leser).
+        """
+        with self._cond:
+            if after >= 0 and self._last_seq <= after:
+                self._cond.wait_for(lambda: self._last_seq > after, timeout=timeout)
+            last_seq = self._last_seq
+        if after < 0 or after > last_seq:
+            # Neuer Leser oder Puffer wurde neu angelegt -> ab jetzt lesen
+            return last_seq, []
+        return last_seq, self.outbox.since(after)
+
+    # ------------------------------------------------------------------
+    # Verteilen + Weiterleiten (Hintergrund-Threads)
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._dispatch_loop, name="ingest-dispatch", daemon=True).start()
+        threading.Thread(target=self._forward_loop, name="ingest-forward", daemon=True).start()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            printer_key, sheet_id, rows = self._dispatch_queue.get()
+            for callback in list(self._subscribers):
+                try:
+                    callback(printer_key, sheet_id, rows)
+                except Exception as e:
+                    print(f"Ingest Abonnent Fehler ({printer_key}): {e}")
+
+    def _sheet_headers(self, ws, sheet_id: str) -> list:
+        headers = self._headers.get(sheet_id)
+        if headers is None:
+            first = ws.get_values("A1:Z1")
+            headers = list(first[0]) if first else []
+            while headers and not headers[-1]:
+                headers.pop()
+            headers = headers or list(LOG_COLUMNS)
+            self._headers[sheet_id] = headers
+        return headers
+
+    def forward_now(self) -> int:
+        """
+        Leitet alle offenen Zeilen weiter (ein append_rows pro Sheet).
+        Schlägt ein Sheet fehl, bleiben dessen Zeilen offen (Reihenfolge bleibt erhalten).
+        """
+        if self.worksheet_getter is None:
+            return 0
+        pending = self.outbox.pending()
+        by_sheet = {}
+        for rec in pending:
+            by_sheet.setdefault(rec["sheet_id"], []).append(rec)
+
+        done = 0
+        for sheet_id, recs in by_sheet.items():
+            try:
+                with self.sheets_limit:
+                    ws = self.worksheet_getter(sheet_id)
+                    headers = self._sheet_headers(ws, sheet_id)
+                    values = [[rec.get(h, "") for h in headers] for rec in recs]
+                    # RAW: Status-Text nie als Formel auswerten, Timestamp nicht umformatieren
+                    # (local_store.append_records gleicht Zeilen über den Text ab)
+                    ws.append_rows(values, value_input_option="RAW")
+            except Exception as e:
+                self._headers.pop(sheet_id, None)
+                self.forward_errors += 1
+                self.last_forward_error = f"{sheet_id}: {e}"
+                print(f"Ingest Weiterleitung fehlgeschlagen ({sheet_id}): {e}")
+                continue
+            self.outbox.mark_forwarded([rec["seq"] for rec in recs])
+            done += len(recs)
+
+        self.forwarded += done
+        return done
+
+    def _forward_loop(self) -> None:
+        failures = 0
+        last_prune = time.monotonic()
+        while True:
+            wait = min(self.forward_interval * (2 ** failures), FORWARD_MAX_BACKOFF)
+            self._forward_wakeup.wait(timeout=wait)
+            self._forward_wakeup.clear()
+            errors_before = self.forward_errors
+            try:
+                self.forward_now()
+            except Exception as e:
+                self.forward_errors += 1
+                print(f"Ingest Weiterleitung Fehler: {e}")
+            failures = min(failures + 1, 10) if self.forward_errors > errors_before else 0
+            if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                last_prune = time.monotonic()
+                try:
+                    self.outbox.prune()
+                except Exception as e:
+                    print(f"Ingest Aufräumen fehlgeschlagen: {e}")
+
+    def stats(self) -> dict:
+        counts = self.outbox.counts()
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "forwarded": self.forwarded,
+            "pending": counts["pending"],
+            "forward_errors": self.forward_errors,
+            "last_forward_error": self.last_forward_error,
+            "last_seq": self._last_seq,
+            "dispatch_queue": self._dispatch_queue.qsize(),
+        }
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    service: IngestService = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Kein Request-Log auf stderr (Logger sendet im Sekundentakt)
+
+    def _send_json(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if self.service.check_token(self.headers.get("X-Ingest-Token")):
+            return True
+        self._send_json(401, {"ok": False, "error": "unauthorized"})
+        return False
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if not self._authorized():
+            return
+        if url.path == "/_stats":
+            self._send_json(200, self.service.stats())
+        elif url.path == "/events":
+            query = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+            try:
+                after = int(query.get("after", -1))
+                wait = min(float(query.get("wait", 0)), EVENTS_MAX_WAIT)
+            except ValueError:
+                self._send_json(400, {"ok": False, "error": "after / wait ungültig"})
+                return
+            last_seq, rows = self.service.wait_events(after, timeout=wait)
+            self._send_json(200, {"ok": True, "last_seq": last_seq, "rows": rows})
+        else:
+            self._send_json(404, {"ok": False, "error": "not found"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"ok": False, "error": "Content-Length ungültig"})
+            self.close_connection = True
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"ok": False, "error": "body too large"})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length) if length else b""
+        if not self._authorized():
+            return
+        if urllib.parse.urlsplit(self.path).path != "/ingest":
+            self._send_json(404, {"ok": False, "error": "not found"})
+            return
+
+        try:
+            payload = json.loads(body or b"{}")
+            rows = payload.get("rows")
+            if rows is None:
+                rows = [payload.get("row") or {k: payload.get(k) for k in LOG_COLUMNS}]
+            stored = self.service.ingest(str(payload.get("printer", "")), rows)
+        except KeyError as e:
+            self._send_json(404, {"ok": False, "error": f"unbekannte Box: {e}"})
+            return
+        except (ValueError, AttributeError, TypeError) as e:
+            self._send_json(400, {"ok": False, "error": str(e)})
+            return
+        self._send_json(200, {"ok": True, "stored": len(stored),
+                              "last_seq": stored[-1]["seq"] if stored else None})
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def start_ingest_server(service: IngestService, host: str = INGEST_HOST, port: int = INGEST_PORT) -> ThreadingHTTPServer:
+    """
+    Startet Service-Threads und HTTP-Server im Hintergrund (Port 0 = freier Port).
+    Ohne Token nur auf Loopback – sonst könnte jeder im Netz ins Sheet schreiben
+    und Pushes auslösen.
+    """
+    if not service.token and not is_loopback(host):
+        raise ValueError(f"Ingest-Server auf {host} nur mit [ingest] token")
+    service.start()
+    handler = type("IngestHandler", (IngestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"ingest-{port}", daemon=True).start()
+    return server
+
+
+class IngestFeed:
+    """
+    Leser-Seite für Dashboards: hängt per Long-Poll an GET /events und ruft
+    on_rows(sheet_id, records) für jede neue Zeilengruppe auf.
+    """
+
+    def __init__(self, url: str, token: str = None, on_rows=None, wait: float = 25, retry: float = 5):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.on_rows = on_rows
+        self.wait = wait
+        self.retry = retry
+        self.after = -1
+        self.errors = 0
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ingest-feed", daemon=True)
+        self._thread.start()
+
+    def poll(self) -> int:
+        """
+        Ein Long-Poll-Durchlauf. Liefert die Anzahl neuer Zeilen.
+        """
+        query = urllib.parse.urlencode({"after": self.after, "wait": self.wait})
+        req = urllib.request.Request(f"{self.url}/events?{query}")
+        if self.token:
+            req.add_header("X-Ingest-Token", self.token)
+        with urllib.request.urlopen(req, timeout=self.wait + 10) as resp:
+            payload = json.loads(resp.read())
+
+        rows = payload.get("rows") or []
+        by_sheet = {}
+        for row in rows:
+            by_sheet.setdefault(row["sheet_id"], []).append({c: row.get(c) for c in LOG_COLUMNS})
+        if self.on_rows:
+            for sheet_id, records in by_sheet.items():
+                self.on_rows(sheet_id, records)
+        self.after = rows[-1]["seq"] if rows else payload.get("last_seq", self.after)
+        return len(rows)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                print(f"Ingest Feed Fehler: {e}")
+                time.sleep(self.retry)
+
+
+def main():
+    from monitor import HOST_LIMITS, get_gspread_client, get_worksheet, load_secrets
+
+    parser = argparse.ArgumentParser(description="Ingest-Server für Fotobox-Statuszeilen.")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--no-forward", action="store_true", help="Nicht ins Google Sheet weiterleiten")
+    args = parser.parse_args()
+
+    secrets = load_secrets()
+    cfg = secrets.get("ingest", {})
+    printers = {k: p["sheet_id"] for k, p in secrets.get("printers", {}).items() if p.get("sheet_id")}
+    getter = None
+    if not args.no_forward:
+        gc = get_gspread_client(secrets)
+        getter = lambda sheet_id: get_worksheet(gc, sheet_id)
+
+    service = IngestService(printers, worksheet_getter=getter, token=cfg.get("token"),
+                            sheets_limit=HOST_LIMITS["sheets"])
+    host = args.host or cfg.get("host", INGEST_HOST)
+    port = args.port or cfg.get("port", INGEST_PORT)
+    server = start_ingest_server(service, host, port)
+    print(f"Ingest-Server auf {host}:{server.server_address[1]} – Boxen: {', '.join(printers) or 'keine'}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.forward_now()
+
+
+if __name__ == "__main__":
+    main()
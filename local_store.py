@@ -0,0 +1,391 @@
+# local_store.py
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+# Lokale Kopie des Drucker-Logs (Google Sheets bleibt die Quelle)
+LOCAL_DB_PATH = "fotobox_log.sqlite3"
+
+# Wie oft der Sync-Worker neue Zeilen aus den Sheets holt
+SYNC_INTERVAL = 10
+# Sheets ohne Leser so lange weiter synchronisieren, dann pausieren (wie FLEET_IDLE_SECONDS)
+SYNC_IDLE_SECONDS = 300
+
+LOG_COLUMNS = ["Timestamp", "MediaRemaining", "Status"]
+
+# Eingangspuffer des Ingest-Servers (eigene Datei, läuft meist im Monitor-Prozess)
+INGEST_DB_PATH = "fotobox_ingest.sqlite3"
+INGEST_KEEP_ROWS = 50000
+
+
+class LocalLogStore:
+    """
+    SQLite-Spiegel der Log-Zeilen (Timestamp / MediaRemaining / Status) pro Sheet.
+    Persistente Kopie für Neustarts / Sheets-Ausfälle; im laufenden Betrieb lesen
+    die Ansichten den Frame im Speicher (SheetSyncWorker.frame). Weitere Spalten
+    des Sheets landen als JSON in "extra", damit read_log() wie früher
+    get_all_records() alle Spalten liefert.
+    """
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS log (
+                    sheet_id TEXT NOT NULL,
+                    row_no INTEGER NOT NULL,
+                    ts TEXT,
+                    ts_epoch REAL,
+                    media_remaining NUMERIC,
+                    status TEXT,
+                    extra TEXT,
+                    PRIMARY KEY (sheet_id, row_no)
+                )
+                """
+            )
+            columns = [r[1] for r in self._conn.execute("PRAGMA table_info(log)")]
+            if "extra" not in columns:
+                self._conn.execute("ALTER TABLE log ADD COLUMN extra TEXT")
+            # Index der früheren Zeitfenster-Abfragen: ohne Leser nur Schreibaufwand
+            self._conn.execute("DROP INDEX IF EXISTS idx_log_ts")
+
+    @staticmethod
+    def _rows_from_frame(sheet_id: str, df: pd.DataFrame, start_row: int) -> list:
+        part = df.iloc[start_row:]
+        if part.empty:
+            return []
+        cols = {c: part[c] if c in part.columns else pd.Series("", index=part.index) for c in LOG_COLUMNS}
+        ts_parsed = pd.to_datetime(cols["Timestamp"], errors="coerce")
+        epochs = [t.timestamp() if pd.notna(t) else None for t in ts_parsed]
+        extra_cols = [c for c in part.columns if c not in LOG_COLUMNS]
+        if extra_cols:
+            extras = [json.dumps(rec, default=str) for rec in part[extra_cols].to_dict("records")]
+        else:
+            extras = [None] * len(part)
+        return [
+            (sheet_id, start_row + i, str(ts), epoch, media, str(status), extra)
+            for i, (ts, epoch, media, status, extra) in enumerate(
+                zip(cols["Timestamp"], epochs, cols["MediaRemaining"], cols["Status"], extras)
+            )
+        ]
+
+    def append_frame(self, sheet_id: str, df: pd.DataFrame, start_row: int) -> int:
+        """
+        Schreibt die Zeilen ab start_row (0-basiert, ohne Header) in den Spiegel.
+        """
+        rows = self._rows_from_frame(sheet_id, df, start_row)
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO log VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def replace_frame(self, sheet_id: str, df: pd.DataFrame) -> int:
+        """
+        Ersetzt den kompletten Spiegel eines Sheets (nach Reset / Neuaufbau).
+        """
+        rows = self._rows_from_frame(sheet_id, df, 0)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM log WHERE sheet_id = ?", (sheet_id,))
+            self._conn.executemany(
+                "INSERT INTO log VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def read_log(self, sheet_id: str) -> pd.DataFrame:
+        """
+        Komplettes Log in Sheet-Reihenfolge mit allen Spalten (wie früher get_all_records()).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, media_remaining, status, extra FROM log WHERE sheet_id = ? ORDER BY row_no",
+                (sheet_id,),
+            ).fetchall()
+        df = pd.DataFrame([r[:3] for r in rows], columns=LOG_COLUMNS)
+        if any(r[3] for r in rows):
+            extra = pd.DataFrame([json.loads(r[3]) if r[3] else {} for r in rows])
+            df = pd.concat([df, extra], axis=1)
+        return df
+
+    def append_records(self, sheet_id: str, records: list) -> list:
+        """
+        Hängt direkt eingelieferte Zeilen (Dicts, siehe ingest_server) hinten an.
+        Die Zeilennummern entsprechen denen, die das Weiterleiten ins Sheet ergibt,
+        der spätere Sheet-Sync überschreibt sie also mit identischem Inhalt.
+        Liefert die tatsächlich neu angehängten Records.
+        """
+        if not records:
+            return []
+        new_rows = self._rows_from_frame(sheet_id, pd.DataFrame(records), 0)
+        with self._lock, self._conn:
+            # Zeilen, die der Sheet-Sync schon gespiegelt hat, nicht doppelt anhängen
+            marks = ",".join("?" * len(new_rows))
+            known = {
+                ts for (ts,) in self._conn.execute(
+                    f"SELECT ts FROM log WHERE sheet_id = ? AND ts IN ({marks})",
+                    (sheet_id, *[r[2] for r in new_rows]),
+                )
+            }
+            (next_row,) = self._conn.execute(
+                "SELECT COALESCE(MAX(row_no) + 1, 0) FROM log WHERE sheet_id = ?", (sheet_id,)
+            ).fetchone()
+            fresh = [i for i, r in enumerate(new_rows) if r[2] not in known]
+            rows = [
+                (sid, next_row + n, ts, epoch, media, status, extra)
+                for n, (sid, _, ts, epoch, media, status, extra) in enumerate(new_rows[i] for i in fresh)
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO log VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return [records[i] for i in fresh]
+
+
+class IngestOutbox:
+    """
+    Eingangspuffer des Ingest-Servers: jede eingelieferte Zeile bekommt eine
+    fortlaufende seq (Reihenfolge für Dashboards) und bleibt als "offen" markiert,
+    bis sie ins Google Sheet weitergeleitet wurde. Überlebt Neustarts.
+    """
+
+    def __init__(self, path: str = INGEST_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sheet_id TEXT NOT NULL,
+                    printer_key TEXT,
+                    ts TEXT,
+                    media_remaining NUMERIC,
+                    status TEXT,
+                    received_at REAL,
+                    forwarded INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingest_open ON ingest (forwarded, seq)"
+            )
+
+    def add(self, sheet_id: str, printer_key: str, records: list) -> list:
+        """
+        Speichert Zeilen (Dicts mit LOG_COLUMNS) und liefert sie mit seq zurück.
+        """
+        now = time.time()
+        out = []
+        with self._lock, self._conn:
+            for rec in records:
+                cur = self._conn.execute(
+                    "INSERT INTO ingest (sheet_id, printer_key, ts, media_remaining, status, received_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (sheet_id, printer_key, rec["Timestamp"], rec["MediaRemaining"], rec["Status"], now),
+                )
+                out.append({"seq": cur.lastrowid, "sheet_id": sheet_id, "printer_key": printer_key, **rec})
+        return out
+
+    def _select(self, sql: str, params: tuple) -> list:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"seq": seq, "sheet_id": sid, "printer_key": key,
+             "Timestamp": ts, "MediaRemaining": media, "Status": status}
+            for seq, sid, key, ts, media, status in rows
+        ]
+
+    def pending(self, limit: int = 500) -> list:
+        """
+        Noch nicht ins Sheet weitergeleitete Zeilen (älteste zuerst).
+        """
+        return self._select(
+            "SELECT seq, sheet_id, printer_key, ts, media_remaining, status FROM ingest "
+            "WHERE forwarded = 0 ORDER BY seq LIMIT ?",
+            (limit,),
+        )
+
+    def since(self, after_seq: int, limit: int = 1000) -> list:
+        return self._select(
+            "SELECT seq, sheet_id, printer_key, ts, media_remaining, status FROM ingest "
+            "WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit),
+        )
+
+    def mark_forwarded(self, seqs: list) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE ingest SET forwarded = 1 WHERE seq = ?", [(s,) for s in seqs])
+
+    def last_seq(self) -> int:
+        with self._lock:
+            (seq,) = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ingest").fetchone()
+        return seq
+
+    def counts(self) -> dict:
+        with self._lock:
+            total, open_rows = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(forwarded = 0), 0) FROM ingest"
+            ).fetchone()
+        return {"rows": total, "pending": open_rows}
+
+    def prune(self, keep_rows: int = INGEST_KEEP_ROWS) -> int:
+        """
+        Löscht alte, bereits weitergeleitete Zeilen (das Sheet hat sie ja).
+        """
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "DELETE FROM ingest WHERE forwarded = 1 AND seq <= "
+                "(SELECT COALESCE(MAX(seq), 0) FROM ingest) - ?",
+                (keep_rows,),
+            )
+        return cur.rowcount
+
+
+class SheetSyncWorker:
+    """
+    Hintergrund-Thread, der registrierte Sheets regelmäßig über ihren
+    SheetTailReader liest und neue Zeilen in den LocalLogStore schreibt.
+    Parallel wird pro Sheet der aktuelle Log-Frame im Speicher gehalten und nur
+    um neue Zeilen verlängert (frame()), statt ihn aus SQLite neu aufzubauen.
+    """
+
+    def __init__(self, store: LocalLogStore, interval: float = SYNC_INTERVAL, on_synced=None):
+        self.store = store
+        self.interval = interval
+        self.on_synced = on_synced  # Callback(sheet_id, changed, frame) nach jedem Sync
+        self._readers = {}
+        self._synced = {}  # sheet_id -> (generation, Anzahl gespiegelter Zeilen)
+        self._frames = {}  # sheet_id -> aktueller Log-Frame (geteilt, nicht in-place ändern!)
+        self._ingested = {}  # sheet_id -> Timestamps direkt eingelieferter Zeilen, die im Sheet noch fehlen
+        self._last_read = {}  # sheet_id -> monotonic() des letzten Lesezugriffs
+        self.idle_seconds = SYNC_IDLE_SECONDS
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+
+    def register(self, sheet_id: str, reader) -> None:
+        with self._lock:
+            self._readers.setdefault(sheet_id, reader)
+            self._last_read[sheet_id] = time.monotonic()
+            self.start()
+
+    def mark_read(self, sheet_id: str) -> None:
+        """
+        Vermerkt einen Lesezugriff (auch Data-Hub-Treffer), damit das Sheet aktiv bleibt.
+        """
+        with self._lock:
+            if sheet_id in self._readers:
+                self._last_read[sheet_id] = time.monotonic()
+
+    def _expire_idle(self) -> list:
+        """
+        Sheets ohne Leser seit idle_seconds abmelden (spart Sheets-Quota).
+        Beim nächsten Lesen registriert read_local_log sie neu und spiegelt einmal komplett.
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = [sid for sid in self._readers if now - self._last_read.get(sid, 0) > self.idle_seconds]
+            for sid in idle:
+                self._readers.pop(sid, None)
+                self._last_read.pop(sid, None)
+            active = list(self._readers)
+        with self._sync_lock:
+            for sid in idle:
+                self._synced.pop(sid, None)
+                self._frames.pop(sid, None)
+                self._ingested.pop(sid, None)
+        return active
+
+    def frame(self, sheet_id: str):
+        """
+        Aktueller Log-Frame eines Sheets oder None (noch nie synchronisiert).
+        """
+        return self._frames.get(sheet_id)
+
+    def _extend_frame(self, sheet_id: str, frame: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        # Zeilen, die schon per Ingest im Frame stehen, nicht doppelt anhängen
+        pending = self._ingested.get(sheet_id)
+        if pending:
+            ts = new["Timestamp"].astype(str) if "Timestamp" in new.columns else pd.Series("", index=new.index)
+            dup = ts.isin(pending)
+            pending.difference_update(ts[dup])
+            new = new[~dup]
+        if new.empty:
+            return frame
+        return pd.concat([frame, new], ignore_index=True)
+
+    def sync_now(self, sheet_id: str) -> None:
+        """
+        Holt neue Zeilen für ein Sheet und spiegelt sie lokal.
+        """
+        reader = self._readers.get(sheet_id)
+        if reader is None:
+            return
+        with self._sync_lock:
+            df = reader.read()
+            generation = reader.generation
+            prev_gen, prev_count = self._synced.get(sheet_id, (None, 0))
+
+            frame = self._frames.get(sheet_id)
+
+            changed = True
+            if prev_gen != generation or len(df) < prev_count or frame is None:
+                self.store.replace_frame(sheet_id, df)
+                self._ingested.pop(sheet_id, None)
+                frame = df
+            elif len(df) > prev_count:
+                self.store.append_frame(sheet_id, df, prev_count)
+                if self._ingested.get(sheet_id):
+                    frame = self._extend_frame(sheet_id, frame, df.iloc[prev_count:])
+                else:
+                    frame = df  # Der Reader hat schon inkrementell verlängert
+            else:
+                changed = False
+            self._synced[sheet_id] = (generation, len(df))
+            self._frames[sheet_id] = frame
+
+        if self.on_synced:
+            self.on_synced(sheet_id, changed, frame)
+
+    def apply_ingested(self, sheet_id: str, records: list) -> bool:
+        """
+        Direkt eingelieferte Zeilen (IngestFeed) sofort spiegeln, ohne auf den
+        nächsten Sheet-Sync zu warten. Nur für Sheets, die schon einmal komplett
+        gespiegelt wurden – sonst bestünde der Spiegel nur aus den neuen Zeilen.
+        """
+        with self._sync_lock:
+            if sheet_id not in self._synced:
+                return False
+            added = self.store.append_records(sheet_id, records)
+            if added:
+                self._ingested.setdefault(sheet_id, set()).update(str(r.get("Timestamp", "")) for r in added)
+                frame = pd.concat([self._frames[sheet_id], pd.DataFrame(added)], ignore_index=True)
+                self._frames[sheet_id] = frame
+
+        if added and self.on_synced:
+            self.on_synced(sheet_id, True, frame)
+        return bool(added)
+
+    def start(self) -> None:
+        # Aufruf unter self._lock (siehe register)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="sheet-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            sheet_ids = self._expire_idle()
+            for sheet_id in sheet_ids:
+                try:
+                    self.sync_now(sheet_id)
+                except Exception as e:
+                    print(f"Sync Fehler ({sheet_id}): {e}")
+            time.sleep(self.interval)
@@ -0,0 +1,322 @@
+# mock_servers.py
+# Lokale Stand-ins für Shelly Cloud und ntfy – für Lasttests ohne echte Geräte / Cloud.
+#
+#   python mock_servers.py --devices 100 --offline 0.1 --latency 0.15 --error-rate 0.02
+#
+# Danach App / Monitor auf die Mocks umbiegen:
+#   SHELLY_CLOUD_URL=http://127.0.0.1:8081 NTFY_BASE_URL=http://127.0.0.1:8082 python monitor.py
+#
+# Shelly: POST /device/status, /device/relay/control, /device/rpc (Form-API)
+#         POST /v2/devices/api/get?auth_key=… (JSON {"ids": [...]}, max. 10 Geräte pro Request)
+#         POST /jrpc (JSON-RPC "Shelly.Call", wie monitor.check_shelly_health)
+# ntfy:   POST /<topic>
+# Beide:  GET /_stats (Zähler als JSON), POST /_reset
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SHELLY_PORT = 8081
+NTFY_PORT = 8082
+DEVICE_PREFIX = "shelly-"
+SWITCHES_PER_DEVICE = 4
+V2_MAX_IDS = 10
+
+
+class MockBehaviour:
+    """
+    Gemeinsame Stellschrauben: Latenz (mit Jitter), Fehlerquote, Zähler.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.by_path = {}
+
+    def begin(self, path: str) -> bool:
+        """
+        Zählt den Request, schläft die simulierte Latenz und entscheidet,
+        ob er mit einem Serverfehler beantwortet wird.
+        """
+        with self._lock:
+            self.requests += 1
+            self.by_path[path] = self.by_path.get(path, 0) + 1
+            delay = self.latency * (1 + self._rnd.uniform(-self.jitter, self.jitter))
+            fail = self._rnd.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return not fail
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "by_path": dict(self.by_path)}
+
+
+class ShellyFleet:
+    """
+    Simulierte Steckdosen: device_id -> {"online": bool, "switches": {channel: {...}}}.
+    """
+
+    def __init__(self, n_devices: int, offline_ratio: float = 0.0, seed: int = 1, auth_key: str = None):
+        rnd = random.Random(seed)
+        self.auth_key = auth_key
+        self._lock = threading.Lock()
+        n_offline = int(round(n_devices * offline_ratio))
+        offline = set(rnd.sample(range(n_devices), n_offline))
+        self.devices = {}
+        for i in range(n_devices):
+            switches = {
+                ch: {"id": ch, "output": rnd.random() < 0.7, "apower": round(rnd.uniform(0, 120), 1)}
+                for ch in range(SWITCHES_PER_DEVICE)
+            }
+            self.devices[f"{DEVICE_PREFIX}{i:03d}"] = {"online": i not in offline, "switches": switches}
+
+    def status(self, device_id: str):
+        with self._lock:
+            dev = self.devices.get(device_id)
+            if dev is None:
+                return None
+            device_status = {f"switch:{ch}": dict(sw) for ch, sw in dev["switches"].items()}
+            device_status["sys"] = {"uptime": int(time.monotonic())}
+            return {"online": dev["online"], "device_status": device_status}
+
+    def set_switch(self, device_id: str, channel: int, turn_on: bool) -> bool:
+        with self._lock:
+            dev = self.devices.get(device_id)
+            if dev is None or not dev["online"] or channel not in dev["switches"]:
+                return False
+            dev["switches"][channel]["output"] = turn_on
+            if not turn_on:
+                dev["switches"][channel]["apower"] = 0.0
+            return True
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    behaviour: MockBehaviour = None
+    protocol_version = "HTTP/1.1"  # Keep-Alive wie bei der echten Cloud
+
+    def log_message(self, format, *args):
+        pass  # Kein Request-Log auf stderr (verfälscht Lasttests)
+
+    def _send_json(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            self._send_json(200, self.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self._read_body()
+        parts = urlsplit(self.path)
+        self.route = parts.path
+        self.query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if self.route == "/_reset":
+            self.behaviour.reset()
+            self._send_json(200, {"ok": True})
+            return
+        if not self.behaviour.begin(self.route):
+            self._send_json(503, {"error": "simulated failure"})
+            return
+        self.handle_post(body)
+
+    def stats(self) -> dict:
+        return self.behaviour.stats()
+
+    def handle_post(self, body: bytes) -> None:
+        raise NotImplementedError
+
+
+class ShellyCloudHandler(_MockHandler):
+    fleet: ShellyFleet = None
+
+    def _auth_ok(self, key) -> bool:
+        return self.fleet.auth_key is None or key == self.fleet.auth_key
+
+    def handle_post(self, body: bytes) -> None:
+        if self.route == "/jrpc":
+            self._handle_jrpc(body)
+            return
+        if self.route == "/v2/devices/api/get":
+            self._handle_v2_get(body)
+            return
+
+        form = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+        if not self._auth_ok(form.get("auth_key")):
+            self._send_json(401, {"isok": False, "errors": {"wrong_auth_key": "Invalid auth key"}})
+            return
+
+        device_id = form.get("id", "")
+        if self.route in ("/device/status", "/device/rpc"):
+            status = self.fleet.status(device_id)
+            if status is None:
+                self._send_json(200, {"isok": False, "errors": {"device_not_found": device_id}})
+            else:
+                self._send_json(200, {"isok": True, "data": status})
+        elif self.route == "/device/relay/control":
+            ok = self.fleet.set_switch(device_id, int(form.get("channel", 0)), form.get("turn") == "on")
+            if ok:
+                self._send_json(200, {"isok": True, "data": {"device_id": device_id}})
+            else:
+                self._send_json(200, {"isok": False, "errors": {"device_offline": device_id}})
+        else:
+            self._send_json(404, {"isok": False, "errors": {"not_found": self.route}})
+
+    def _handle_v2_get(self, body: bytes) -> None:
+        # Wie die Cloud-API v2: Liste pro gefundenem Gerät, unbekannte IDs fehlen einfach
+        if not self._auth_ok(self.query.get("auth_key")):
+            self._send_json(401, {"error": "wrong_auth_key"})
+            return
+        try:
+            ids = json.loads(body or b"{}").get("ids") or []
+        except (ValueError, AttributeError):
+            self._send_json(400, {"error": "invalid json"})
+            return
+        if not isinstance(ids, list) or len(ids) > V2_MAX_IDS:
+            self._send_json(400, {"error": f"ids: list with max. {V2_MAX_IDS} entries"})
+            return
+
+        devices = []
+        for device_id in ids:
+            status = self.fleet.status(str(device_id))
+            if status is not None:
+                devices.append({
+                    "id": device_id, "type": "relay", "gen": "G2",
+                    "online": 1 if status["online"] else 0, "status": status["device_status"],
+                })
+        self._send_json(200, devices)
+
+    def _handle_jrpc(self, body: bytes) -> None:
+        try:
+            req = json.loads(body or b"{}")
+            params = req.get("params", {})
+        except ValueError:
+            self._send_json(400, {"error": {"code": -32700, "message": "Parse error"}})
+            return
+
+        rpc_id = req.get("id")
+        if not self._auth_ok(params.get("auth")):
+            self._send_json(200, {"id": rpc_id, "error": {"code": 401, "message": "Unauthorized"}})
+            return
+
+        status = self.fleet.status(params.get("id", ""))
+        if status is None:
+            self._send_json(200, {"id": rpc_id, "error": {"code": 404, "message": "Device not found"}})
+        elif not status["online"]:
+            self._send_json(200, {"id": rpc_id, "error": {"code": -114, "message": "Device offline"}})
+        else:
+            self._send_json(200, {"id": rpc_id, "result": {"data": status["device_status"]}})
+
+
+class NtfyHandler(_MockHandler):
+    messages = None  # topic -> Liste der (Zeitpunkt, Titel, Text)
+    messages_lock = None
+
+    def handle_post(self, body: bytes) -> None:
+        topic = self.path.strip("/")
+        if not topic or "/" in topic:
+            self._send_json(404, {"error": "invalid topic"})
+            return
+        now = time.time()
+        with self.messages_lock:
+            self.messages.setdefault(topic, []).append((now, self.headers.get("Title"), body.decode("utf-8", "replace")))
+        self._send_json(200, {"id": f"{now:.6f}", "time": int(now), "event": "message", "topic": topic})
+
+    def stats(self) -> dict:
+        res = super().stats()
+        with self.messages_lock:
+            res["topics"] = {t: len(msgs) for t, msgs in self.messages.items()}
+        return res
+
+
+def _serve(handler_cls, port: int, **attrs) -> ThreadingHTTPServer:
+    handler = type(handler_cls.__name__, (handler_cls,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"mock-{port}", daemon=True).start()
+    return server
+
+
+def start_mock_servers(
+    devices: int = 100,
+    offline: float = 0.0,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    shelly_port: int = SHELLY_PORT,
+    ntfy_port: int = NTFY_PORT,
+    auth_key: str = None,
+    seed: int = 1,
+) -> dict:
+    """
+    Startet beide Mocks im Hintergrund (Port 0 = freier Port).
+    Liefert URLs, Server und Zustände für Lasttests im selben Prozess.
+    """
+    fleet = ShellyFleet(devices, offline_ratio=offline, seed=seed, auth_key=auth_key)
+    shelly_behaviour = MockBehaviour(latency=latency, error_rate=error_rate, seed=seed)
+    ntfy_behaviour = MockBehaviour(latency=latency, error_rate=error_rate, seed=seed + 1)
+
+    shelly = _serve(ShellyCloudHandler, shelly_port, behaviour=shelly_behaviour, fleet=fleet)
+    ntfy = _serve(NtfyHandler, ntfy_port, behaviour=ntfy_behaviour,
+                  messages={}, messages_lock=threading.Lock())
+    return {
+        "shelly_url": f"http://127.0.0.1:{shelly.server_address[1]}",
+        "ntfy_url": f"http://127.0.0.1:{ntfy.server_address[1]}",
+        "servers": [shelly, ntfy],
+        "fleet": fleet,
+        "shelly_behaviour": shelly_behaviour,
+        "ntfy_behaviour": ntfy_behaviour,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock-Server für Shelly Cloud und ntfy.")
+    parser.add_argument("--devices", type=int, default=100, help="Anzahl simulierter Shelly-Geräte")
+    parser.add_argument("--offline", type=float, default=0.0, help="Anteil offline (0..1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Antwortzeit in Sekunden (±50%% Jitter)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil HTTP 503 (0..1)")
+    parser.add_argument("--shelly-port", type=int, default=SHELLY_PORT)
+    parser.add_argument("--ntfy-port", type=int, default=NTFY_PORT)
+    parser.add_argument("--auth-key", default=None, help="Nur diesen Auth-Key akzeptieren")
+    args = parser.parse_args()
+
+    mocks = start_mock_servers(
+        devices=args.devices, offline=args.offline, latency=args.latency,
+        error_rate=args.error_rate, shelly_port=args.shelly_port,
+        ntfy_port=args.ntfy_port, auth_key=args.auth_key,
+    )
+    print(f"Shelly Mock: {mocks['shelly_url']}  ({args.devices} Geräte, IDs {DEVICE_PREFIX}000…)")
+    print(f"ntfy Mock:   {mocks['ntfy_url']}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in mocks["servers"]:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,47 @@
 # monitor.py
+import asyncio
+import concurrent.futures
+import threading
 import time
 import datetime
 import toml
-import requests
 import json
 import gspread
 from google.oauth2.service_account import Credentials
 
+import pandas as pd
+
+from http_session import build_session
+from ingest_server import INGEST_HOST, INGEST_PORT, IngestService, start_ingest_server
+from notifier import NtfyDispatcher
+from paper_forecast import RunoutForecaster, format_runout, runout_alert
+from printers_config import PRINTERS
+from shelly_client import account_limiter, jrpc_url
+from status_rules import DAEMON_PUSH_POLICY, PushState, classify_status, derive_status, next_push
+
 # --- KONFIGURATION ---
 SECRETS_PATH = ".streamlit/secrets.toml"
-CHECK_INTERVAL = 60  # Alle 60 Sekunden prüfen
-
-PRINTERS = {
-    "die Fotobox": {
-        "key": "standard",
-        "warning_threshold": 40,
-        "media_factor": 1,
-    },
-    "Weinkellerei": {
-        "key": "Weinkellerei",
-        "warning_threshold": 30,
-        "media_factor": 0.5,
-    },
+CHECK_INTERVAL = 60  # Alle 60 Sekunden prüfen (pro Box über "check_interval" änderbar)
+PRINTER_TIMEOUT = 45  # Max. Dauer eines Checks, bevor die Box als "hängt" gilt
+START_STAGGER_SECONDS = 1.0
+SETTINGS_REFRESH_SECONDS = 300  # Settings-Sheet nur alle 5 Minuten neu lesen
+STATS_LOG_SECONDS = 600  # Push-Queue Statistik ins Log schreiben
+
+# Papier-Prognose pro Box, wird bei jedem Check mit der letzten Zeile gefüttert
+FORECASTERS = {}
+FORECASTERS_LOCK = threading.Lock()
+
+# Polling und Ingest-Server werten dieselben Boxen aus -> Push-Zustand seriell fortschreiben
+ALERT_LOCK = threading.Lock()
+
+# Push-Regeln (Zustände, 30 Min Cooldown, Erholung) kommen aus status_rules.DAEMON_PUSH_POLICY.
+# "stale" (kein Heartbeat seit HEARTBEAT_WARN_MINUTES) nur mit Opt-in pro Box:
+# printers_config.PRINTERS[...]["alert_stale"] = True – sonst würde jede ruhende Box alle 30 Min pushen.
+
+# Max. gleichzeitige Requests pro Ziel-Host (Quota / Rate-Limits schonen)
+HOST_LIMITS = {
+    "sheets": threading.BoundedSemaphore(4),
+    "shelly": threading.BoundedSemaphore(2),
 }
 
 def load_secrets():
@@ -35,37 +55,84 @@ def get_gspread_client(secrets):
     creds = Credentials.from_service_account_info(creds_info, scopes=scopes)
     return gspread.authorize(creds)
 
+# Pushes laufen über eine Queue im Hintergrund -> ein langsames ntfy.sh bremst keinen Check
+NOTIFIER = NtfyDispatcher()
+
 def send_ntfy(topic, title, message, tags="warning"):
-    """Sendet eine Push-Benachrichtigung via ntfy.sh."""
+    """Reiht eine Push-Benachrichtigung via ntfy.sh ein (nicht-blockierend)."""
     if not topic: return
-    try:
-        headers = {
-            "Title": title.encode("latin-1", "ignore").decode("latin-1"),
-            "Tags": tags,
-            "Priority": "high" if tags == "rotating_light" else "default"
-        }
-        requests.post(f"https://ntfy.sh/{topic}", data=message.encode("utf-8"), headers=headers, timeout=5)
-        print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Push gesendet: {title}")
-    except Exception as e:
-        print(f"Push Error: {e}")
+    priority = "high" if tags == "rotating_light" else "default"
+    if NOTIFIER.enqueue(topic, message, title=title, tags=tags, priority=priority):
+        print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Push eingereiht: {title}")
+
+# Spreadsheet-/Worksheet-Handles und Settings zwischen den Zyklen wiederverwenden
+_handle_cache = {}    # sheet_id -> Spreadsheet, (sheet_id, title) -> Worksheet
+_settings_cache = {}  # sheet_id -> (geladen_um, settings)
+_cache_lock = threading.Lock()
+
+def get_worksheet(gc, sheet_id, title=None):
+    """Liefert ein gecachtes Worksheet (title=None -> sheet1). Spart open_by_key() + Metadaten-Requests."""
+    ws_key = (sheet_id, title)
+    with _cache_lock:
+        ws = _handle_cache.get(ws_key)
+        sh = _handle_cache.get(sheet_id)
+    if ws is not None:
+        return ws
+
+    if sh is None:
+        sh = gc.open_by_key(sheet_id)
+    ws = sh.worksheet(title) if title else sh.sheet1
+
+    with _cache_lock:
+        _handle_cache[sheet_id] = sh
+        _handle_cache[ws_key] = ws
+    return ws
+
+def drop_cached_handles(sheet_id):
+    """Nach API-Fehlern Handles verwerfen, damit beim nächsten Zyklus neu geöffnet wird."""
+    with _cache_lock:
+        for k in [k for k in _handle_cache if k == sheet_id or (isinstance(k, tuple) and k[0] == sheet_id)]:
+            del _handle_cache[k]
 
 def get_printer_settings_full(gc, sheet_id):
-    """Holt alle Einstellungen (inkl. Shelly Cloud Parameter) aus dem Google Sheet."""
-    default_res = {
+    """
+    Holt alle Einstellungen (inkl. Shelly Cloud Parameter) aus dem Google Sheet.
+    Ergebnis wird SETTINGS_REFRESH_SECONDS lang wiederverwendet. Schlägt das
+    Nachladen fehl, bleiben die zuletzt bekannten Settings aktiv.
+    """
+    with _cache_lock:
+        cached = _settings_cache.get(sheet_id)
+    if cached and time.time() - cached[0] < SETTINGS_REFRESH_SECONDS:
+        return dict(cached[1])
+
+    settings = _load_printer_settings(gc, sheet_id)
+    if settings is None:
+        return dict(cached[1]) if cached else _default_printer_settings()
+
+    with _cache_lock:
+        _settings_cache[sheet_id] = (time.time(), settings)
+    return dict(settings)
+
+def _default_printer_settings():
+    return {
         "ntfy_active": True, 
         "maintenance_mode": False, 
         "shelly_cloud_url": "https://shelly-api-eu.shelly.cloud:6022/jrpc",
         "shelly_auth_key": None,
         "shelly_device_id": None,
-        "shelly_config": {}
+        "shelly_config": {},
+        "package_size": None,
     }
+
+def _load_printer_settings(gc, sheet_id):
+    """Liest das Settings-Sheet. None bei Lesefehler (-> alte Settings behalten)."""
+    default_res = _default_printer_settings()
     if not sheet_id: return default_res
     
     try:
-        sh = gc.open_by_key(sheet_id)
         try:
-            ws = sh.worksheet("Settings")
-        except:
+            ws = get_worksheet(gc, sheet_id, "Settings")
+        except gspread.exceptions.WorksheetNotFound:
             return default_res
             
         records = ws.get_all_records()
@@ -91,20 +158,28 @@ def get_printer_settings_full(gc, sheet_id):
                     res["shelly_config"] = json.loads(v)
                 except:
                     pass
+            elif k == "package_size":
+                try:
+                    res["package_size"] = int(float(v))
+                except ValueError:
+                    pass
                 
         return res
     except Exception as e:
         print(f"Warnung: Konnte Settings nicht lesen: {e}")
-        return default_res
+        drop_cached_handles(sheet_id)
+        return None
+
+# Eine Keep-Alive-Session für alle Shelly-Checks (statt requests.post pro Check)
+SHELLY_SESSION = build_session(pool_size=4)
 
 def check_shelly_health(cloud_url, auth_key, device_id, shelly_config, topic, printer_name, memory):
     """Prüft den Stromverbrauch via Shelly Cloud API auf Hardware-Defekte."""
     if not auth_key or not device_id or not shelly_config: return memory
 
     try:
-        if not cloud_url or not cloud_url.startswith("http"): 
-            cloud_url = "https://shelly-api-eu.shelly.cloud:6022/jrpc"
-            
+        cloud_url = jrpc_url(cloud_url)
+
         payload = {
             "jsonrpc": "2.0",
             "id": 1,
@@ -116,7 +191,8 @@ def check_shelly_health(cloud_url, auth_key, device_id, shelly_config, topic, pr
             }
         }
         
-        resp = requests.post(cloud_url, json=payload, headers={"Content-Type": "application/json"}, timeout=10)
+        account_limiter(auth_key).acquire()
+        resp = SHELLY_SESSION.post(cloud_url, json=payload, headers={"Content-Type": "application/json"}, timeout=10)
         json_resp = resp.json()
         
         data = {}
@@ -166,103 +242,249 @@ def fetch_last_row_optimized(ws):
         last_values += [""] * (len(headers) - len(last_values))
     return dict(zip(headers, last_values))
 
-def main():
-    print("Starte Fotobox Monitor Daemon (Shelly Cloud)...")
-    secrets = load_secrets()
-    gc = get_gspread_client(secrets)
-    state_memory = {}
-    shelly_memory = {} 
+def get_forecaster(key, factor):
+    with FORECASTERS_LOCK:
+        fc = FORECASTERS.get(key)
+        if fc is None or fc.media_factor != factor:
+            fc = FORECASTERS[key] = RunoutForecaster(media_factor=factor)
+        return fc
+
+def feed_forecaster(key, factor, timestamp, media_raw):
+    """Letzte Zeile in die Prognose der Box übernehmen (O(1), keine extra Sheet-Reads)."""
+    ts = pd.to_datetime(timestamp, errors="coerce")
+    if pd.isna(ts): return None
+    fc = get_forecaster(key, factor)
+    fc.feed(ts.timestamp(), media_raw)
+    return fc
+
+def check_printer(gc, name, cfg, p_sec, state_memory, shelly_memory):
+    """Ein kompletter Check-Durchlauf für EINE Box (blockierend, läuft im Worker-Thread)."""
+    key = cfg["key"]
+    sheet_id = p_sec.get("sheet_id")
+    topic = p_sec.get("ntfy_topic")
+
+    if not sheet_id or not topic: return
+
+    # 1. Settings laden
+    with HOST_LIMITS["sheets"]:
+        settings = get_printer_settings_full(gc, sheet_id)
+    push_active = settings["ntfy_active"]
+    maint_active = settings["maintenance_mode"]
+
+    if maint_active:
+        state_memory.pop(key, None)
+        return
+
+    # 2. Shelly Cloud Hardware Check
+    if settings["shelly_auth_key"] and settings["shelly_device_id"] and push_active:
+        with HOST_LIMITS["shelly"]:
+            check_shelly_health(
+                settings["shelly_cloud_url"], settings["shelly_auth_key"],
+                settings["shelly_device_id"], settings["shelly_config"],
+                topic, name, shelly_memory
+            )
+
+    # 3. Drucker Status Check
+    try:
+        with HOST_LIMITS["sheets"]:
+            data = fetch_last_row_optimized(get_worksheet(gc, sheet_id))
+    except gspread.exceptions.APIError:
+        drop_cached_handles(sheet_id)
+        return
+    except Exception:
+        return
+    if not data: return
+
+    evaluate_printer_row(name, cfg, p_sec, data, push_active, state_memory)
+
+def evaluate_printer_row(name, cfg, p_sec, data, push_active, state_memory):
+    """
+    Status-Auswertung + Push für EINE Log-Zeile – aus dem Sheet (Polling)
+    oder direkt vom Ingest-Server. Läuft unter ALERT_LOCK, weil beide Wege
+    denselben state_memory der Box fortschreiben.
+    """
+    key = cfg["key"]
+    topic = p_sec.get("ntfy_topic")
+    factor = cfg.get("media_factor", 1)
+
+    try:
+        raw_status = str(data.get("Status", "")).lower()
+        media_raw = int(float(data.get("MediaRemaining", 0)))
+        media_val = media_raw * factor
+        timestamp = str(data.get("Timestamp", ""))
+    except Exception:
+        return
+    row_ts = pd.to_datetime(timestamp, errors="coerce")
+
+    with ALERT_LOCK:
+        mem = state_memory.get(key, {})
+        # Polling kann eine ältere Zeile liefern als der Ingest-Server schon hatte
+        if pd.notna(row_ts) and mem.get("last_row_ts") is not None and row_ts < mem["last_row_ts"]:
+            return
+        forecaster = feed_forecaster(key, factor, timestamp, media_raw)
+        _evaluate_locked(name, cfg, topic, raw_status, media_val, timestamp, forecaster, push_active, mem)
+        if pd.notna(row_ts):
+            mem["last_row_ts"] = row_ts
+        state_memory[key] = mem
+
+def _evaluate_locked(name, cfg, topic, raw_status, media_val, timestamp, forecaster, push_active, mem):
+    threshold = cfg.get("warning_threshold", 20)
+
+    # Status-Evaluierung (gleiche reine Auswertung wie die App, inkl. Heartbeat)
+    result = derive_status(raw_status, media_val, timestamp, warning_threshold=threshold)
+    current_status = result.status_mode
+    if current_status == "stale" and not cfg.get("alert_stale", False):
+        # Ohne Opt-in kein Heartbeat-Alarm: letzte Zeile wie bisher nach Status bewerten
+        current_status = classify_status(raw_status, media_val, threshold)
+
+    # Papier-Prognose: bei hohem Tempo schon vor der Schwelle warnen (mit Hysterese)
+    forecast = forecaster.forecast(media_val) if forecaster and media_val > 0 else None
+    runout_txt = f" Reicht bis ca. {format_runout(forecast)}" if forecast else ""
+    runout_low = runout_alert(forecast, media_val, mem.get("runout_low", False), mem.get("runout_media"))
+    mem["runout_low"] = runout_low
+    mem["runout_media"] = media_val
+    if runout_low and current_status in ("ready", "printing"):
+        current_status = "low_paper"
+
+    # Push-Entscheidung: dieselbe Zustandsmaschine wie die App (status_rules.next_push)
+    push, mem["push_state"] = next_push(
+        result._replace(status_mode=current_status), raw_status, media_val,
+        mem.get("push_state", PushState()), time.time(), policy=DAEMON_PUSH_POLICY,
+    )
+    if push is None or not push_active:
+        return
 
+    title, msg, tag = push
+    if current_status == "low_paper":
+        # Text mit Prognose (nur der Monitor kennt den Schätzer)
+        msg = f"Wenig Papier: {media_val} (<{threshold})!{runout_txt}"
+        if media_val >= threshold:
+            eta = f", ca. {int(forecast.minutes_left)} Min." if forecast else ""
+            msg = f"Papier geht bald aus: {media_val} Bilder{eta}{runout_txt}"
+    send_ntfy(topic, f"{name}: {title}", msg, tag)
+
+async def printer_task(gc, name, cfg, p_sec, state_memory, shelly_memory, start_delay=0.0):
+    """
+    Eigener Zeitplan pro Box. Ein hängender Check blockiert nur diese Box:
+    nach PRINTER_TIMEOUT wird weitergemacht, ein neuer Check startet aber erst,
+    wenn der alte Thread wirklich fertig ist (keine doppelten Pushes).
+    """
+    loop = asyncio.get_running_loop()
+    interval = cfg.get("check_interval", CHECK_INTERVAL)
+    await asyncio.sleep(start_delay)
+
+    pending = None
     while True:
+        started = loop.time()
+        if pending is None or pending.done():
+            pending = loop.run_in_executor(
+                None, check_printer, gc, name, cfg, p_sec, state_memory, shelly_memory
+            )
+        else:
+            print(f"[{name}] Vorheriger Check läuft noch – warte weiter.")
+
         try:
-            printer_secrets = secrets.get("printers", {})
+            await asyncio.wait_for(asyncio.shield(pending), timeout=PRINTER_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"[{name}] Check-Timeout nach {PRINTER_TIMEOUT}s.")
+        except Exception as e:
+            print(f"[{name}] Check Fehler: {e}")
 
-            for name, cfg in PRINTERS.items():
-                key = cfg["key"]
-                p_sec = printer_secrets.get(key, {})
-                sheet_id = p_sec.get("sheet_id")
-                topic = p_sec.get("ntfy_topic")
-                threshold = cfg.get("warning_threshold", 20)
-                factor = cfg.get("media_factor", 1)
+        await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
 
-                if not sheet_id or not topic: continue
-                
-                time.sleep(1) # API-Schonung
+def on_ingested(gc, printer_secrets, state_memory, printer_key, sheet_id, rows):
+    """
+    Direkt eingelieferte Zeilen (Ingest-Server) sofort auswerten, ohne auf den
+    nächsten Poll zu warten. Frühere Zeilen des Batches füttern nur die Prognose.
+    """
+    found = [(n, c) for n, c in PRINTERS.items() if c["key"] == printer_key]
+    if not found or not rows: return
+    name, cfg = found[0]
+    p_sec = printer_secrets.get(printer_key, {})
+    if not p_sec.get("ntfy_topic"): return
 
-                # 1. Settings laden
-                settings = get_printer_settings_full(gc, sheet_id)
-                push_active = settings["ntfy_active"]
-                maint_active = settings["maintenance_mode"]
-                
-                if maint_active:
-                    if key in state_memory: del state_memory[key]
-                    continue 
-
-                # 2. Shelly Cloud Hardware Check
-                if settings["shelly_auth_key"] and settings["shelly_device_id"] and push_active:
-                    shelly_memory = check_shelly_health(
-                        settings["shelly_cloud_url"], settings["shelly_auth_key"], 
-                        settings["shelly_device_id"], settings["shelly_config"], 
-                        topic, name, shelly_memory
-                    )
-
-                # 3. Drucker Status Check
-                try:
-                    sh = gc.open_by_key(sheet_id)
-                    data = fetch_last_row_optimized(sh.sheet1)
-                    if not data: continue
-                    
-                    raw_status = str(data.get("Status", "")).lower()
-                    media_val = int(data.get("MediaRemaining", 0)) * factor
-                except Exception:
-                    continue
-
-                current_status = "ready"
-                msg = ""
-                tag = ""
-
-                # Status-Evaluierung
-                if any(x in raw_status for x in ["error", "jam", "end", "fehlt", "störung"]):
-                    current_status = "error"
-                    msg = f"Störung: {raw_status}"
-                    tag = "rotating_light"
-                elif media_val < 0:
-                    current_status = "offline"
-                    msg = f"Drucker nicht verbunden (Status: {media_val})"
-                    tag = "electric_plug"
-                elif media_val <= threshold:
-                    current_status = "low_paper"
-                    msg = f"Wenig Papier: {media_val} (<{threshold})!"
-                    tag = "warning"
-                
-                # Push-Logik mit Cooldown
-                mem = state_memory.get(key, {"last_status": "init", "last_push_time": 0})
-                now = time.time()
-                
-                if current_status in ["error", "low_paper", "offline"]:
-                    is_new = mem["last_status"] != current_status
-                    is_cd_over = (now - mem["last_push_time"]) > (30 * 60) # 30 Min Cooldown
-
-                    if is_new or is_cd_over:
-                        if push_active:
-                            send_ntfy(topic, f"{name}: {current_status.upper()}", msg, tag)
-                            mem["last_push_time"] = now
-                
-                elif current_status == "ready" and mem["last_status"] in ["error", "offline"]:
-                     if push_active:
-                        send_ntfy(topic, f"{name}: OK", "Drucker ist wieder bereit.", "white_check_mark")
+    with HOST_LIMITS["sheets"]:
+        settings = get_printer_settings_full(gc, sheet_id)  # gecacht (SETTINGS_REFRESH_SECONDS)
+    if settings["maintenance_mode"]:
+        state_memory.pop(printer_key, None)
+        return
 
-                mem["last_status"] = current_status
-                state_memory[key] = mem
-                
-            time.sleep(CHECK_INTERVAL)
+    factor = cfg.get("media_factor", 1)
+    for row in rows[:-1]:
+        try: feed_forecaster(printer_key, factor, row.get("Timestamp"), int(float(row.get("MediaRemaining", 0))))
+        except Exception: pass
+    evaluate_printer_row(name, cfg, p_sec, rows[-1], settings["ntfy_active"], state_memory)
 
-        except KeyboardInterrupt:
-            print("Monitor gestoppt.")
-            break
-        except Exception as e:
-            print(f"Globaler Loop Fehler: {e}")
-            time.sleep(60)
+def start_ingest(gc, ingest_cfg, printer_secrets, state_memory):
+    """Ingest-Server im Monitor-Prozess: Alarme kommen ohne Poll-Verzögerung an."""
+    printers = {}
+    for cfg in PRINTERS.values():
+        p_sec = printer_secrets.get(cfg["key"], {})
+        if p_sec.get("sheet_id"):
+            printers[cfg["key"]] = p_sec["sheet_id"]
+
+    service = IngestService(
+        printers,
+        worksheet_getter=lambda sheet_id: get_worksheet(gc, sheet_id),
+        token=ingest_cfg.get("token"),
+        sheets_limit=HOST_LIMITS["sheets"],
+    )
+    service.subscribe(lambda key, sheet_id, rows: on_ingested(gc, printer_secrets, state_memory, key, sheet_id, rows))
+    host = ingest_cfg.get("host", INGEST_HOST)
+    try:
+        server = start_ingest_server(service, host, int(ingest_cfg.get("port", INGEST_PORT)))
+    except (OSError, ValueError) as e:
+        print(f"Ingest-Server nicht gestartet: {e}")
+        return None
+    print(f"Ingest-Server aktiv auf {host}:{server.server_address[1]} ({len(printers)} Boxen)")
+    return service
+
+async def run_monitor(secrets):
+    gc = get_gspread_client(secrets)
+    state_memory = {}
+    shelly_memory = {}
+    printer_secrets = secrets.get("printers", {})
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=max(4, 2 * len(PRINTERS)), thread_name_prefix="check")
+    )
+
+    ingest_cfg = secrets.get("ingest", {})
+    if ingest_cfg.get("port"):
+        start_ingest(gc, ingest_cfg, printer_secrets, state_memory)
+
+    tasks = []
+    for idx, (name, cfg) in enumerate(PRINTERS.items()):
+        p_sec = printer_secrets.get(cfg["key"], {})
+        # Starts leicht versetzt, damit nicht alle Boxen gleichzeitig die APIs treffen
+        delay = idx * START_STAGGER_SECONDS
+        tasks.append(asyncio.create_task(
+            printer_task(gc, name, cfg, p_sec, state_memory, shelly_memory, start_delay=delay),
+            name=f"printer:{name}",
+        ))
+    tasks.append(asyncio.create_task(log_stats_task(), name="stats"))
+    await asyncio.gather(*tasks)
+
+async def log_stats_task():
+    """Schreibt regelmäßig Queue-Tiefe und Zustell-Latenz der Pushes ins Log."""
+    while True:
+        await asyncio.sleep(STATS_LOG_SECONDS)
+        stats = NOTIFIER.stats()
+        avg = f"{stats['avg_latency']:.2f}s" if stats["avg_latency"] is not None else "–"
+        print(
+            f"[Push] Queue {stats['queue_depth']} | Retry {stats['retry_pending']} | gesendet {stats['sent']} | fehlgeschlagen {stats['failed']} | "
+            f"verworfen {stats['dropped']} | dedupliziert {stats['deduped']} | Ø Latenz {avg} | max {stats['max_latency']:.2f}s"
+        )
+
+def main():
+    print("Starte Fotobox Monitor Daemon (Shelly Cloud)...")
+    secrets = load_secrets()
+    try:
+        asyncio.run(run_monitor(secrets))
+    except KeyboardInterrupt:
+        NOTIFIER.flush(timeout=5)
+        print("Monitor gestoppt.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,206 @@
+# notifier.py
+import heapq
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from http_session import build_session
+
+# Per Umgebungsvariable umbiegbar (z.B. auf den Mock aus mock_servers.py)
+NTFY_BASE_URL = os.environ.get("NTFY_BASE_URL", "https://ntfy.sh")
+
+
+def sanitize_header_value(val: str, default: str = "ntfy") -> str:
+    """
+    HTTP-Header müssen latin-1 sein: Zeilenumbrüche und Emojis entfernen.
+    """
+    if not isinstance(val, str): val = str(val)
+    val = val.replace("\r", " ").replace("\n", " ")
+    val = unicodedata.normalize("NFKC", val)
+    val = re.sub(r"[\U00010000-\U0010FFFF]", "", val)
+    val = val.encode("latin-1", "ignore").decode("latin-1")
+    val = val.strip()
+    if not val: val = default
+    return val
+
+
+class NtfyDispatcher:
+    """
+    Verschickt ntfy-Pushes in einem Hintergrund-Thread.
+    - enqueue() blockiert nie: volle Queue -> Nachricht wird verworfen (dropped).
+    - Fehlgeschlagene Zustellungen werden mit exponentiellem Backoff wiederholt:
+      sie warten mit "nicht vor"-Zeitpunkt in einer Retry-Liste, der Worker
+      stellt derweil die übrigen Nachrichten zu (kein Schlafen im Worker).
+    - Identische Nachrichten innerhalb von dedup_window Sekunden werden zusammengelegt.
+    """
+
+    def __init__(
+        self,
+        base_url: str = NTFY_BASE_URL,
+        max_queue: int = 100,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+        dedup_window: float = 60.0,
+        timeout: float = 5.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dedup_window = dedup_window
+        self.timeout = timeout
+        # Retries macht der Dispatcher selbst (mit Logging), nicht urllib3
+        self.session = build_session(pool_size=2, retries=0)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._retry = []  # Heap: (nicht vor, seq, Nachricht) für fehlgeschlagene Zustellungen
+        self._retry_seq = itertools.count()
+        self._recent = {}  # Dedup-Key -> Zeitpunkt des letzten Enqueue
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deduped = 0
+        self.last_latency = None
+        self.max_latency = 0.0
+        self._latency_sum = 0.0
+
+    def enqueue(
+        self,
+        topic: str,
+        message: str,
+        title: Optional[str] = None,
+        tags: Optional[str] = None,
+        priority: Optional[str] = None,
+        dedup: bool = True,
+    ) -> bool:
+        """
+        Reiht eine Nachricht ein. False, wenn verworfen (kein Topic, Duplikat, Queue voll).
+        """
+        if not topic:
+            return False
+
+        headers = {}
+        if title is not None: headers["Title"] = sanitize_header_value(title, default="Status")
+        if tags is not None: headers["Tags"] = sanitize_header_value(tags, default="info")
+        if priority is not None: headers["Priority"] = sanitize_header_value(priority, default="default")
+
+        now = time.monotonic()
+        if dedup:
+            key = (topic, title, message, tags)
+            with self._lock:
+                # Alte Einträge ausdünnen, damit das Dict nicht wächst
+                self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedup_window}
+                if key in self._recent:
+                    self.deduped += 1
+                    return False
+                self._recent[key] = now
+
+        try:
+            self._queue.put_nowait((topic, message, headers, now, 0))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            print(f"ntfy Queue voll – Nachricht verworfen: {title or message}")
+            return False
+
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="ntfy-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _deliver(self, topic: str, message: str, headers: dict, attempt: int) -> Optional[bool]:
+        """
+        Ein Zustellversuch: True = zugestellt, False = endgültig fehlgeschlagen,
+        None = später erneut versuchen (429 / 5xx / Netzwerkfehler).
+        """
+        url = f"{self.base_url}/{topic}"
+        try:
+            resp = self.session.post(url, data=message.encode("utf-8"), headers=headers, timeout=self.timeout)
+            if resp.status_code < 400:
+                return True
+            if resp.status_code not in (429, 500, 502, 503, 504):
+                print(f"ntfy Fehler {resp.status_code}: {resp.text[:200]}")
+                return False
+            print(f"ntfy Fehler {resp.status_code} (Versuch {attempt + 1})")
+        except Exception as e:
+            print(f"ntfy Fehler (Versuch {attempt + 1}): {e}")
+        return None
+
+    def _next_item(self) -> tuple:
+        """
+        Nächste fällige Nachricht: erst fällige Retries, sonst die Queue
+        (höchstens bis zum nächsten Retry-Zeitpunkt warten).
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._retry and self._retry[0][0] <= now:
+                    return heapq.heappop(self._retry)[2]
+                wait = self._retry[0][0] - now if self._retry else None
+            try:
+                return self._queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _run(self) -> None:
+        while True:
+            topic, message, headers, enqueued_at, attempt = self._next_item()
+            ok = False
+            try:
+                ok = self._deliver(topic, message, headers, attempt)
+                if ok is None and attempt < self.max_retries:
+                    # Zurückstellen statt schlafen; task_done erst beim endgültigen Ergebnis
+                    not_before = time.monotonic() + self.backoff * (2 ** attempt)
+                    with self._lock:
+                        heapq.heappush(self._retry, (not_before, next(self._retry_seq),
+                                                     (topic, message, headers, enqueued_at, attempt + 1)))
+                    continue
+            except Exception as e:
+                print(f"ntfy Dispatcher Fehler: {e}")
+            latency = time.monotonic() - enqueued_at
+            with self._lock:
+                if ok:
+                    self.sent += 1
+                    self.last_latency = latency
+                    self.max_latency = max(self.max_latency, latency)
+                    self._latency_sum += latency
+                else:
+                    self.failed += 1
+            self._queue.task_done()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wartet, bis die Queue abgearbeitet ist (z.B. vor dem Beenden).
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "retry_pending": len(self._retry),
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "deduped": self.deduped,
+                "last_latency": self.last_latency,
+                "avg_latency": self._latency_sum / self.sent if self.sent else None,
+                "max_latency": self.max_latency,
+            }
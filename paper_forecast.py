@@ -0,0 +1,196 @@
+# paper_forecast.py
+# Inkrementelle Prognose, wann das Papier ausgeht ("reicht bis 21:40 ± 15 Min").
+# Pro Messwert O(1): exponentiell gewichtete Druckrate über aktive Druckzeit,
+# Leerlauf-Phasen zählen nicht mit. Ohne Streamlit-Abhängigkeit, damit App,
+# Bildschirmschoner und monitor.py denselben Schätzer nutzen.
+import datetime
+import math
+import threading
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+from print_events import GLITCH_MIN, IncrementalFeed
+from status_rules import LOCAL_TZ
+
+# Länger als X Minuten kein Druck = Pause (zählt nicht zur Druckrate)
+IDLE_GAP_MIN = 15
+# Halbwertszeit der Gewichtung in aktiven Druckminuten
+HALF_LIFE_MIN = 20
+# Mindestabstand zweier Druck-Ereignisse (gegen Division durch ~0)
+MIN_GAP_MIN = 0.25
+# Erst ab so vielen Druck-Ereignissen eine Prognose anzeigen
+MIN_EVENTS = 3
+# Breite des Unsicherheitsbands (~90 %)
+Z_BAND = 1.64
+# "Papier geht bald aus" ab X Minuten Restlaufzeit, aufheben erst oberhalb von Y (Hysterese)
+RUNOUT_WARN_MINUTES = 30
+RUNOUT_CLEAR_MINUTES = 45
+
+
+class RunoutForecast(NamedTuple):
+    prints_per_hour: float
+    minutes_left: float
+    minutes_low: float   # schnellster plausibler Verbrauch -> früheres Ende
+    minutes_high: float  # langsamster plausibler Verbrauch -> späteres Ende
+    idle: bool           # gerade Pause (letzter Druck länger als IDLE_GAP_MIN her)
+
+    @property
+    def margin_min(self) -> float:
+        return (self.minutes_high - self.minutes_low) / 2
+
+
+class RunoutForecaster:
+    """
+    Schätzer für EIN Sheet. feed() nimmt einen Messwert (Sekunden, MediaRemaining roh),
+    update() übernimmt nur die neuen Zeilen eines wachsenden Log-DataFrames.
+
+    Ein Messwert wird erst übernommen, wenn der nächste da ist: so fallen einzelne
+    Ausreißer (400 -> 0 -> 400) raus wie bei print_events.drop_glitches.
+    """
+
+    def __init__(self, media_factor: float = 1):
+        self.media_factor = media_factor
+        self._lock = threading.Lock()
+        self._feed = IncrementalFeed()
+        self._reset()
+
+    def _reset(self):
+        self._prev = None        # letzter übernommener Messwert (ts, media)
+        self._pending = None     # jüngster Messwert, wartet auf Bestätigung
+        self._last_print_ts = None
+        self._prints = 0.0       # gewichtete Drucke
+        self._minutes = 0.0      # gewichtete aktive Minuten
+        self._var = 0.0          # gewichtete Varianz der Einzel-Raten
+        self._w1 = 0.0           # Gewichtssummen für die effektive Stichprobengröße
+        self._w2 = 0.0
+        self.events = 0
+
+    # ------------------------------------------------------------------
+    # Messwerte übernehmen
+    # ------------------------------------------------------------------
+    def _feed_one(self, ts: float, media: float) -> None:
+        if media is None or math.isnan(media) or media < 0:
+            return  # -1 = Drucker offline
+        latest = self._pending or self._prev
+        if latest is not None and ts <= latest[0]:
+            return  # gleicher Messwert nochmal (Monitor liest die letzte Zeile mehrfach)
+
+        if self._pending is not None:
+            prev_media = self._prev[1] if self._prev else None
+            spike = (
+                prev_media is not None
+                and abs(self._pending[1] - prev_media) > GLITCH_MIN
+                and abs(media - prev_media) <= 1
+            )
+            if not spike:
+                self._commit(*self._pending)
+        self._pending = (ts, media)
+
+    def _commit(self, ts: float, media: float) -> None:
+        if self._prev is not None:
+            drop = self._prev[1] - media
+            if drop > 0:
+                if self._last_print_ts is not None:
+                    gap_min = (ts - self._last_print_ts) / 60.0
+                    # Erster Druck nach einer Pause: kein Raten-Update (Pause ist kein Verbrauch)
+                    if gap_min <= IDLE_GAP_MIN:
+                        self._observe(drop * self.media_factor, max(gap_min, MIN_GAP_MIN))
+                self._last_print_ts = ts
+            # Anstieg = neue Rolle / Messrauschen -> nur Referenzwert verschieben
+        self._prev = (ts, media)
+
+    def _observe(self, prints: float, gap_min: float) -> None:
+        decay = 0.5 ** (gap_min / HALF_LIFE_MIN)
+        alpha = 1.0 - decay
+        rate = prints / gap_min
+        if self.events:
+            diff = rate - self._prints / self._minutes
+            self._var = decay * (self._var + alpha * diff * diff)
+        self._prints = self._prints * decay + prints
+        self._minutes = self._minutes * decay + gap_min
+        self._w1 = self._w1 * decay + alpha
+        self._w2 = self._w2 * decay * decay + alpha * alpha
+        self.events += 1
+
+    def feed(self, ts: float, media: float) -> None:
+        with self._lock:
+            self._feed_one(ts, media)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Übernimmt neue Zeilen aus dem (wachsenden) Log-DataFrame.
+        Wird das Log kürzer oder ändert sich die erste Zeile (Reset), wird neu begonnen.
+        """
+        with self._lock:
+            reset, ts_ns, media = self._feed.take(df)
+            if reset:
+                self._reset()
+            for t, m in sorted(zip((ts_ns / 1e9).tolist(), media.tolist())):
+                self._feed_one(t, m)
+
+    # ------------------------------------------------------------------
+    # Prognose
+    # ------------------------------------------------------------------
+    def forecast(self, media_remaining: float) -> Optional[RunoutForecast]:
+        """
+        Restlaufzeit in Minuten (bei weiterem Drucken im aktuellen Tempo) samt Band.
+        media_remaining in echten Drucken (Rohwert * media_factor).
+        None, solange es zu wenige Druck-Ereignisse gibt.
+        """
+        with self._lock:
+            if self.events < MIN_EVENTS or self._minutes <= 0:
+                return None
+            rate = self._prints / self._minutes
+            if rate <= 0:
+                return None
+
+            n_eff = (self._w1 * self._w1 / self._w2) if self._w2 > 0 else 1.0
+            spread = Z_BAND * math.sqrt(self._var / max(n_eff, 1.0))
+            rate_fast = rate + spread
+            rate_slow = max(rate - spread, rate * 0.25)
+
+            latest = self._pending or self._prev
+            idle = (
+                latest is None or self._last_print_ts is None
+                or (latest[0] - self._last_print_ts) / 60.0 > IDLE_GAP_MIN
+            )
+
+        remaining = max(0.0, float(media_remaining))
+        return RunoutForecast(
+            prints_per_hour=rate * 60,
+            minutes_left=remaining / rate,
+            minutes_low=remaining / rate_fast,
+            minutes_high=remaining / rate_slow,
+            idle=idle,
+        )
+
+
+def format_runout(fc: RunoutForecast, now: Optional[datetime.datetime] = None) -> str:
+    """
+    "21:40 ± 15 Min." (Ende ab jetzt gerechnet, lokale Zeit).
+    """
+    now = now or datetime.datetime.now(LOCAL_TZ)
+    end = now + datetime.timedelta(minutes=fc.minutes_left)
+    margin = int(round(fc.margin_min))
+    return f"{end:%H:%M} ± {margin} Min." if margin > 0 else f"{end:%H:%M}"
+
+
+def runout_alert(
+    forecast: Optional[RunoutForecast],
+    media_remaining: float,
+    was_low: bool,
+    prev_media: Optional[float] = None,
+) -> bool:
+    """
+    Hysterese für den Prognose-Alarm (Monitor): an bei <= RUNOUT_WARN_MINUTES
+    (nicht in Pausen), aus erst bei > RUNOUT_CLEAR_MINUTES oder wenn der
+    Papierstand steigt (neue Rolle). Pausen und fehlende Prognose ändern nichts.
+    """
+    low = was_low
+    if low and ((prev_media is not None and media_remaining > prev_media)
+                or (forecast is not None and forecast.minutes_left > RUNOUT_CLEAR_MINUTES)):
+        low = False
+    if forecast is not None and not forecast.idle and forecast.minutes_left <= RUNOUT_WARN_MINUTES:
+        low = True
+    return low
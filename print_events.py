@@ -0,0 +1,219 @@
+# print_events.py
+# Macht aus der MediaRemaining-Zeitreihe einzelne Druck-Ereignisse und hält
+# Minuten-/Stunden-Rollups inkrementell aktuell (für Historie und PDF-Report).
+# Ohne Streamlit-Abhängigkeit, damit auch Report-Prozesse und CLI sie nutzen können.
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MINUTE_NS = 60 * 10**9
+HOUR_NS = 60 * MINUTE_NS
+
+# Einzelner Ausreißer: Wert weicht um mehr als X (Rohwert) ab, Nachbarn stimmen überein
+GLITCH_MIN = 5
+
+
+def drop_glitches(media: np.ndarray) -> np.ndarray:
+    """
+    Maske der gültigen Messwerte: -1 (Drucker offline) und einzelne Ausreißer
+    (z.B. 400 -> 0 -> 400) fliegen raus.
+    """
+    valid = media >= 0
+    idx = np.flatnonzero(valid)
+    if len(idx) >= 3:
+        m = media[idx]
+        prev, cur, nxt = m[:-2], m[1:-1], m[2:]
+        spike = (np.abs(cur - prev) > GLITCH_MIN) & (np.abs(nxt - prev) <= 1)
+        valid[idx[1:-1][spike]] = False
+    return valid
+
+
+def extract_print_events(
+    ts_ns: np.ndarray,
+    media: np.ndarray,
+    media_factor: float = 1,
+    prev_media: Optional[float] = None,
+    valid: Optional[np.ndarray] = None,
+):
+    """
+    Druck-Ereignisse aus einer (zeitlich sortierten) Messreihe.
+    Jede Abnahme von MediaRemaining ergibt ein Ereignis (Zeitpunkt, Anzahl Drucke).
+    Anstiege (neue Rolle) zählen nicht. prev_media = letzter gültiger Wert
+    vor diesem Abschnitt (für inkrementelle Verarbeitung), valid = fertige
+    Maske aus drop_glitches (sonst wird sie hier berechnet).
+    Liefert (Zeitpunkte ns, Drucke, letzter gültiger Wert).
+    """
+    if valid is None:
+        valid = drop_glitches(media)
+    ts_v = ts_ns[valid]
+    m_v = media[valid]
+    if len(m_v) == 0:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype="float64"), prev_media
+
+    before = np.r_[m_v[0] if prev_media is None else prev_media, m_v[:-1]]
+    drop = before - m_v
+    printed = drop > 0
+    return ts_v[printed], drop[printed] * media_factor, float(m_v[-1])
+
+
+def _bin_sum(ts_ns: np.ndarray, counts: np.ndarray, width_ns: int):
+    bins = ts_ns // width_ns
+    keys, inverse = np.unique(bins, return_inverse=True)
+    return keys, np.bincount(inverse, weights=counts)
+
+
+class IncrementalFeed:
+    """
+    Merkt sich, welche Zeilen eines wachsenden Log-DataFrames schon verarbeitet
+    wurden (gemeinsam für PrintStatsEngine, PrintRollup und RunoutForecaster).
+    take(df) -> (reset, Timestamps in ns, MediaRemaining) der NEUEN gültigen Zeilen,
+    in Log-Reihenfolge. reset=True: Log leer, kürzer oder erste Zeile geändert –
+    der Aufrufer verwirft seinen Zustand, die Arrays enthalten dann das ganze Log.
+    Nicht thread-sicher, läuft unter dem Lock des Besitzers.
+    """
+
+    def __init__(self):
+        self.rows_seen = 0
+        self.first_raw = None
+
+    def take(self, df: pd.DataFrame):
+        empty = (np.empty(0, dtype="int64"), np.empty(0, dtype="float64"))
+        if df.empty or "Timestamp" not in df.columns or "MediaRemaining" not in df.columns:
+            self.rows_seen, self.first_raw = 0, None
+            return (True, *empty)
+
+        first_raw = str(df["Timestamp"].iloc[0])
+        reset = len(df) < self.rows_seen or (self.rows_seen and first_raw != self.first_raw)
+        if reset:
+            self.rows_seen = 0
+        if len(df) == self.rows_seen:
+            return (False, *empty)
+
+        new = df.iloc[self.rows_seen:]
+        ts = pd.to_datetime(new["Timestamp"], errors="coerce")
+        media = pd.to_numeric(new["MediaRemaining"], errors="coerce")
+        ok = (ts.notna() & media.notna()).to_numpy()
+        self.rows_seen = len(df)
+        self.first_raw = first_raw
+        return (
+            bool(reset),
+            ts.to_numpy(dtype="datetime64[ns]")[ok].view("int64"),
+            media.to_numpy(dtype="float64")[ok],
+        )
+
+
+class PrintRollup:
+    """
+    Inkrementelle Druck-Rollups für EIN Sheet.
+    update() verarbeitet nur neue Log-Zeilen (wie PrintStatsEngine) und addiert
+    deren Druck-Ereignisse in Minuten- und Stunden-Töpfe.
+
+    Ob ein Messwert ein Ausreißer ist, zeigt erst der nächste. Die letzten zwei
+    Messwerte bleiben daher als Kontext erhalten, und das Ereignis des jüngsten
+    Werts wird nur vorläufig gebucht: stellt er sich beim nächsten update() als
+    Ausreißer heraus, wird es wieder abgezogen. So ergibt zeilenweises Füttern
+    dieselben Summen wie ein einziger Aufruf mit dem ganzen Log.
+    """
+
+    def __init__(self, media_factor: float = 1):
+        self.media_factor = media_factor
+        self._lock = threading.Lock()
+        self._feed = IncrementalFeed()
+        self._reset()
+
+    def _reset(self):
+        self._minutes = {}  # Minute (ns // MINUTE_NS) -> Drucke
+        self._hours = {}    # Stunde (ns // HOUR_NS) -> Drucke
+        self._tail_ts = np.empty(0, dtype="int64")      # letzte zwei Messwerte (>= 0)
+        self._tail_media = np.empty(0, dtype="float64")
+        self._base_media = None  # letzter gültiger Wert vor dem jüngsten Messwert
+        self._provisional = None  # (ts ns, Drucke) des jüngsten Messwerts
+        self.total = 0.0
+
+    def _add(self, buckets: dict, keys: np.ndarray, sums: np.ndarray) -> None:
+        for k, v in zip(keys.tolist(), sums.tolist()):
+            buckets[k] = buckets.get(k, 0.0) + v
+
+    def _book(self, ts_ns: np.ndarray, prints: np.ndarray, sign: float = 1.0) -> None:
+        if len(ts_ns):
+            self._add(self._minutes, *_bin_sum(ts_ns, prints * sign, MINUTE_NS))
+            self._add(self._hours, *_bin_sum(ts_ns, prints * sign, HOUR_NS))
+            self.total += sign * float(prints.sum())
+
+    def _consume(self, ts_new: np.ndarray, media_new: np.ndarray) -> None:
+        ts_all = np.r_[self._tail_ts, ts_new]
+        media_all = np.r_[self._tail_media, media_new]
+        valid = drop_glitches(media_all)
+
+        # Vorläufiges Ereignis des bisher jüngsten Werts zurücknehmen, er wird neu bewertet
+        if self._provisional is not None:
+            self._book(*self._provisional, sign=-1.0)
+            self._provisional = None
+
+        start = max(len(self._tail_ts) - 1, 0)
+        ev_ts, ev_prints, last = extract_print_events(
+            ts_all[start:-1], media_all[start:-1], self.media_factor,
+            self._base_media, valid=valid[start:-1],
+        )
+        self._book(ev_ts, ev_prints)
+        self._base_media = last
+
+        # Jüngster Wert: vorläufig buchen
+        if valid[-1] and last is not None and last > media_all[-1]:
+            prov = (ts_all[-1:], np.array([(last - media_all[-1]) * self.media_factor]))
+            self._book(*prov)
+            self._provisional = prov
+
+        self._tail_ts = ts_all[-2:]
+        self._tail_media = media_all[-2:]
+
+    def update(self, df: pd.DataFrame) -> None:
+        with self._lock:
+            reset, ts_ns, media = self._feed.take(df)
+            if reset:
+                self._reset()
+            ok = media >= 0
+            ts_ns, media = ts_ns[ok], media[ok]
+            order = np.argsort(ts_ns, kind="stable")
+            if len(order):
+                self._consume(ts_ns[order], media[order])
+
+    @staticmethod
+    def _series(buckets: dict, width_ns: int) -> pd.Series:
+        if not buckets:
+            return pd.Series(dtype="float64")
+        keys = np.fromiter(buckets.keys(), dtype="int64")
+        vals = np.fromiter(buckets.values(), dtype="float64")
+        full = np.arange(keys.min(), keys.max() + 1)
+        dense = np.zeros(len(full))
+        dense[keys - keys.min()] = vals
+        index = pd.DatetimeIndex((full * width_ns).astype("datetime64[ns]"))
+        return pd.Series(dense, index=index)
+
+    def hourly(self) -> pd.Series:
+        """
+        Drucke pro Stunde (lückenlos, leere Stunden = 0).
+        """
+        with self._lock:
+            return self._series(self._hours, HOUR_NS)
+
+    def minutely(self) -> pd.Series:
+        with self._lock:
+            return self._series(self._minutes, MINUTE_NS)
+
+    def peak_window(self, window_min: int = 60):
+        """
+        Zeitfenster mit den meisten Drucken: (Beginn, Ende, Drucke) oder None.
+        Gleitendes Fenster über die Minuten-Töpfe per Präfixsumme.
+        """
+        per_min = self.minutely()
+        if per_min.empty:
+            return None
+        csum = np.r_[0.0, np.cumsum(per_min.to_numpy())]
+        w = min(window_min, len(per_min))
+        sums = csum[w:] - csum[:-w]
+        i = int(np.argmax(sums))
+        start = per_min.index[i]
+        return start, start + pd.Timedelta(minutes=w), float(sums[i])
@@ -0,0 +1,33 @@
+# printers_config.py
+# Eine Quelle für die Box-Konfiguration: app.py, monitor.py und fleet_reports.py
+# lesen alle DIESES Dict, damit Paketgröße, Rollenpreis & Co. überall gleich sind.
+# Ohne Streamlit-Abhängigkeit (wird auch vom Monitor-Dienst importiert).
+# Die Sheet-IDs stehen weiterhin in den Secrets unter [printers.<key>].
+
+PRINTERS = {
+    "die Fotobox": {
+        "key": "standard",
+        "warning_threshold": 40,
+        "default_max_prints": 400,
+        "cost_per_roll_eur": 46.59,
+        "has_admin": True,
+        # --- ÄNDERUNG: Shelly aktiv, Aqara aus ---
+        "has_shelly": True, 
+        "has_aqara": False,
+        "has_dsr": True,
+        "media_factor": 1,
+        "fotoshare_url": "https://fotoshare.co/account/login",
+    },
+    "Weinkellerei": {
+        "key": "Weinkellerei",
+        "warning_threshold": 30,
+        "default_max_prints": 200,
+        "cost_per_roll_eur": 55,
+        "has_admin": True,
+        "has_shelly": False,
+        "has_aqara": False,
+        "has_dsr": False,
+        "media_factor": 0.5,
+        "fotoshare_url": "https://weinkellerei.tirol/fame",
+    },
+}
@@ -1,27 +1,45 @@
 # report_generator.py
 import datetime
+import hashlib
 import io
+import os
+import tempfile
+import multiprocessing
+import threading
+import time
+import uuid
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from fpdf import FPDF
-import streamlit as st
-
-class PDFReport(FPDF):
-    def header(self):
-        # Logo oder Titel oben
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'Fotobox Event Report', 0, 1, 'C')
-        self.set_draw_color(200, 200, 200)
-        self.line(10, 25, 200, 25) # Horizontale Linie
-        self.ln(10)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(128)
-        self.cell(0, 10, f'Seite {self.page_no()} | Generiert durch Fotobox-Interface', 0, 0, 'C')
+
+# matplotlib und fpdf werden erst beim ersten Report importiert:
+# Login, Screensaver und Übersicht brauchen sie nie (schnellerer Kaltstart).
+_PDFReport = None
+
+def _new_pdf_report():
+    global _PDFReport
+    if _PDFReport is None:
+        from fpdf import FPDF
+
+        class PDFReport(FPDF):
+            def header(self):
+                # Logo oder Titel oben
+                self.set_font('Arial', 'B', 16)
+                self.cell(0, 10, 'Fotobox Event Report', 0, 1, 'C')
+                self.set_draw_color(200, 200, 200)
+                self.line(10, 25, 200, 25) # Horizontale Linie
+                self.ln(10)
+
+            def footer(self):
+                self.set_y(-15)
+                self.set_font('Arial', 'I', 8)
+                self.set_text_color(128)
+                self.cell(0, 10, f'Seite {self.page_no()} | Generiert durch Fotobox-Interface', 0, 0, 'C')
+
+        _PDFReport = PDFReport
+    return _PDFReport()
 
 def create_usage_chart(df: pd.DataFrame, media_factor: int = 1) -> io.BytesIO:
     """
@@ -48,10 +66,26 @@ def create_usage_chart(df: pd.DataFrame, media_factor: int = 1) -> io.BytesIO:
     if len(x) < 2:
         return None
 
-    # 2. Plot erstellen
-    plt.style.use('bmh') # Hübscherer Style
-    fig, ax = plt.subplots(figsize=(10, 5))
+    from matplotlib import style as mpl_style
+    from matplotlib.figure import Figure
+
+    # 2. Plot erstellen – objektorientiert über Figure (kein globaler pyplot-Zustand,
+    # sicher in parallelen Sessions / Worker-Prozessen)
+    with mpl_style.context('bmh'): # Hübscherer Style
+        fig = Figure(figsize=(10, 5))
+        ax = fig.subplots()
+        _draw_usage_chart(fig, ax, df_chart, x, y)
+
+        # 5. Speichern in Buffer
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    buf.seek(0)
     
+    return buf
+
+def _draw_usage_chart(fig, ax, df_chart, x, y):
+    import matplotlib.dates as mdates
+
     # Hauptlinie (Verlauf)
     ax.plot(x, y, label='Papierbestand', color='#2563EB', linewidth=2, marker='o', markersize=3)
     
@@ -79,12 +113,29 @@ def create_usage_chart(df: pd.DataFrame, media_factor: int = 1) -> io.BytesIO:
     ax.legend()
     ax.grid(True, which='both', linestyle='--', alpha=0.5)
 
-    # 5. Speichern in Buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+def create_hourly_chart(hourly_prints: pd.Series) -> io.BytesIO:
+    """
+    Balkendiagramm Drucke pro Stunde als PNG-Buffer (None ohne Daten).
+    """
+    if hourly_prints is None or hourly_prints.empty or hourly_prints.sum() <= 0:
+        return None
+
+    import matplotlib.dates as mdates
+    from matplotlib import style as mpl_style
+    from matplotlib.figure import Figure
+
+    with mpl_style.context('bmh'):
+        fig = Figure(figsize=(10, 3.5))
+        ax = fig.subplots()
+        ax.bar(hourly_prints.index, hourly_prints.values, width=1 / 24 * 0.8, align='edge', color='#2563EB')
+        ax.set_ylabel("Drucke")
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+        fig.autofmt_xdate()
+        ax.grid(True, axis='y', linestyle='--', alpha=0.5)
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
     buf.seek(0)
-    plt.close(fig) # Memory Leak verhindern
-    
     return buf
 
 def generate_event_pdf(
@@ -93,11 +144,13 @@ def generate_event_pdf(
     stats: dict, 
     prints_since_reset: int,
     cost_info: str,
-    media_factor: int = 1 # Neu: media_factor durchreichen
+    media_factor: int = 1, # Neu: media_factor durchreichen
+    hourly_prints: pd.Series = None, # Drucke pro Stunde (PrintRollup.hourly())
+    peak_window: tuple = None, # (Beginn, Ende, Drucke) aus PrintRollup.peak_window()
 ) -> bytes:
     """Erstellt ein erweitertes PDF mit Diagramm"""
     
-    pdf = PDFReport()
+    pdf = _new_pdf_report()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -173,6 +226,17 @@ def generate_event_pdf(
         pdf.image(chart_buffer, x=10, w=190, type='png') 
         
         pdf.ln(5)
+
+    hourly_buffer = create_hourly_chart(hourly_prints)
+    if hourly_buffer:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, "Drucke pro Stunde", 0, 1)
+        pdf.image(hourly_buffer, x=10, w=190, type='png')
+        if peak_window:
+            start, end, count = peak_window
+            pdf.set_font("Arial", '', 10)
+            pdf.cell(0, 6, f"Spitzenlast: {start:%d.%m. %H:%M} - {end:%H:%M} Uhr mit {count:.0f} Drucken", 0, 1)
+        pdf.ln(5)
     
     # --- 4. Tabelle (Letzte Logs) ---
     pdf.add_page() # Tabelle auf neuer Seite starten, falls Chart groß ist
@@ -217,3 +281,252 @@ def generate_event_pdf(
 
     # HIER IST DER FIX 2: .encode('latin-1') entfernt und in bytes() gewrappt
     return bytes(pdf.output(dest='S'))
+
+
+def generate_fleet_summary_pdf(rows: list) -> bytes:
+    """
+    Übersicht über alle Boxen eines Events (eine Zeile pro Box).
+    rows: Dicts mit printer_name, prints, duration_min, ppm, cost_info, log_rows.
+    """
+    pdf = _new_pdf_report()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    now_str = datetime.datetime.now().strftime("%d.%m.%Y %H:%M")
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 8, "Flotten-Übersicht", 0, 1)
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 6, f"Erstellt: {now_str}", 0, 1)
+    pdf.ln(4)
+
+    pdf.set_font("Arial", 'B', 9)
+    pdf.set_fill_color(230, 230, 230)
+    pdf.cell(50, 8, "Fotobox", 1, 0, 'L', 1)
+    pdf.cell(25, 8, "Drucke", 1, 0, 'C', 1)
+    pdf.cell(35, 8, "Laufzeit", 1, 0, 'C', 1)
+    pdf.cell(25, 8, "Bilder/Std", 1, 0, 'C', 1)
+    pdf.cell(30, 8, "Kosten", 1, 0, 'C', 1)
+    pdf.cell(25, 8, "Log-Zeilen", 1, 1, 'C', 1)
+
+    pdf.set_font("Arial", '', 9)
+    total_prints = 0
+    for row in rows:
+        duration = row.get("duration_min", 0) or 0
+        ppm = row.get("ppm")
+        total_prints += row.get("prints", 0) or 0
+        name = str(row.get("printer_name", "")).encode('latin-1', 'replace').decode('latin-1')
+        pdf.cell(50, 7, name[:30], 1)
+        pdf.cell(25, 7, str(row.get("prints", 0)), 1, 0, 'C')
+        pdf.cell(35, 7, f"{int(duration // 60)} Std {int(duration % 60)} Min", 1, 0, 'C')
+        pdf.cell(25, 7, f"{ppm * 60:.1f}" if ppm else "-", 1, 0, 'C')
+        pdf.cell(30, 7, str(row.get("cost_info", "N/A")), 1, 0, 'C')
+        pdf.cell(25, 7, str(row.get("log_rows", 0)), 1, 1, 'C')
+
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(50, 8, "Gesamt", 1)
+    pdf.cell(25, 8, str(total_prints), 1, 1, 'C')
+
+    return bytes(pdf.output(dest='S'))
+
+# -----------------------------------------------------------------------------
+# REPORT CACHE (pro Datenstand nur einmal rendern)
+# -----------------------------------------------------------------------------
+REPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "fotobox_reports")
+REPORT_CACHE_MEMORY = 8  # Anzahl PDFs im RAM
+REPORT_CACHE_MAX_AGE_DAYS = 7  # ältere PDFs auf der Platte werden gelöscht
+REPORT_CACHE_MAX_FILES = 200   # höchstens so viele PDFs auf der Platte
+
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def _report_cache_path(digest: str) -> str:
+    return os.path.join(REPORT_CACHE_DIR, f"{digest}.pdf")
+
+def _report_digest(cache_key: tuple) -> str:
+    return hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()
+
+def _cache_lookup(digest: str):
+    with _report_cache_lock:
+        pdf_bytes = _report_cache.get(digest)
+        if pdf_bytes is not None:
+            _report_cache.move_to_end(digest)
+            return pdf_bytes
+    path = _report_cache_path(digest)
+    try:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        os.utime(path)  # genutzte PDFs überleben das Aufräumen
+    except OSError:
+        return None
+    _cache_store(digest, pdf_bytes, write_disk=False)
+    return pdf_bytes
+
+def _prune_disk_cache() -> None:
+    """
+    Löscht PDFs älter als REPORT_CACHE_MAX_AGE_DAYS und danach die ältesten,
+    bis höchstens REPORT_CACHE_MAX_FILES übrig sind. Läuft bei jedem Schreiben.
+    """
+    try:
+        entries = []
+        for entry in os.scandir(REPORT_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith((".pdf", ".tmp")):
+                entries.append((entry.stat().st_mtime, entry.path))
+    except OSError:
+        return
+
+    cutoff = time.time() - REPORT_CACHE_MAX_AGE_DAYS * 86400
+    entries.sort(reverse=True)  # neueste zuerst
+    for i, (mtime, path) in enumerate(entries):
+        if mtime < cutoff or i >= REPORT_CACHE_MAX_FILES:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # parallel schon gelöscht
+
+def _cache_store(digest: str, pdf_bytes: bytes, write_disk: bool = True) -> None:
+    if write_disk:
+        path = _report_cache_path(digest)
+        try:
+            os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Report-Cache nicht schreibbar: {e}")
+        _prune_disk_cache()
+
+    with _report_cache_lock:
+        _report_cache[digest] = pdf_bytes
+        _report_cache.move_to_end(digest)
+        while len(_report_cache) > REPORT_CACHE_MEMORY:
+            _report_cache.popitem(last=False)
+
+
+# -----------------------------------------------------------------------------
+# REPORT JOBS (Rendering im Prozess-Pool, UI bleibt bedienbar)
+# -----------------------------------------------------------------------------
+REPORT_WORKERS = 2
+REPORT_JOB_KEEP_SECONDS = 3600
+
+def _render_report_job(pdf_kwargs: dict) -> bytes:
+    # Läuft im Worker-Prozess
+    return generate_event_pdf(**pdf_kwargs)
+
+class ReportJobRunner:
+    """
+    Rendert Reports in einem Prozess-Pool.
+    submit() kehrt sofort zurück, status()/result() fragen den Job ab.
+    submit() prüft zuerst den Report-Cache (RAM, dann Platte): bereits gecachte
+    Datenstände sind sofort "done", fertige Jobs landen wieder im Cache.
+    cache_key muss den Datenstand beschreiben, z.B. (sheet_id, Drucker,
+    letzter Timestamp, Zeilenzahl, media_factor, max_prints).
+    """
+
+    def __init__(self, max_workers: int = REPORT_WORKERS):
+        self.max_workers = max_workers
+        self._pool = self._new_pool()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def _new_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        # spawn statt fork: der Streamlit-Prozess hat bereits Hintergrund-Threads
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _restart_pool(self, broken) -> None:
+        """
+        Ein abgestürzter Worker (z.B. OOM) macht den ganzen Pool unbrauchbar
+        (BrokenProcessPool) – dann einmal neu aufbauen statt bis zum App-Neustart
+        jeden Report scheitern zu lassen.
+        """
+        with self._pool_lock:
+            if self._pool is not broken:
+                return  # anderer Thread war schneller
+            print("Report-Pool defekt – wird neu gestartet")
+            self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_render(self, pdf_kwargs: dict):
+        # -> (Future, benutzter Pool)
+        pool = self._pool
+        try:
+            return pool.submit(_render_report_job, pdf_kwargs), pool
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            pool = self._pool
+            return pool.submit(_render_report_job, pdf_kwargs), pool
+
+    def submit(self, cache_key: tuple, **pdf_kwargs) -> str:
+        digest = _report_digest(cache_key)
+        job_id = uuid.uuid4().hex
+        job = {"digest": digest, "submitted_at": time.time(), "finished_at": None, "future": None}
+
+        cached = _cache_lookup(digest)
+        if cached is not None:
+            fut = concurrent.futures.Future()
+            fut.set_result(cached)
+            job["future"] = fut
+            job["finished_at"] = job["submitted_at"]
+        else:
+            with self._lock:
+                # Gleicher Datenstand läuft schon -> an diesen Job anhängen
+                for other in self._jobs.values():
+                    if other["digest"] == digest and not other["future"].done():
+                        job["future"] = other["future"]
+                        break
+            if job["future"] is None:
+                job["future"], pool = self._submit_render(pdf_kwargs)
+                job["future"].add_done_callback(lambda f, d=digest, p=pool: self._on_done(d, f, p))
+
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        return job_id
+
+    def _on_done(self, digest: str, fut: concurrent.futures.Future, pool) -> None:
+        if fut.cancelled():
+            return
+        err = fut.exception()
+        if isinstance(err, BrokenProcessPool):
+            # Gleich ersetzen, damit der nächste submit() nicht erst scheitert
+            self._restart_pool(pool)
+            return
+        if err is not None:
+            return
+        _cache_store(digest, fut.result())
+
+    def _prune(self) -> None:
+        # Aufruf unter self._lock
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items()
+                       if job["future"].done() and now - job["submitted_at"] > REPORT_JOB_KEEP_SECONDS]:
+            del self._jobs[job_id]
+
+    def status(self, job_id: str) -> dict:
+        """
+        {"state": queued|running|done|error|unknown, "elapsed": Sekunden, "error": str|None}
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return {"state": "unknown", "elapsed": 0.0, "error": None}
+
+        fut = job["future"]
+        if fut.done():
+            if job["finished_at"] is None:
+                job["finished_at"] = time.time()
+            err = fut.exception()
+            state = "error" if err is not None else "done"
+            elapsed = job["finished_at"] - job["submitted_at"]
+            return {"state": state, "elapsed": elapsed, "error": str(err) if err else None}
+
+        state = "running" if fut.running() else "queued"
+        return {"state": state, "elapsed": time.time() - job["submitted_at"], "error": None}
+
+    def result(self, job_id: str, timeout: float = None) -> bytes:
+        with self._lock:
+            job = self._jobs[job_id]
+        return job["future"].result(timeout=timeout)
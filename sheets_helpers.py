@@ -1,13 +1,30 @@
 # sheets_helpers.py
 
 import datetime
+import threading
+import time
 import pandas as pd
 import gspread
 import streamlit as st
 from google.oauth2.service_account import Credentials
 from gspread.exceptions import WorksheetNotFound
+from gspread.utils import numericise_all
 import concurrent.futures
 
+from data_hub import DataHub
+from status_rules import classify_status
+from local_store import LocalLogStore, SheetSyncWorker
+from event_archive import archive_event
+from ingest_server import IngestFeed
+
+
+@st.cache_resource
+def get_data_hub() -> DataHub:
+    """
+    Ein Snapshot-Hub für alle Sessions dieses Prozesses.
+    """
+    return DataHub()
+
 
 @st.cache_resource
 def get_gspread_client():
@@ -58,15 +75,20 @@ def get_settings_ws(sheet_id: str):
             print(f"Konnte Settings-Sheet nicht erstellen (Rechte fehlen?): {e}")
             raise e
 
-@st.cache_data(ttl=60)
+def _load_settings_uncached(sheet_id: str) -> dict:
+    ws = get_settings_ws(sheet_id)
+    rows = ws.get_all_records()
+    return {row.get("Key"): row.get("Value") for row in rows if row.get("Key")}
+
+
 def load_settings(sheet_id: str):
     """
-    Lädt alle Settings als Dict für das angegebene Sheet.
+    Lädt alle Settings als Dict für das angegebene Sheet (60 s über den Data-Hub geteilt).
     """
     try:
-        ws = get_settings_ws(sheet_id)
-        rows = ws.get_all_records()
-        return {row.get("Key"): row.get("Value") for row in rows if row.get("Key")}
+        return get_data_hub().get(
+            ("settings", sheet_id), lambda: _load_settings_uncached(sheet_id), max_age=60
+        )
     except Exception:
         return {}
 
@@ -97,23 +119,159 @@ def set_setting(key: str, value):
         ws.append_row([key, value_str, now])
 
     # Cache invalidieren
-    load_settings.clear()
+    get_data_hub().invalidate(("settings", sheet_id_local))
+
+
+def _trim_row(row: list) -> list:
+    """
+    Entfernt leere Zellen am Zeilenende (die API liefert diese uneinheitlich).
+    """
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+class SheetTailReader:
+    """
+    Liest das Log-Sheet inkrementell.
+    Merkt sich die zuletzt gelesene Zeile und holt bei jedem Refresh nur
+    den neuen Bereich (A{n+1}:Z). Wurde das Sheet geleert oder neu befüllt
+    (z.B. durch clear_google_sheet), wird komplett neu geladen.
+    """
+
+    def __init__(self, worksheet_getter):
+        self._get_ws = worksheet_getter
+        self._lock = threading.Lock()
+        self.generation = 0     # zählt Neuaufbauten, damit Spiegel (LocalLogStore) Resets erkennen
+        self.reset()
+
+    def reset(self):
+        self.generation += 1
+        self.headers = []
+        self.rows_seen = 0      # 1-basierte Nummer der zuletzt gelesenen Zeile (inkl. Header)
+        self.anchor_row = None  # Inhalt dieser Zeile, um Resets zu erkennen
+        self.df = pd.DataFrame()
+
+    def _to_frame(self, rows: list) -> pd.DataFrame:
+        records = []
+        width = len(self.headers)
+        for row in rows:
+            row = _trim_row(row)
+            if not row:
+                continue
+            row = (row + [""] * width)[:width]
+            records.append(numericise_all(row))
+        return pd.DataFrame(records, columns=self.headers)
+
+    def _full_reload(self, ws) -> pd.DataFrame:
+        values = ws.get_values()
+        self.reset()
+        if not values:
+            return self.df
+        self.headers = _trim_row(values[0])
+        self.rows_seen = len(values)
+        self.anchor_row = _trim_row(values[-1])
+        self.df = self._to_frame(values[1:])
+        return self.df
+
+    def read(self) -> pd.DataFrame:
+        with self._lock:
+            try:
+                ws = self._get_ws()
+                if not self.headers:
+                    return self._full_reload(ws)
+
+                # Ein Request: letzte bekannte Zeile (Reset-Check) + alles danach
+                n = self.rows_seen
+                anchor_vr, new_vr = ws.batch_get([f"A{n}:Z{n}", f"A{n + 1}:Z"])
+                anchor = _trim_row(anchor_vr[0]) if anchor_vr else []
+                if anchor != self.anchor_row:
+                    # Sheet wurde geleert / geschrumpft -> neu aufbauen
+                    return self._full_reload(ws)
+
+                new_rows = list(new_vr)
+                if new_rows:
+                    self.rows_seen = n + len(new_rows)
+                    self.anchor_row = _trim_row(new_rows[-1])
+                    new_df = self._to_frame(new_rows)
+                    if not new_df.empty:
+                        self.df = pd.concat([self.df, new_df], ignore_index=True)
+                return self.df
+            except Exception:
+                self.reset()
+                raise
+
+
+@st.cache_resource
+def get_tail_reader(sheet_id: str) -> SheetTailReader:
+    """
+    Ein inkrementeller Reader pro Sheet (prozessweit geteilt).
+    """
+    return SheetTailReader(lambda: get_spreadsheet(sheet_id).sheet1)
+
 
+@st.cache_resource
+def get_sync_worker() -> SheetSyncWorker:
+    """
+    Lokaler SQLite-Spiegel + Sync-Thread, einmal pro Prozess.
+    Nach jedem Sync wird der neue Log-Snapshot im Data-Hub veröffentlicht.
+    """
+    hub = get_data_hub()
+    store = LocalLogStore()
+
+    def publish(sheet_id: str, changed: bool, frame: pd.DataFrame):
+        # Inkrementell gepflegter Frame des Workers, kein Neuaufbau aus SQLite
+        if changed:
+            hub.publish(("log", sheet_id), frame)
+        else:
+            hub.touch(("log", sheet_id))
+
+    worker = SheetSyncWorker(store, on_synced=publish)
+
+    # Optional: Zeilen direkt vom Ingest-Server übernehmen (Long-Poll statt Sheets-Poll)
+    ingest_cfg = st.secrets.get("ingest", {})
+    if ingest_cfg.get("url"):
+        IngestFeed(ingest_cfg["url"], ingest_cfg.get("token"), on_rows=worker.apply_ingested).start()
+    return worker
+
+
+def read_local_log(sheet_id: str) -> pd.DataFrame:
+    """
+    Liefert den aktuellen Log-Frame des Sync-Workers. Beim allerersten Zugriff
+    auf ein Sheet wird einmal synchron synchronisiert, danach übernimmt der Worker.
+    Ist das Sheet dabei nicht erreichbar, dient der SQLite-Spiegel als Notlösung.
+    """
+    worker = get_sync_worker()
+    worker.register(sheet_id, get_tail_reader(sheet_id))
+    frame = worker.frame(sheet_id)
+    if frame is not None:
+        return frame
+    try:
+        worker.sync_now(sheet_id)
+    except Exception as e:
+        print(f"Sync fehlgeschlagen, nutze lokalen Spiegel ({sheet_id}): {e}")
+        return worker.store.read_log(sheet_id)
+    frame = worker.frame(sheet_id)
+    return frame if frame is not None else pd.DataFrame()
 
-@st.cache_data(ttl=600)  # 10 Minuten Cache für Admin / Historie (High TTL)
+
+# Der zurückgegebene DataFrame ist ein geteilter Snapshot -> nicht in-place verändern!
 def get_data_admin(sheet_id: str):
     try:
-        ws = get_spreadsheet(sheet_id).sheet1
-        return pd.DataFrame(ws.get_all_records())
+        # Jeder Lesezugriff hält das Sheet im Sync-Worker aktiv (sonst pausiert er es)
+        get_sync_worker().mark_read(sheet_id)
+        # 10 Minuten Toleranz für Admin / Historie (High TTL)
+        return get_data_hub().get(("log", sheet_id), lambda: read_local_log(sheet_id), max_age=600)
     except Exception:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=15)  # 15 Sekunden Cache für Event-Ansicht / Screensaver
 def get_data_event(sheet_id: str):
     try:
-        ws = get_spreadsheet(sheet_id).sheet1
-        return pd.DataFrame(ws.get_all_records())
+        get_sync_worker().mark_read(sheet_id)
+        # 15 Sekunden für Event-Ansicht / Screensaver
+        return get_data_hub().get(("log", sheet_id), lambda: read_local_log(sheet_id), max_age=15)
     except Exception:
         return pd.DataFrame()
 
@@ -128,18 +286,59 @@ def get_data(sheet_id: str, event_mode: bool):
         return get_data_admin(sheet_id)
 
 
-def clear_google_sheet():
+def _last_reset_info(sh) -> dict:
+    """
+    Letzter Eintrag im Meta-Sheet (= Beginn des laufenden Events), {} wenn keiner.
+    """
+    try:
+        values = sh.worksheet("Meta").get_values()
+    except WorksheetNotFound:
+        return {}
+    if len(values) < 2:
+        return {}
+    return _row_to_dict(_trim_row(values[0]), list(values[-1]))
+
+
+def archive_current_log(printer_key: str, package_size=None, note: str = ""):
+    """
+    Sichert das aktuelle Log (frisch aus dem Sheet, nicht aus dem Spiegel)
+    als Event-Datei im lokalen Archiv. Liefert den Pfad oder None (leeres Log).
+    """
+    sheet_id = st.session_state.sheet_id
+    sh = get_spreadsheet(sheet_id)
+    values = sh.sheet1.get_values()
+    if len(values) < 2:
+        return None
+    headers = _trim_row(values[0])
+    df = pd.DataFrame([_row_to_dict(headers, list(r)) for r in values[1:] if _trim_row(r)], columns=headers)
+    reset = {"Timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+             "PackageSize": package_size, "Note": note}
+    return archive_event(df, printer_key, sheet_id, started=_last_reset_info(sh), reset=reset)
+
+
+def clear_google_sheet(printer_key: str = None, package_size=None, note: str = ""):
     """
     Löscht die Log-Daten (A2:Z10000) im aktuellen Sheet.
+    Mit printer_key wird das Log vorher ins Event-Archiv geschrieben;
+    schlägt das fehl, wird NICHT gelöscht.
     """
     try:
+        if printer_key:
+            try:
+                archive_current_log(printer_key, package_size, note)
+            except Exception as e:
+                st.error(f"Archivierung fehlgeschlagen – Log wurde NICHT gelöscht: {e}")
+                return False
         ws = get_main_worksheet()
         ws.batch_clear(["A2:Z10000"])
-        get_data_admin.clear()
-        get_data_event.clear()
+        get_tail_reader(st.session_state.sheet_id).reset()
+        get_data_hub().invalidate(("log", st.session_state.sheet_id))
+        get_sync_worker().sync_now(st.session_state.sheet_id)
         st.toast("Log erfolgreich zurückgesetzt!", icon="♻️")
+        return True
     except Exception as e:
         st.error(f"Fehler beim Reset: {e}")
+        return False
 
 
 def log_reset_event(package_size: int, note: str = ""):
@@ -160,58 +359,111 @@ def log_reset_event(package_size: int, note: str = ""):
         meta_ws.append_row(
             [datetime.datetime.now().isoformat(timespec="seconds"), package_size, note]
         )
+        get_data_hub().invalidate(("meta", sheet_id_local))
     except Exception as e:
         st.warning(f"Reset konnte nicht im Meta-Log gespeichert werden: {e}")
 
+def _load_reset_events_uncached(sheet_id: str) -> pd.DataFrame:
+    try:
+        values = get_spreadsheet(sheet_id).worksheet("Meta").get_values()
+    except WorksheetNotFound:
+        values = []
+    if len(values) < 2:
+        return pd.DataFrame(columns=["Timestamp", "PackageSize", "Note"])
+    headers = _trim_row(values[0])
+    return pd.DataFrame([_row_to_dict(headers, list(r)) for r in values[1:] if _trim_row(r)], columns=headers)
+
+
+def load_reset_events(sheet_id: str) -> pd.DataFrame:
+    """
+    Alle Resets aus dem Meta-Sheet (Timestamp / PackageSize / Note), 5 Minuten geteilt.
+    Der DataFrame ist ein geteilter Snapshot -> nicht in-place verändern!
+    """
+    try:
+        return get_data_hub().get(
+            ("meta", sheet_id), lambda: _load_reset_events_uncached(sheet_id), max_age=300
+        )
+    except Exception:
+        return pd.DataFrame(columns=["Timestamp", "PackageSize", "Note"])
+
 # --- NEUE PERFORMANCE FUNKTION ---
+# Header-Zeile + Zeilenzahl pro Sheet, damit der Fast-Path nur EINEN Request braucht
+HEADER_CACHE_SECONDS = 300
+_latest_row_cache = {}  # sheet_id -> {"headers": [...], "headers_at": float, "num_rows": int}
+_latest_row_lock = threading.Lock()
+
+
+def _row_to_dict(headers: list, row: list) -> dict:
+    if len(row) < len(headers):
+        # Padding falls leere Zellen am Ende
+        row = row + [""] * (len(headers) - len(row))
+    return dict(zip(headers, row))
+
+
 def fetch_latest_status_only(sheet_id: str):
     """
     Liest NUR die allerletzte Zeile aus dem Sheet.
     Umgeht get_all_records() und ist extrem schnell.
+
+    Header und zuletzt bekannte Zeilenzahl n werden pro Sheet gecached.
+    Im Normalfall reicht dann ein batch_get über A{n}:Z (nur die seit dem
+    letzten Aufruf neuen Zeilen). Nur wenn der Bereich leer ist (Sheet geleert)
+    wird einmal über col_values(1) neu gezählt.
     """
     try:
         ws = get_spreadsheet(sheet_id).sheet1
-        
-        # Metadata Trick: col_values(1) ist meist sehr schnell gecached bei Google
-        col_a = ws.col_values(1)
-        num_rows = len(col_a)
-        
-        if num_rows < 2:
-            return None # Nur Header oder leer
-            
-        # Wir holen nur den Bereich der letzten Zeile (z.B. A500:F500)
-        # Annahme: Spalten A bis F reichen (Timestamp, MediaRemaining, Status...)
-        raw_vals = ws.get_values(f"A{num_rows}:Z{num_rows}")
-        
-        if not raw_vals:
+
+        with _latest_row_lock:
+            entry = dict(_latest_row_cache.get(sheet_id, {}))
+        headers = entry.get("headers")
+        num_rows = entry.get("num_rows")
+        need_headers = not headers or time.monotonic() - entry.get("headers_at", 0) > HEADER_CACHE_SECONDS
+
+        row = None
+        if num_rows:
+            ranges = [f"A{num_rows}:Z"]
+            if need_headers:
+                ranges.append("A1:Z1")
+            res = ws.batch_get(ranges)
+            tail = list(res[0])
+            if need_headers:
+                headers = _trim_row(res[1][0]) if res[1] else []
+            if tail:
+                # A{n}:Z reicht bis zum Sheet-Ende -> letzte Zeile ist immer aktuell
+                num_rows = num_rows + len(tail) - 1
+                row = tail[-1]
+
+        if row is None:
+            # Slow-Path: Zeilen neu zählen (erster Aufruf oder Sheet wurde geleert)
+            num_rows = len(ws.col_values(1))
+            if num_rows < 2:
+                with _latest_row_lock:
+                    _latest_row_cache.pop(sheet_id, None)
+                return None  # Nur Header oder leer
+            res = ws.batch_get([f"A{num_rows}:Z{num_rows}", "A1:Z1"])
+            row = res[0][0] if res[0] else []
+            headers = _trim_row(res[1][0]) if res[1] else []
+            need_headers = True
+
+        if num_rows < 2 or not row:
             return None
-            
-        row = raw_vals[0]
-        
-        # Mapping basierend auf Standard-Struktur
-        # Falls Header variieren, müsste man Zeile 1 cachen. 
-        # Hier gehen wir von Standard Indizes aus:
-        # A=Timestamp, B=MediaRemaining, C=Status (Beispiel)
-        # Sicherer: Wir suchen im Code nach Key-Names, daher mappen wir hier generisch
-        # Da wir im Interface "Status" und "MediaRemaining" brauchen, müssen wir wissen wo die stehen.
-        # Fallback: Wir nutzen get_data_event wenn wir sicher sein wollen, aber für Fleet Overview reicht Speed.
-        
-        # Um es robust zu machen, holen wir Header EINMALIG (gecached in gspread)
-        # und mappen dann.
-        headers = ws.row_values(1)
-        
-        # Zip Header und Row zu Dict
-        if len(row) < len(headers):
-             # Padding falls leere Zellen am Ende
-             row += [""] * (len(headers) - len(row))
-             
-        return dict(zip(headers, row))
-        
+
+        with _latest_row_lock:
+            new_entry = {"headers": headers, "num_rows": num_rows,
+                         "headers_at": entry.get("headers_at", 0)}
+            if need_headers:
+                new_entry["headers_at"] = time.monotonic()
+            _latest_row_cache[sheet_id] = new_entry
+
+        return _row_to_dict(headers, list(row))
+
     except Exception as e:
         # Fallback auf langsamen Weg, falls Fast-Path crasht
+        with _latest_row_lock:
+            _latest_row_cache.pop(sheet_id, None)
         return None
 
-def fetch_single_status(sheet_id: str, printer_key: str, media_factor: int):
+def fetch_single_status(sheet_id: str, printer_key: str, media_factor: int, warning_threshold: int = 20):
     """
     Hilfsfunktion für den Thread-Worker: Lädt Daten für EINE Box
     """
@@ -221,7 +473,10 @@ def fetch_single_status(sheet_id: str, printer_key: str, media_factor: int):
     try:
         # HIER DIE ÄNDERUNG: Nutze den Fast-Reader statt get_data_event
         # Das spart Zeit beim Parsen von Tausenden Zeilen
-        last_data = fetch_latest_status_only(sheet_id)
+        # Über den Data-Hub: mehrere Tabs / Kiosk-Screens teilen sich einen Request
+        last_data = get_data_hub().get(
+            ("latest", sheet_id), lambda: fetch_latest_status_only(sheet_id), max_age=10
+        )
         
         if not last_data:
             # Fallback falls Fast-Read fehlschlägt (z.B. leeres Blatt)
@@ -239,13 +494,8 @@ def fetch_single_status(sheet_id: str, printer_key: str, media_factor: int):
         except:
             media_val = 0
             
-        # Status Logik vereinfacht für Übersicht
-        if any(x in raw_status for x in ["error", "jam", "end", "fehlt"]):
-            state = "error"
-        elif "printing" in raw_status:
-            state = "printing"
-        else:
-            state = "ready"
+        # Gleiche Regeln wie Live-Ansicht und Monitor
+        state = classify_status(raw_status, media_val, warning_threshold)
             
         return printer_key, {
             "state": state,
@@ -256,30 +506,94 @@ def fetch_single_status(sheet_id: str, printer_key: str, media_factor: int):
     except Exception as e:
         return printer_key, None
 
-def get_fleet_data_parallel(printers_config: dict, secrets_printers: dict) -> dict:
+# Langlebiger Pool für Fleet-Abfragen (statt pro Rerun einen neuen zu starten)
+FLEET_WORKERS = 8
+_fleet_executor = concurrent.futures.ThreadPoolExecutor(max_workers=FLEET_WORKERS, thread_name_prefix="fleet")
+
+
+def get_fleet_data_parallel(printers_config: dict, secrets_printers: dict, executor=None) -> dict:
     """
     Lädt alle Fotobox-Statuswerte PARALLEL.
     """
     results = {}
+    executor = executor or _fleet_executor
+    future_to_printer = {}
     
-    # ThreadPoolExecutor erstellt einen Pool von Worker-Threads
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_printer = {}
+    for name, cfg in printers_config.items():
+        key = cfg["key"]
+        s_id = secrets_printers.get(key, {}).get("sheet_id")
+        media_factor = cfg.get("media_factor", 1)
+        threshold = cfg.get("warning_threshold", 20)
         
-        for name, cfg in printers_config.items():
-            key = cfg["key"]
-            s_id = secrets_printers.get(key, {}).get("sheet_id")
-            media_factor = cfg.get("media_factor", 1)
-            
-            future = executor.submit(fetch_single_status, s_id, name, media_factor)
-            future_to_printer[future] = name
+        future = executor.submit(fetch_single_status, s_id, name, media_factor, threshold)
+        future_to_printer[future] = name
 
-        for future in concurrent.futures.as_completed(future_to_printer):
-            printer_name = future_to_printer[future]
-            try:
-                key_check, data = future.result()
-                results[printer_name] = data
-            except Exception:
-                results[printer_name] = None
+    for future in concurrent.futures.as_completed(future_to_printer):
+        printer_name = future_to_printer[future]
+        try:
+            key_check, data = future.result()
+            results[printer_name] = data
+        except Exception:
+            results[printer_name] = None
                 
     return results
+
+
+FLEET_REFRESH_SECONDS = 30  # 50 Boxen -> ~100 Sheets-Reads/Minute
+FLEET_IDLE_SECONDS = 300    # ohne Leser wird nicht mehr gepollt
+
+
+class FleetStatusService:
+    """
+    Hält einen laufend aktualisierten Snapshot aller Boxen im Speicher.
+    Ein Hintergrund-Thread frischt alle FLEET_REFRESH_SECONDS auf,
+    solange in den letzten FLEET_IDLE_SECONDS jemand den Snapshot gelesen hat.
+    """
+
+    def __init__(self, interval: float = FLEET_REFRESH_SECONDS):
+        self.interval = interval
+        self._printers = {}
+        self._secrets = {}
+        self._snapshot = {}
+        self._updated_at = None
+        self._last_read = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def configure(self, printers_config: dict, secrets_printers: dict) -> None:
+        with self._lock:
+            self._printers = dict(printers_config)
+            self._secrets = dict(secrets_printers)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="fleet-status", daemon=True)
+                self._thread.start()
+
+    def refresh_now(self) -> None:
+        with self._lock:
+            printers, secrets = self._printers, self._secrets
+        data = get_fleet_data_parallel(printers, secrets)
+        with self._lock:
+            self._snapshot = data
+            self._updated_at = time.time()
+
+    def snapshot(self):
+        """
+        (Status pro Box, Zeitpunkt der letzten Aktualisierung) – reiner Speicherzugriff.
+        """
+        with self._lock:
+            self._last_read = time.monotonic()
+            return dict(self._snapshot), self._updated_at
+
+    def _run(self) -> None:
+        while True:
+            if time.monotonic() - self._last_read < FLEET_IDLE_SECONDS:
+                try:
+                    self.refresh_now()
+                except Exception as e:
+                    print(f"Fleet Refresh Fehler: {e}")
+            time.sleep(self.interval)
+
+
+@st.cache_resource
+def get_fleet_service() -> FleetStatusService:
+    return FleetStatusService()
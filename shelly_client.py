@@ -1,9 +1,97 @@
 # shelly_client.py
+import os
+import threading
+import time
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable
+
+from http_session import build_session
+
+SHELLY_CLOUD_URL = "https://shelly-api-eu.shelly.cloud"
+SHELLY_JRPC_URL = "https://shelly-api-eu.shelly.cloud:6022/jrpc"
+
+# Für Lasttests gegen mock_servers.py: überschreibt die Cloud-URL aus den Settings
+SHELLY_URL_OVERRIDE = os.environ.get("SHELLY_CLOUD_URL")
+
+# Shelly Cloud: ca. 1 Request/Sekunde pro Account (Auth-Key). Für Lasttests per Env änderbar.
+# Der Limiter gilt pro PROZESS: laufen App und monitor.py gegen denselben Account,
+# das Budget per Env aufteilen (z.B. beide Prozesse mit SHELLY_RATE_PER_SEC=0.5).
+SHELLY_RATE_PER_SEC = float(os.environ.get("SHELLY_RATE_PER_SEC", "1.0"))
+
+# Cloud-API v2: Status mehrerer Geräte in EINEM Request (max. 10 IDs pro Aufruf)
+SHELLY_V2_STATUS_PATH = "/v2/devices/api/get"
+SHELLY_V2_MAX_IDS = 10
+
+class AccountRateLimiter:
+    """
+    Gleichmäßiger Abstand zwischen Requests eines Accounts (innerhalb eines Prozesses).
+    acquire() blockiert, bis der nächste Slot frei ist. acquire(wait=False) belegt
+    den Slot nur (Schalt-Klicks sollen nicht hinter Status-Polls warten) – die
+    nachfolgenden Requests rücken dafür nach hinten.
+    """
+
+    def __init__(self, rate_per_sec: float = SHELLY_RATE_PER_SEC):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self, wait: bool = True) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if wait and slot > now:
+            time.sleep(slot - now)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def account_limiter(auth_key: str) -> AccountRateLimiter:
+    """
+    Ein Limiter pro Auth-Key und Prozess – alle Sessions und Fragmente der App
+    (bzw. alle Checks in monitor.py) desselben Accounts teilen sich das Cloud-Limit.
+    Zwischen App und Monitor wird NICHT koordiniert, siehe SHELLY_RATE_PER_SEC.
+    """
+    key = (auth_key or "").strip()
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = AccountRateLimiter()
+        return limiter
+
+def jrpc_url(cloud_url: Optional[str]) -> str:
+    """
+    Endpoint für Shelly.Call (JSON-RPC). Ohne gültige URL -> EU-Cloud.
+    """
+    if SHELLY_URL_OVERRIDE:
+        return SHELLY_URL_OVERRIDE.rstrip("/") + "/jrpc"
+    if not cloud_url or not cloud_url.startswith("http"):
+        return SHELLY_JRPC_URL
+    return cloud_url
+
+def _normalize_status(is_online: bool, source_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Gemeinsame Form für v1 (/device/status) und v2 (/v2/devices/api/get).
+    """
+    normalized = {"_is_online": is_online}
+    # Nur relevante Switch-Daten übernehmen
+    found_switches = False
+    for k, v in source_data.items():
+        if k.startswith("switch:") or k.startswith("sys"):
+            normalized[k] = v
+            found_switches = True
+            
+    # Wenn wir Switches gefunden haben, geben wir diese zurück + Online Status
+    # Wenn nicht, geben wir die Rohdaten zurück + Online Status
+    if found_switches:
+        return normalized
+        
+    source_data["_is_online"] = is_online
+    return source_data
 
 class ShellyClient:
-    def __init__(self, cloud_url: str, auth_key: str, default_device_id: str):
+    def __init__(self, cloud_url: str, auth_key: str, default_device_id: str, session: Optional[requests.Session] = None):
+        cloud_url = SHELLY_URL_OVERRIDE or cloud_url or SHELLY_CLOUD_URL
         self.base_url = cloud_url.strip().rstrip("/")
         # URL Bereinigung für verschiedene API Endpoints
         if ":6022" in self.base_url:
@@ -16,8 +104,11 @@ class ShellyClient:
         self.auth_key = auth_key.strip()
         self.default_device_id = default_device_id.strip()
         self.timeout = 3.0 # Etwas erhöht für Stabilität
+        # Eigene Session -> TCP/TLS-Verbindung bleibt zwischen den Polls offen
+        self.session = session or build_session()
+        self.limiter = account_limiter(self.auth_key)
 
-    def _post(self, endpoint: str, params: Dict[str, Any], override_device_id: str = None) -> Optional[Dict]:
+    def _post(self, endpoint: str, params: Dict[str, Any], override_device_id: str = None, wait: bool = True) -> Optional[Dict]:
         url = f"{self.base_url}{endpoint}"
         target_id = override_device_id if override_device_id else self.default_device_id
         
@@ -28,7 +119,8 @@ class ShellyClient:
         data.update(params)
         
         try:
-            response = requests.post(url, data=data, timeout=self.timeout)
+            self.limiter.acquire(wait=wait)
+            response = self.session.post(url, data=data, timeout=self.timeout)
             if response.status_code == 200:
                 try:
                     json_resp = response.json()
@@ -50,31 +142,51 @@ class ShellyClient:
             return {"_is_online": False} # API Fehler -> Als Offline werten
             
         # WICHTIG: Prüfen ob Gerät online ist
-        is_online = data.get("online", False)
-        
-        source_data = data.get("device_status", data)
-            
-        normalized = {"_is_online": is_online}
-        
-        # Nur relevante Switch-Daten übernehmen
-        found_switches = False
-        for k, v in source_data.items():
-            if k.startswith("switch:") or k.startswith("sys"):
-                normalized[k] = v
-                found_switches = True
-                
-        # Wenn wir Switches gefunden haben, geben wir diese zurück + Online Status
-        # Wenn nicht, geben wir die Rohdaten zurück + Online Status
-        if found_switches:
-            return normalized
-            
-        source_data["_is_online"] = is_online
-        return source_data
+        return _normalize_status(bool(data.get("online", False)), data.get("device_status", data))
+
+    def get_status_many(self, device_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Holt den Status mehrerer Geräte (gleiche Form wie get_status), doppelte IDs nur einmal.
+        Über die v2-API: ein Request pro SHELLY_V2_MAX_IDS Geräte statt einem pro Gerät,
+        die Dauer hängt damit kaum noch von der Geräteanzahl ab.
+        Fehlt ein Gerät in der Antwort oder schlägt der Request fehl -> Offline.
+        """
+        ids = list(dict.fromkeys(d.strip() for d in device_ids if d and d.strip()))
+        result = {}
+        for i in range(0, len(ids), SHELLY_V2_MAX_IDS):
+            chunk = ids[i:i + SHELLY_V2_MAX_IDS]
+            found = self._get_status_v2(chunk)
+            for device_id in chunk:
+                result[device_id] = found.get(device_id) or {"_is_online": False}
+        return result
+
+    def _get_status_v2(self, ids: list) -> Dict[str, Dict[str, Any]]:
+        url = f"{self.base_url}{SHELLY_V2_STATUS_PATH}"
+        try:
+            self.limiter.acquire()
+            response = self.session.post(
+                url, params={"auth_key": self.auth_key},
+                json={"ids": ids, "select": ["status"]}, timeout=self.timeout,
+            )
+            if response.status_code != 200:
+                return {}
+            devices = response.json()
+        except Exception:
+            return {}
+        if not isinstance(devices, list):
+            return {}
+
+        found = {}
+        for dev in devices:
+            if isinstance(dev, dict) and dev.get("id"):
+                found[dev["id"]] = _normalize_status(bool(dev.get("online")), dict(dev.get("status") or {}))
+        return found
 
     def set_switch(self, channel: int, turn_on: bool, specific_device_id: str = None) -> bool:
         params = {
             "channel": channel,
             "turn": "on" if turn_on else "off"
         }
-        res = self._post("/device/relay/control", params, override_device_id=specific_device_id)
+        # Klick im UI: nicht hinter Status-Polls einreihen
+        res = self._post("/device/relay/control", params, override_device_id=specific_device_id, wait=False)
         return res is not None
@@ -2,15 +2,18 @@
 
 import time
 import datetime
+import threading
+import numpy as np
 import pandas as pd
-import pytz
 import streamlit as st
 
-# Lokale Zeitzone für Heartbeat
-LOCAL_TZ = pytz.timezone("Europe/Vienna")
-
-# nach X Minuten ohne Daten -> stale
-HEARTBEAT_WARN_MINUTES = 60
+from status_rules import (
+    PushState,
+    derive_status,
+    next_push,
+)
+from print_events import IncrementalFeed, PrintRollup
+from paper_forecast import RunoutForecaster
 
 # Sound für Warnungen
 ALERT_SOUND_URL = "https://actions.google.com/sounds/v1/alarms/medium_severity_alert.ogg"
@@ -85,6 +88,152 @@ def compute_print_stats(
     return result
 
 
+class PrintStatsEngine:
+    """
+    Inkrementelle Variante von compute_print_stats für EIN Sheet.
+    Hält Timestamps (int64 ns) und MediaRemaining als sortierte numpy-Arrays,
+    parst bei jedem update() nur die neuen Zeilen und beantwortet das
+    Zeitfenster per Binärsuche (searchsorted) statt per Masken-Filter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feed = IncrementalFeed()
+        self._reset()
+
+    def _reset(self):
+        self._ts = np.empty(256, dtype="int64")
+        self._media = np.empty(256, dtype="float64")
+        self._n = 0
+
+    def _append(self, ts_new: np.ndarray, media_new: np.ndarray):
+        k = len(ts_new)
+        if k == 0:
+            return
+        need = self._n + k
+        if need > len(self._ts):
+            cap = max(need, 2 * len(self._ts))
+            self._ts = np.resize(self._ts, cap)
+            self._media = np.resize(self._media, cap)
+
+        in_order = self._n == 0 or ts_new[0] >= self._ts[self._n - 1]
+        if in_order and (k < 2 or np.all(ts_new[1:] >= ts_new[:-1])):
+            self._ts[self._n:need] = ts_new
+            self._media[self._n:need] = media_new
+        else:
+            # Selten: Zeilen außer Reihenfolge -> einmal stabil neu sortieren
+            ts_all = np.concatenate([self._ts[:self._n], ts_new])
+            media_all = np.concatenate([self._media[:self._n], media_new])
+            order = np.argsort(ts_all, kind="stable")
+            self._ts[:need] = ts_all[order]
+            self._media[:need] = media_all[order]
+        self._n = need
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Übernimmt neue Zeilen aus dem (wachsenden) Log-DataFrame.
+        Wird das Log kürzer oder ändert sich die erste Zeile, wird neu aufgebaut.
+        """
+        with self._lock:
+            reset, ts_ns, media = self._feed.take(df)
+            if reset:
+                self._reset()
+            self._append(ts_ns, media)
+
+    def stats(self, window_min: int = 30, media_factor: int = 2) -> dict:
+        """
+        Gleiche Kennzahlen wie compute_print_stats, in O(log n).
+        """
+        result = {
+            "prints_total": 0,
+            "duration_min": 0,
+            "ppm_overall": None,
+            "ppm_window": None,
+        }
+        with self._lock:
+            n = self._n
+            if n < 2:
+                return result
+            ts = self._ts[:n]
+            media = self._media[:n]
+
+            prints_total = max(0, (media[0] - media[-1]) * media_factor)
+            duration_min = (ts[-1] - ts[0]) / 60e9
+
+            result["prints_total"] = prints_total
+            result["duration_min"] = duration_min
+            if duration_min > 0 and prints_total > 0:
+                result["ppm_overall"] = prints_total / duration_min
+
+            # Fenster (z.B. letzte 30 Minuten) per Binärsuche
+            start = np.searchsorted(ts, ts[-1] - int(window_min * 60e9), side="left")
+            if n - start >= 2:
+                prints_win = max(0, (media[start] - media[-1]) * media_factor)
+                dur_win_min = (ts[-1] - ts[start]) / 60e9
+                if dur_win_min > 0 and prints_win > 0:
+                    result["ppm_window"] = prints_win / dur_win_min
+
+        return result
+
+
+@st.cache_resource
+def get_stats_engine(sheet_id: str) -> PrintStatsEngine:
+    """
+    Ein PrintStatsEngine pro Sheet (prozessweit geteilt).
+    """
+    return PrintStatsEngine()
+
+
+def compute_print_stats_incremental(
+    sheet_id: str,
+    df: pd.DataFrame,
+    window_min: int = 30,
+    media_factor: int = 2,
+) -> dict:
+    """
+    Wie compute_print_stats, aber über den gecachten PrintStatsEngine des Sheets:
+    pro Aufruf werden nur neue Zeilen geparst.
+    """
+    engine = get_stats_engine(sheet_id)
+    engine.update(df)
+    return engine.stats(window_min=window_min, media_factor=media_factor)
+
+
+@st.cache_resource
+def get_print_rollup(sheet_id: str, media_factor: float) -> PrintRollup:
+    """
+    Ein PrintRollup pro Sheet und media_factor (prozessweit geteilt).
+    """
+    return PrintRollup(media_factor=media_factor)
+
+
+def update_print_rollup(sheet_id: str, df: pd.DataFrame, media_factor: float) -> PrintRollup:
+    """
+    Übernimmt neue Log-Zeilen in den Rollup des Sheets und gibt ihn zurück.
+    """
+    rollup = get_print_rollup(sheet_id, media_factor)
+    rollup.update(df)
+    return rollup
+
+
+@st.cache_resource
+def get_runout_forecaster(sheet_id: str, media_factor: float) -> RunoutForecaster:
+    """
+    Ein RunoutForecaster pro Sheet und media_factor (prozessweit geteilt,
+    Hero-Card und Bildschirmschoner lesen denselben Zustand).
+    """
+    return RunoutForecaster(media_factor=media_factor)
+
+
+def update_runout_forecast(sheet_id: str, df: pd.DataFrame, media_factor: float, media_remaining: float):
+    """
+    Übernimmt neue Log-Zeilen und liefert die Papier-Prognose (RunoutForecast oder None).
+    """
+    forecaster = get_runout_forecaster(sheet_id, media_factor)
+    forecaster.update(df)
+    return forecaster.forecast(media_remaining)
+
+
 def humanize_minutes(minutes: float) -> str:
     """
     Formatiert Minuten als schönen String.
@@ -107,145 +256,23 @@ def evaluate_status(raw_status: str, media_remaining: int, timestamp: str, maint
     Parameter maintenance_active unterdrückt Stale-Warnungen.
     Parameter warning_threshold bestimmt, wann 'Wenig Papier' ausgelöst wird.
     """
-    raw_status_l = (raw_status or "").lower().strip()
-
-    hard_errors = [
-        "paper end",
-        "ribbon end",
-        "paper jam",
-        "ribbon error",
-        "paper definition error",
-        "data error",
-    ]
-
-    cover_open_kw = ["cover open"]
-    cooldown_kw = ["head cooling down"]
-    printing_kw = ["printing", "processing", "drucken"]
-    idle_kw = ["idle", "standby mode"]
-
-    # 0) Spezialfall: Drucker offline / unbekannt (-1)
-    # WICHTIG: Das muss vor allen anderen Checks stehen!
-    if media_remaining < 0:
-        status_mode = "offline"
-        display_text = "🔌 Drucker offline (-1)"
-        display_color = "slate"  # "slate" macht es grau, "red" würde es rot machen
-
-    
-    # 1) Harte Fehler (haben Vorrang, auch im Wartungsmodus)
-    elif any(k in raw_status_l for k in hard_errors):
-        status_mode = "error"
-        display_text = f"🔴 STÖRUNG: {raw_status}"
-        display_color = "red"
-
-    # 2) Cover Open
-    elif any(k in raw_status_l for k in cover_open_kw):
-        status_mode = "cover_open"
-        display_text = "⚠️ Deckel offen!"
-        display_color = "orange"
-
-    # 3) Druckkopf kühlt ab
-    elif any(k in raw_status_l for k in cooldown_kw):
-        status_mode = "cooldown"
-        display_text = "⏳ Druckkopf kühlt ab…"
-        display_color = "orange"
-
-    # 4) Papier fast leer (Nutzt jetzt den Threshold!)
-    elif media_remaining <= warning_threshold:
-        status_mode = "low_paper"
-        display_text = f"⚠️ Papier fast leer (<{warning_threshold})!"
-        display_color = "orange"
-
-    # 5) Druckt gerade
-    elif any(k in raw_status_l for k in printing_kw):
-        status_mode = "printing"
-        display_text = "🖨️ Druckt gerade…"
-        display_color = "blue"
-
-    # 6) Leerlauf
-    elif any(k in raw_status_l for k in idle_kw) or raw_status_l == "":
-        status_mode = "ready"
-        display_text = "✅ Bereit"
-        display_color = "green"
-
-    else:
-        status_mode = "ready"
-        display_text = f"✅ Bereit ({raw_status})"
-        display_color = "green"
-
-    # HEARTBEAT CHECK
-    minutes_diff = None
-    ts_parsed = pd.to_datetime(timestamp, errors="coerce")
-
-    if pd.notna(ts_parsed):
-        if ts_parsed.tzinfo is None:
-            ts_parsed = LOCAL_TZ.localize(ts_parsed)
-        else:
-            ts_parsed = ts_parsed.astimezone(LOCAL_TZ)
-
-        now_local = datetime.datetime.now(LOCAL_TZ)
-        delta = now_local - ts_parsed
-        minutes_diff = int(delta.total_seconds() // 60)
-
-        # Wenn zu lange keine Daten und KEIN Fehler vorliegt
-        if minutes_diff >= HEARTBEAT_WARN_MINUTES and status_mode not in ["error"]:
-            if maintenance_active:
-                status_mode = "maintenance"
-                display_text = "Box im Lager / Wartung"
-                display_color = "slate"
-            else:
-                status_mode = "stale"
-                display_text = "⚠️ Keine aktuellen Daten"
-                display_color = "orange"
-
-    # PUSH LOGIK VORBEREITUNG (Wird von app.py ignoriert, aber für Rückgabewerte wichtig)
-    critical_states = ["error", "cover_open", "low_paper", "stale"]
-    push = None
-
-    prev_sig = st.session_state.get("last_warn_signature")
-    prev_ts = st.session_state.get("last_warn_time")
-
-    current_sig = {
-        "status_mode": status_mode,
-        "raw_status": raw_status_l,
-        "media_remaining": media_remaining,
-    }
-
-    now_ts = time.time()
-    COOLDOWN_MINUTES = 30
-    cooldown_seconds = COOLDOWN_MINUTES * 60
-
-    if status_mode in critical_states:
-        sig_changed = prev_sig != current_sig
-        cooldown_over = prev_ts is None or (now_ts - prev_ts) > cooldown_seconds
-
-        if sig_changed or cooldown_over:
-            title_map = {
-                "error": "🔴 Fehler",
-                "cover_open": "⚠️ Deckel offen",
-                "low_paper": "⚠️ Papier fast leer",
-                "stale": "⚠️ Keine aktuellen Daten",
-            }
-            msg_map = {
-                "error": f"Status: {raw_status}",
-                "cover_open": "Der Druckerdeckel ist offen.",
-                "low_paper": f"Nur noch {media_remaining} Bilder!",
-                "stale": f"Seit {minutes_diff} Min kein Signal.",
-            }
-            if status_mode in title_map:
-                push = (title_map[status_mode], msg_map[status_mode], "warning")
-
-            st.session_state.last_warn_signature = current_sig
-            st.session_state.last_warn_time = now_ts
-    else:
-        if prev_sig is not None and prev_sig.get("status_mode") == "error":
-            push = ("✅ Störung behoben", "Drucker läuft wieder.", "white_check_mark")
-        
-        st.session_state.last_warn_signature = None
-        st.session_state.last_warn_time = None
-
-    st.session_state.last_warn_status = status_mode
-
-    return status_mode, display_text, display_color, push, minutes_diff
+    # Reine Auswertung (gemeinsam mit Monitor / Backfill) ...
+    result = derive_status(
+        raw_status, media_remaining, timestamp,
+        maintenance_active=maintenance_active, warning_threshold=warning_threshold,
+    )
+
+    # ... Push-Cooldown-Zustand lebt pro Session im session_state
+    prev = PushState(
+        st.session_state.get("last_warn_signature"),
+        st.session_state.get("last_warn_time"),
+    )
+    push, new_state = next_push(result, raw_status, media_remaining, prev, time.time())
+    st.session_state.last_warn_signature = new_state.signature
+    st.session_state.last_warn_time = new_state.sent_at
+    st.session_state.last_warn_status = result.status_mode
+
+    return result.status_mode, result.display_text, result.display_color, push, result.minutes_diff
 
 
 def maybe_play_sound(status_mode: str, sound_enabled: bool):
@@ -0,0 +1,304 @@
+# status_rules.py
+# Gemeinsame Status-Klassifizierung für App, Fleet-Übersicht und Monitor-Daemon.
+# Bewusst ohne Streamlit-Abhängigkeit, damit monitor.py sie direkt nutzen kann.
+import datetime
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# Lokale Zeitzone für Heartbeat
+LOCAL_TZ = pytz.timezone("Europe/Vienna")
+
+# nach X Minuten ohne Daten -> stale
+HEARTBEAT_WARN_MINUTES = 60
+
+# Gleiche Warnung frühestens nach X Minuten erneut pushen
+PUSH_COOLDOWN_MINUTES = 30
+
+# Reihenfolge = Priorität (erste Kategorie gewinnt, wenn mehrere Keywords passen)
+STATUS_KEYWORDS = [
+    ("error", [
+        r"paper end", r"ribbon end", r"paper jam", r"ribbon error",
+        r"paper definition error", r"data error",
+        r"\berror\b", r"\bjam\b", r"fehlt", r"störung",
+    ]),
+    ("cover_open", [r"cover open"]),
+    ("cooldown", [r"head cooling down"]),
+    ("printing", [r"printing", r"processing", r"drucken"]),
+    ("idle", [r"idle", r"standby mode"]),
+]
+
+_RANK = {name: i for i, (name, _) in enumerate(STATUS_KEYWORDS)}
+
+# Eine einzige Regex-Alternation mit benannten Gruppen pro Kategorie
+_STATUS_RE = re.compile(
+    "|".join(f"(?P<{name}>{'|'.join(patterns)})" for name, patterns in STATUS_KEYWORDS)
+)
+
+# Zustände, die eine Warnung / einen Push auslösen
+CRITICAL_STATES = ["error", "cover_open", "low_paper", "stale"]
+
+
+@lru_cache(maxsize=4096)
+def classify_raw(raw_status: str) -> str:
+    """
+    Ordnet einen Roh-Status des Druckers einer Kategorie zu:
+    error / cover_open / cooldown / printing / idle / unknown.
+    Leerer Status zählt als idle.
+    """
+    s = (raw_status or "").lower().strip()
+    if not s:
+        return "idle"
+
+    best = None
+    for m in _STATUS_RE.finditer(s):
+        rank = _RANK[m.lastgroup]
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
+    return STATUS_KEYWORDS[best][0] if best is not None else "unknown"
+
+
+def classify_status(raw_status: str, media_remaining: float, warning_threshold: int = 20) -> str:
+    """
+    Basis-Status (ohne Heartbeat) aus Roh-Status + Papierstand:
+    offline / error / cover_open / cooldown / low_paper / printing / ready.
+    """
+    if media_remaining < 0:
+        return "offline"
+    raw_state = classify_raw(raw_status)
+    if raw_state in ("error", "cover_open", "cooldown"):
+        return raw_state
+    if media_remaining <= warning_threshold:
+        return "low_paper"
+    if raw_state == "printing":
+        return "printing"
+    return "ready"
+
+
+def classify_series(raw_status: pd.Series) -> np.ndarray:
+    """
+    Vektorisiert classify_raw über eine ganze Spalte:
+    jeder unterschiedliche Text wird nur einmal klassifiziert.
+    """
+    codes, uniques = pd.factorize(raw_status.fillna("").astype(str))
+    labels = np.array([classify_raw(u) for u in uniques] + ["idle"], dtype=object)
+    # factorize liefert -1 für fehlende Werte -> letzter Eintrag ("idle")
+    return labels[codes]
+
+
+def classify_status_series(
+    raw_status: pd.Series,
+    media_remaining: pd.Series,
+    warning_threshold: int = 20,
+) -> np.ndarray:
+    """
+    Vektorisierte Variante von classify_status für ein komplettes Log.
+    media_remaining muss bereits mit dem media_factor multipliziert sein.
+    """
+    raw_state = classify_series(raw_status)
+    media = pd.to_numeric(media_remaining, errors="coerce").fillna(0).to_numpy()
+    conditions = [
+        media < 0,
+        raw_state == "error",
+        raw_state == "cover_open",
+        raw_state == "cooldown",
+        media <= warning_threshold,
+        raw_state == "printing",
+    ]
+    choices = ["offline", "error", "cover_open", "cooldown", "low_paper", "printing"]
+    return np.select(conditions, choices, default="ready")
+
+
+# -----------------------------------------------------------------------------
+# REINE STATUS-AUSWERTUNG (ohne session_state, für UI, Daemon und Backfill)
+# -----------------------------------------------------------------------------
+class StatusResult(NamedTuple):
+    status_mode: str
+    display_text: str
+    display_color: str
+    minutes_diff: Optional[int]
+
+
+class PushState(NamedTuple):
+    """Letzte gesendete Warnung (Signatur + Zeitpunkt) – vorher in st.session_state."""
+    signature: Optional[dict] = None
+    sent_at: Optional[float] = None
+
+
+class PushPolicy(NamedTuple):
+    """
+    Wann gepusht wird. Standard = Verhalten der App; der Monitor-Daemon warnt
+    zusätzlich bei "offline" und meldet die Erholung aus mehr Zuständen.
+    """
+    alert_states: tuple = tuple(CRITICAL_STATES)
+    recover_from: tuple = ("error",)
+    # True: Signatur nur aus dem Status – kein neuer Push bei jedem Druck in "low_paper"
+    status_only: bool = False
+    cooldown_minutes: float = PUSH_COOLDOWN_MINUTES
+
+
+DAEMON_PUSH_POLICY = PushPolicy(
+    alert_states=("error", "cover_open", "low_paper", "offline", "stale"),
+    recover_from=("error", "offline", "stale"),
+    status_only=True,
+)
+
+_PUSH_TITLES = {
+    "error": "🔴 Fehler",
+    "cover_open": "⚠️ Deckel offen",
+    "low_paper": "⚠️ Papier fast leer",
+    "offline": "🔌 Drucker offline",
+    "stale": "⚠️ Keine aktuellen Daten",
+}
+_PUSH_TAGS = {
+    "error": "rotating_light",
+    "offline": "electric_plug",
+    "stale": "hourglass",
+}
+
+
+def _display_for(status_mode: str, raw_status: str, warning_threshold: int):
+    if status_mode == "offline":
+        return "🔌 Drucker offline (-1)", "slate"
+    if status_mode == "error":
+        return f"🔴 STÖRUNG: {raw_status}", "red"
+    if status_mode == "cover_open":
+        return "⚠️ Deckel offen!", "orange"
+    if status_mode == "cooldown":
+        return "⏳ Druckkopf kühlt ab…", "orange"
+    if status_mode == "low_paper":
+        return f"⚠️ Papier fast leer (<{warning_threshold})!", "orange"
+    if status_mode == "printing":
+        return "🖨️ Druckt gerade…", "blue"
+    if status_mode == "maintenance":
+        return "Box im Lager / Wartung", "slate"
+    if status_mode == "stale":
+        return "⚠️ Keine aktuellen Daten", "orange"
+    if classify_raw(raw_status) == "idle":
+        return "✅ Bereit", "green"
+    return f"✅ Bereit ({raw_status})", "green"
+
+
+def heartbeat_minutes(timestamp, now: Optional[datetime.datetime] = None) -> Optional[int]:
+    """
+    Minuten seit dem Timestamp (lokale Zeit), None wenn nicht lesbar.
+    """
+    ts_parsed = pd.to_datetime(timestamp, errors="coerce")
+    if pd.isna(ts_parsed):
+        return None
+    if ts_parsed.tzinfo is None:
+        ts_parsed = LOCAL_TZ.localize(ts_parsed)
+    else:
+        ts_parsed = ts_parsed.astimezone(LOCAL_TZ)
+    now_local = now or datetime.datetime.now(LOCAL_TZ)
+    return int((now_local - ts_parsed).total_seconds() // 60)
+
+
+def derive_status(
+    raw_status: str,
+    media_remaining: float,
+    timestamp,
+    maintenance_active: bool = False,
+    warning_threshold: int = 20,
+    now: Optional[datetime.datetime] = None,
+) -> StatusResult:
+    """
+    Leitet aus Roh-Status, Papierstand und Heartbeat den Status ab.
+    Rein funktional: gleiche Eingaben (inkl. now) -> gleiches Ergebnis.
+    """
+    status_mode = classify_status(raw_status, media_remaining, warning_threshold)
+    minutes_diff = heartbeat_minutes(timestamp, now)
+
+    # Wenn zu lange keine Daten und KEIN Fehler vorliegt
+    if minutes_diff is not None and minutes_diff >= HEARTBEAT_WARN_MINUTES and status_mode != "error":
+        status_mode = "maintenance" if maintenance_active else "stale"
+
+    display_text, display_color = _display_for(status_mode, raw_status, warning_threshold)
+    return StatusResult(status_mode, display_text, display_color, minutes_diff)
+
+
+def next_push(
+    result: StatusResult,
+    raw_status: str,
+    media_remaining: float,
+    prev: PushState,
+    now_ts: float,
+    policy: PushPolicy = PushPolicy(),
+):
+    """
+    Entscheidet über einen Push und liefert (push, neuer PushState).
+    push ist None oder (Titel, Text, Tag).
+    """
+    status_mode = result.status_mode
+    if status_mode not in policy.alert_states:
+        push = None
+        if prev.signature is not None and prev.signature.get("status_mode") in policy.recover_from:
+            push = ("✅ Störung behoben", "Drucker läuft wieder.", "white_check_mark")
+        return push, PushState()
+
+    current_sig = {"status_mode": status_mode}
+    if not policy.status_only:
+        current_sig["raw_status"] = (raw_status or "").lower().strip()
+        current_sig["media_remaining"] = media_remaining
+    sig_changed = prev.signature != current_sig
+    cooldown_over = prev.sent_at is None or (now_ts - prev.sent_at) > policy.cooldown_minutes * 60
+    if not (sig_changed or cooldown_over):
+        return None, prev
+
+    msg_map = {
+        "error": f"Status: {raw_status}",
+        "cover_open": "Der Druckerdeckel ist offen.",
+        "low_paper": f"Nur noch {media_remaining} Bilder!",
+        "offline": f"Drucker nicht verbunden (Status: {media_remaining})",
+        "stale": f"Seit {result.minutes_diff} Min kein Signal.",
+    }
+    push = (_PUSH_TITLES[status_mode], msg_map[status_mode], _PUSH_TAGS.get(status_mode, "warning"))
+    return push, PushState(current_sig, now_ts)
+
+
+def evaluate_log(
+    df: pd.DataFrame,
+    media_factor: float = 1,
+    warning_threshold: int = 20,
+    maintenance_active: bool = False,
+    now: Optional[datetime.datetime] = None,
+) -> pd.DataFrame:
+    """
+    Vektorisierte Statusauswertung über ein komplettes Log (Backfill / Timeline).
+    Pro Zeile: der Status, den die UI bis zum Eintreffen der nächsten Zeile
+    angezeigt hätte. Heartbeat = Abstand zur nächsten Zeile (letzte Zeile: bis now).
+    """
+    cols = ["Timestamp", "MediaRemaining", "status_mode", "minutes_to_next"]
+    if df.empty or "Timestamp" not in df.columns or "MediaRemaining" not in df.columns:
+        return pd.DataFrame(columns=cols)
+
+    ts = pd.to_datetime(df["Timestamp"], errors="coerce")
+    if ts.dt.tz is None:
+        ts = ts.dt.tz_localize(LOCAL_TZ, ambiguous="NaT", nonexistent="NaT")
+    else:
+        ts = ts.dt.tz_convert(LOCAL_TZ)
+
+    media = pd.to_numeric(df["MediaRemaining"], errors="coerce").fillna(0) * media_factor
+    raw = df["Status"] if "Status" in df.columns else pd.Series("", index=df.index)
+    modes = classify_status_series(raw, media, warning_threshold)
+
+    now_local = pd.Timestamp(now or datetime.datetime.now(LOCAL_TZ)).tz_convert(LOCAL_TZ)
+    next_ts = ts.shift(-1)
+    next_ts.iloc[-1] = now_local
+    gap_min = ((next_ts - ts).dt.total_seconds() // 60).to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        stale = (gap_min >= HEARTBEAT_WARN_MINUTES) & (modes != "error")
+    modes = np.where(stale, "maintenance" if maintenance_active else "stale", modes)
+
+    return pd.DataFrame(
+        {"Timestamp": ts.to_numpy(), "MediaRemaining": media.to_numpy(),
+         "status_mode": modes, "minutes_to_next": gap_min},
+        columns=cols,
+    )
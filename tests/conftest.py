@@ -0,0 +1,18 @@
+# tests/conftest.py
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def make_log():
+    """
+    Log-DataFrame wie aus dem Sheet: eine Zeile pro Minute ab 20:00.
+    """
+    def _make(media, status="Idle", start="2025-06-14 20:00"):
+        ts = pd.date_range(start, periods=len(media), freq="min")
+        return pd.DataFrame({
+            "Timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+            "MediaRemaining": media,
+            "Status": status,
+        })
+    return _make
@@ -0,0 +1,40 @@
+# tests/test_downsample.py
+import numpy as np
+
+from downsample import downsample_m4
+
+
+def test_short_series_is_kept_completely():
+    x = np.arange(10)
+    assert downsample_m4(x, x * 2.0, n_buckets=5).tolist() == list(range(10))
+    assert downsample_m4(x, x * 2.0, n_buckets=0).tolist() == list(range(10))
+
+
+def test_keeps_first_last_min_max_per_bucket():
+    rng = np.random.default_rng(1)
+    x = np.arange(10_000)
+    y = rng.normal(size=len(x)).cumsum()
+    keep = downsample_m4(x, y, n_buckets=100)
+
+    assert len(keep) <= 4 * 100
+    assert np.all(np.diff(keep) > 0)  # sortiert, ohne Duplikate
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.argmin(y) in keep and np.argmax(y) in keep
+
+
+def test_step_in_paper_level_survives():
+    # Papierstand mit einer einzelnen Stufe mitten in einem Bucket
+    x = np.arange(1_000)
+    y = np.where(x < 503, 400.0, 399.0)
+    keep = downsample_m4(x, y, n_buckets=10)
+    # Erster Punkt nach der Stufe (Minimum seines Buckets) bleibt erhalten
+    assert 503 in keep
+    assert y[keep].min() == 399.0 and y[keep].max() == 400.0
+
+
+def test_uneven_timestamps():
+    x = np.r_[np.arange(500), np.arange(500) + 10_000]
+    y = np.sin(x / 50.0)
+    keep = downsample_m4(x, y, n_buckets=20)
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.isclose(y[keep].min(), y.min()) and np.isclose(y[keep].max(), y.max())
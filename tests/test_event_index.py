@@ -0,0 +1,24 @@
+# tests/test_event_index.py
+from event_index import build_event_index
+
+
+def test_offline_sample_inside_event_is_ignored(make_log):
+    index = build_event_index(make_log([300, 299, 298, -1, 297, 296, 295, 294]))
+    assert len(index) == 1
+    event = index.current()
+    assert event["reason"] == "start"
+    assert event["prints"] == 6
+
+
+def test_single_spike_is_not_a_roll_change(make_log):
+    index = build_event_index(make_log([400, 399, 0, 399, 398, 397]))
+    assert len(index) == 1
+    assert index.current()["prints"] == 3
+
+
+def test_roll_change_starts_new_event(make_log):
+    index = build_event_index(make_log([10, 9, 8, 400, 399]))
+    assert len(index) == 2
+    assert index.stats(0)["prints"] == 2
+    assert index.stats(1)["reason"] == "roll_change"
+    assert index.stats(1)["prints"] == 1
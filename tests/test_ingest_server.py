@@ -0,0 +1,26 @@
+# tests/test_ingest_server.py
+import pytest
+
+from ingest_server import normalize_row
+
+
+def test_normalize_row_keeps_log_columns():
+    row = normalize_row({"Timestamp": "2025-06-14 21:03:11", "MediaRemaining": "312.0", "Status": "Printing", "x": 1})
+    assert row == {"Timestamp": "2025-06-14 21:03:11", "MediaRemaining": 312, "Status": "Printing"}
+
+
+def test_normalize_row_fills_missing_timestamp():
+    row = normalize_row({"MediaRemaining": 5})
+    assert row["Timestamp"]
+    assert row["Status"] == ""
+
+
+@pytest.mark.parametrize("media", [None, "", "abc", "inf", "-Infinity", "nan", float("inf"), float("nan"), [1]])
+def test_normalize_row_rejects_invalid_media(media):
+    with pytest.raises(ValueError):
+        normalize_row({"MediaRemaining": media})
+
+
+def test_normalize_row_rejects_non_objects():
+    with pytest.raises(ValueError):
+        normalize_row([1, 2, 3])
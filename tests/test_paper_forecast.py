@@ -0,0 +1,82 @@
+# tests/test_paper_forecast.py
+import pytest
+
+from paper_forecast import (
+    MIN_EVENTS,
+    RUNOUT_CLEAR_MINUTES,
+    RUNOUT_WARN_MINUTES,
+    RunoutForecast,
+    RunoutForecaster,
+    runout_alert,
+)
+
+
+def _fc(minutes_left: float, idle: bool = False) -> RunoutForecast:
+    return RunoutForecast(60.0, minutes_left, minutes_left * 0.8, minutes_left * 1.2, idle)
+
+
+def _feed_steady(fc: RunoutForecaster, n: int, start_media: float = 400, start_ts: float = 0.0, gap_s: float = 60.0):
+    for i in range(n):
+        fc.feed(start_ts + i * gap_s, start_media - i)
+    return start_ts + (n - 1) * gap_s
+
+
+def test_forecast_needs_enough_prints():
+    fc = RunoutForecaster()
+    _feed_steady(fc, MIN_EVENTS)
+    assert fc.forecast(100) is None
+    _feed_steady(fc, MIN_EVENTS + 3, start_media=400 - MIN_EVENTS, start_ts=MIN_EVENTS * 60.0)
+    assert fc.forecast(100) is not None
+
+
+def test_steady_rate_gives_tight_forecast():
+    fc = RunoutForecaster()
+    _feed_steady(fc, 30)
+    result = fc.forecast(60)
+    assert result.prints_per_hour == pytest.approx(60, rel=0.01)
+    assert result.minutes_left == pytest.approx(60, rel=0.01)
+    assert result.minutes_low <= result.minutes_left <= result.minutes_high
+
+
+def test_idle_gap_does_not_lower_the_rate():
+    fc = RunoutForecaster()
+    last = _feed_steady(fc, 20)
+    # Zwei Stunden Pause, dann weiter im gleichen Tempo
+    _feed_steady(fc, 10, start_media=380, start_ts=last + 2 * 3600)
+    assert fc.forecast(60).prints_per_hour == pytest.approx(60, rel=0.05)
+
+
+def test_single_spike_is_ignored():
+    fc = RunoutForecaster()
+    last = _feed_steady(fc, 20)
+    fc.feed(last + 60, 0)        # Ausreißer
+    _feed_steady(fc, 10, start_media=380, start_ts=last + 120)
+    assert fc.forecast(60).prints_per_hour == pytest.approx(60, rel=0.05)
+
+
+def test_media_factor_scales_prints():
+    fc = RunoutForecaster(media_factor=0.5)
+    _feed_steady(fc, 30)
+    assert fc.forecast(60).prints_per_hour == pytest.approx(30, rel=0.01)
+
+
+def test_runout_alert_hysteresis():
+    warn, clear = RUNOUT_WARN_MINUTES, RUNOUT_CLEAR_MINUTES
+    low = runout_alert(_fc(warn - 1), 50, was_low=False)
+    assert low
+    # Zwischen Warn- und Aufhebeschwelle bleibt der Alarm an (kein Flattern)
+    assert runout_alert(_fc((warn + clear) / 2), 49, was_low=low, prev_media=50)
+    # ... und geht erst oberhalb der Aufhebeschwelle aus
+    assert not runout_alert(_fc(clear + 1), 49, was_low=low, prev_media=50)
+    # Ohne vorherigen Alarm löst der Bereich dazwischen nichts aus
+    assert not runout_alert(_fc((warn + clear) / 2), 49, was_low=False)
+
+
+def test_runout_alert_pause_and_refill():
+    # Pause: neuer Alarm nicht, bestehender bleibt
+    assert not runout_alert(_fc(5, idle=True), 10, was_low=False)
+    assert runout_alert(_fc(5, idle=True), 10, was_low=True, prev_media=10)
+    # Keine Prognose: Zustand bleibt
+    assert runout_alert(None, 10, was_low=True, prev_media=10)
+    # Neue Rolle (Papierstand steigt) hebt den Alarm auf
+    assert not runout_alert(None, 400, was_low=True, prev_media=10)
@@ -0,0 +1,69 @@
+# tests/test_print_events.py
+import numpy as np
+import pytest
+
+from print_events import IncrementalFeed, PrintRollup, extract_print_events
+
+
+def _batch_total(media) -> float:
+    ts = np.arange(len(media), dtype="int64") * 60 * 10**9
+    return float(extract_print_events(ts, np.asarray(media, dtype="float64"))[1].sum())
+
+
+@pytest.mark.parametrize("media", [
+    [400, 399, 0, 399, 398, 397],
+    [300, 299, 298, -1, 297, 296, 295, 294],
+    [10, 9, 8, 400, 399, 0, 399],
+    [5, 4, 30, 4, 3],
+])
+def test_incremental_matches_batch(media, make_log):
+    df = make_log(media)
+    batch = PrintRollup()
+    batch.update(df)
+
+    incremental = PrintRollup()
+    for n in range(1, len(df) + 1):
+        incremental.update(df.iloc[:n])
+
+    assert batch.total == pytest.approx(_batch_total(media))
+    assert incremental.total == pytest.approx(batch.total)
+    assert incremental.hourly().sum() == pytest.approx(batch.hourly().sum())
+
+
+def test_spike_in_single_rows_is_not_counted(make_log):
+    df = make_log([400, 399, 0, 399, 398, 397])
+    rollup = PrintRollup()
+    for n in range(1, len(df) + 1):
+        rollup.update(df.iloc[:n])
+    assert rollup.total == pytest.approx(3)
+
+
+def test_incremental_feed_returns_only_new_rows(make_log):
+    df = make_log([10, 9, 8, 7])
+    feed = IncrementalFeed()
+    reset, ts, media = feed.take(df.iloc[:2])
+    assert not reset
+    assert media.tolist() == [10, 9]
+
+    reset, ts, media = feed.take(df)
+    assert not reset
+    assert media.tolist() == [8, 7]
+    assert len(feed.take(df)[1]) == 0
+
+
+def test_incremental_feed_resets_on_shorter_or_new_log(make_log):
+    feed = IncrementalFeed()
+    feed.take(make_log([10, 9, 8]))
+    reset, _, media = feed.take(make_log([10, 9]))
+    assert reset and media.tolist() == [10, 9]
+
+    reset, _, media = feed.take(make_log([5, 4], start="2025-06-15 10:00"))
+    assert reset and media.tolist() == [5, 4]
+    assert feed.take(make_log([]))[0]
+
+
+def test_rollup_starts_over_after_log_reset(make_log):
+    rollup = PrintRollup()
+    rollup.update(make_log([400, 390, 380]))
+    rollup.update(make_log([200, 199]))
+    assert rollup.total == pytest.approx(1)
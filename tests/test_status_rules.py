@@ -0,0 +1,100 @@
+# tests/test_status_rules.py
+import datetime
+
+import pytest
+
+from status_rules import (
+    DAEMON_PUSH_POLICY,
+    HEARTBEAT_WARN_MINUTES,
+    LOCAL_TZ,
+    PUSH_COOLDOWN_MINUTES,
+    PushState,
+    StatusResult,
+    classify_status,
+    derive_status,
+    evaluate_log,
+    next_push,
+)
+
+NOW = LOCAL_TZ.localize(datetime.datetime(2025, 6, 14, 21, 0))
+
+
+def _ts(minutes_ago: int) -> str:
+    return (NOW - datetime.timedelta(minutes=minutes_ago)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _result(mode: str) -> StatusResult:
+    return StatusResult(mode, "", "", 0)
+
+
+@pytest.mark.parametrize("raw, media, expected", [
+    ("Idle", -1, "offline"),
+    ("Paper End", 100, "error"),
+    ("Cover Open", 100, "cover_open"),
+    ("Head Cooling Down", 100, "cooldown"),
+    ("Idle", 20, "low_paper"),
+    ("Printing", 100, "printing"),
+    ("Idle", 100, "ready"),
+    ("Ribbon Error while printing", 100, "error"),
+])
+def test_classify_status(raw, media, expected):
+    assert classify_status(raw, media, warning_threshold=20) == expected
+
+
+def test_derive_status_marks_missing_heartbeat_as_stale():
+    fresh = derive_status("Idle", 100, _ts(5), now=NOW)
+    assert fresh.status_mode == "ready"
+    assert fresh.minutes_diff == 5
+
+    old = derive_status("Idle", 100, _ts(HEARTBEAT_WARN_MINUTES), now=NOW)
+    assert old.status_mode == "stale"
+    assert derive_status("Idle", 100, _ts(90), maintenance_active=True, now=NOW).status_mode == "maintenance"
+    # Eine Störung bleibt eine Störung, auch ohne frische Daten
+    assert derive_status("Paper Jam", 100, _ts(90), now=NOW).status_mode == "error"
+
+
+def test_derive_status_is_pure():
+    args = ("Printing", 50, _ts(3))
+    assert derive_status(*args, now=NOW) == derive_status(*args, now=NOW)
+
+
+def test_next_push_cooldown_and_signature():
+    push, state = next_push(_result("low_paper"), "idle", 10, PushState(), 0)
+    assert push is not None
+    # Gleiche Lage innerhalb des Cooldowns -> kein Push
+    assert next_push(_result("low_paper"), "idle", 10, state, 60)[0] is None
+    # App-Standard: neuer Papierstand = neue Signatur -> Push
+    assert next_push(_result("low_paper"), "idle", 9, state, 60)[0] is not None
+    # Nach dem Cooldown erneut
+    assert next_push(_result("low_paper"), "idle", 10, state, PUSH_COOLDOWN_MINUTES * 60 + 1)[0] is not None
+
+
+def test_next_push_recovery_after_error():
+    _, state = next_push(_result("error"), "paper jam", 100, PushState(), 0)
+    push, state = next_push(_result("ready"), "idle", 100, state, 10)
+    assert push[2] == "white_check_mark"
+    assert state == PushState()
+    # Keine Entwarnung ohne vorherige Störung
+    assert next_push(_result("ready"), "idle", 100, state, 20)[0] is None
+
+
+def test_daemon_policy_ignores_media_changes_and_alerts_offline():
+    policy = DAEMON_PUSH_POLICY
+    push, state = next_push(_result("low_paper"), "idle", 10, PushState(), 0, policy=policy)
+    assert push is not None
+    assert next_push(_result("low_paper"), "idle", 9, state, 60, policy=policy)[0] is None
+
+    push, state = next_push(_result("offline"), "idle", -1, PushState(), 0, policy=policy)
+    assert push[2] == "electric_plug"
+    assert next_push(_result("ready"), "idle", 100, state, 10, policy=policy)[0] is not None
+    # App-Standard: offline löst keinen Push aus
+    assert next_push(_result("offline"), "idle", -1, PushState(), 0)[0] is None
+
+
+def test_evaluate_log_matches_derive_status(make_log):
+    df = make_log([100, 99, 30, 15, -1], status=["Idle", "Printing", "Idle", "Idle", "Idle"])
+    out = evaluate_log(df, warning_threshold=20, now=LOCAL_TZ.localize(datetime.datetime(2025, 6, 14, 20, 5)))
+    assert out["status_mode"].tolist() == ["ready", "printing", "ready", "low_paper", "offline"]
+    # Lücke von über einer Stunde nach der letzten Zeile -> stale
+    late = evaluate_log(df, now=LOCAL_TZ.localize(datetime.datetime(2025, 6, 14, 22, 0)))
+    assert late["status_mode"].iloc[-1] == "stale"
@@ -1,8 +1,9 @@
 # ui_components.py
 
+import time
 import streamlit as st
 import textwrap
-from sheets_helpers import get_data_event, get_spreadsheet, get_fleet_data_parallel
+from sheets_helpers import get_data_event, get_spreadsheet, get_fleet_service
 
 # -----------------------------------------------------------------------------
 # GLOBAL STYLING (Sidebar + Dashboard + Animationen)
@@ -346,80 +347,133 @@ def render_hero_card(
     st.markdown(html_content, unsafe_allow_html=True)
 
 
+FLEET_GRID_COLUMNS = 3
+FLEET_PAGE_SIZE = 12
+
+FLEET_STATE_LABELS = {
+    "error": "Störung",
+    "printing": "Druckt",
+    "ready": "Bereit",
+    "cover_open": "Deckel offen",
+    "cooldown": "Kühlt ab",
+    "low_paper": "Wenig Papier",
+    "offline": "Drucker offline",
+    "unknown": "Kein Status",  # noch nicht geladen / Sheet nicht lesbar – NICHT offline
+}
+
+
 def render_fleet_overview(PRINTERS: dict):
     st.markdown("### 📸 Alle Fotoboxen")
     printers_secrets = st.secrets.get("printers", {})
-    fleet_data = get_fleet_data_parallel(PRINTERS, printers_secrets)
-
-    cols = st.columns(len(PRINTERS))
-    idx = 0
-    for name, cfg in PRINTERS.items():
-        data = fleet_data.get(name)
-        
-        last_ts = "N/A"
-        status_color = "#64748B" 
-        status_bg = "#F1F5F9"
-        status_msg = "Offline / ??"
-        media_str = "–"
-
-        if data:
-            media_str = data.get("media_str", "?")
-            last_ts = data.get("timestamp", "N/A")
-            state = data.get("state", "unknown")
-            
-            if state == "error":
-                status_color = "#EF4444" 
-                status_bg = "#FEF2F2"
-                status_msg = "Störung"
-            elif state == "printing":
-                status_color = "#3B82F6"
-                status_bg = "#EFF6FF"
-                status_msg = "Druckt"
-            elif state == "ready":
-                status_color = "#10B981"
-                status_bg = "#ECFDF5"
-                status_msg = "Bereit"
-
-        with cols[idx]:
-            card_html = textwrap.dedent(f"""
-                <div style="
-                    background: white;
-                    border: 1px solid #E2E8F0;
-                    border-radius: 20px;
-                    padding: 24px;
-                    text-align: center;
-                    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
-                    height: 200px;
-                    display: flex;
-                    flex-direction: column;
-                    justify-content: center;
-                    align-items: center;
-                ">
-                    <div style="font-weight: 700; color: #0F172A; margin-bottom: 12px; font-size: 1.1rem;">{name}</div>
-                    <div style="
-                        display: inline-block;
-                        background: {status_bg};
-                        color: {status_color};
-                        padding: 6px 16px;
-                        border-radius: 99px;
-                        font-size: 0.8rem;
-                        font-weight: 600;
-                        margin-bottom: 16px;
-                        letter-spacing: 0.05em;
-                        text-transform: uppercase;
-                    ">
-                        {status_msg}
-                    </div>
-                    <div style="font-size: 1.1rem; color: #334155; margin-bottom: 6px; font-weight: 600;">
-                        {media_str}
-                    </div>
-                    <div style="font-size: 0.75rem; color: #94A3B8;">
-                        Update: {last_ts}
-                    </div>
-                </div>
-            """)
-            st.markdown(card_html, unsafe_allow_html=True)
-            idx += 1
+    service = get_fleet_service()
+    service.configure(PRINTERS, printers_secrets)
+
+    names = list(PRINTERS.keys())
+    page_names = names
+    if len(names) > FLEET_PAGE_SIZE:
+        pages = (len(names) + FLEET_PAGE_SIZE - 1) // FLEET_PAGE_SIZE
+        page = st.number_input("Seite", min_value=1, max_value=pages, value=1, step=1)
+        page_names = names[(page - 1) * FLEET_PAGE_SIZE: page * FLEET_PAGE_SIZE]
+
+    render_fleet_grid(PRINTERS, page_names)
+
+
+@st.fragment(run_every=10)
+def render_fleet_grid(PRINTERS: dict, page_names: list):
+    service = get_fleet_service()
+    fleet_data, updated_at = service.snapshot()
+    if updated_at is None:
+        # Allererster Aufruf im Prozess: einmal synchron laden
+        service.refresh_now()
+        fleet_data, updated_at = service.snapshot()
+
+    # Kompakte Zusammenfassung über ALLE Boxen
+    counts = {}
+    for name in PRINTERS:
+        # Ohne Snapshot wissen wir nichts über den Drucker -> eigener Zustand statt "offline"
+        state = (fleet_data.get(name) or {}).get("state", "unknown")
+        counts[state] = counts.get(state, 0) + 1
+    summary = " · ".join(f"{v}× {FLEET_STATE_LABELS.get(k, k)}" for k, v in sorted(counts.items()))
+    st.caption(f"{summary} — Stand {time.strftime('%H:%M:%S', time.localtime(updated_at))}")
+
+    for row_start in range(0, len(page_names), FLEET_GRID_COLUMNS):
+        cols = st.columns(FLEET_GRID_COLUMNS)
+        for col, name in zip(cols, page_names[row_start:row_start + FLEET_GRID_COLUMNS]):
+            with col:
+                render_fleet_card(name, fleet_data.get(name), loading=name not in fleet_data)
+
+
+
+def render_fleet_card(name: str, data, loading: bool = False):
+    last_ts = "N/A"
+    status_color = "#64748B" 
+    status_bg = "#F1F5F9"
+    # Kein Snapshot: noch nicht abgefragt (loading) oder Sheet nicht lesbar
+    status_msg = "Wird geladen …" if loading else FLEET_STATE_LABELS["unknown"]
+    media_str = "–"
+
+    if data:
+        media_str = data.get("media_str", "?")
+        last_ts = data.get("timestamp", "N/A")
+        state = data.get("state", "unknown")
+
+        if state == "error":
+            status_color = "#EF4444" 
+            status_bg = "#FEF2F2"
+            status_msg = "Störung"
+        elif state == "printing":
+            status_color = "#3B82F6"
+            status_bg = "#EFF6FF"
+            status_msg = "Druckt"
+        elif state == "ready":
+            status_color = "#10B981"
+            status_bg = "#ECFDF5"
+            status_msg = "Bereit"
+        elif state in ("cover_open", "cooldown", "low_paper"):
+            status_color = "#F59E0B"
+            status_bg = "#FFFBEB"
+            status_msg = FLEET_STATE_LABELS[state]
+        elif state == "offline":
+            status_msg = "Drucker offline"
+
+    card_html = textwrap.dedent(f"""
+        <div style="
+            background: white;
+            border: 1px solid #E2E8F0;
+            border-radius: 20px;
+            padding: 24px;
+            text-align: center;
+            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
+            height: 200px;
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+            align-items: center;
+        ">
+            <div style="font-weight: 700; color: #0F172A; margin-bottom: 12px; font-size: 1.1rem;">{name}</div>
+            <div style="
+                display: inline-block;
+                background: {status_bg};
+                color: {status_color};
+                padding: 6px 16px;
+                border-radius: 99px;
+                font-size: 0.8rem;
+                font-weight: 600;
+                margin-bottom: 16px;
+                letter-spacing: 0.05em;
+                text-transform: uppercase;
+            ">
+                {status_msg}
+            </div>
+            <div style="font-size: 1.1rem; color: #334155; margin-bottom: 6px; font-weight: 600;">
+                {media_str}
+            </div>
+            <div style="font-size: 0.75rem; color: #94A3B8;">
+                Update: {last_ts}
+            </div>
+        </div>
+    """)
+    st.markdown(card_html, unsafe_allow_html=True)
 
 
 def render_link_card(url: str, title: str, subtitle: str, icon: str = "☁️"):
@@ -556,7 +610,7 @@ def inject_screensaver_css():
     st.markdown(css, unsafe_allow_html=True)
 
 
-def render_screensaver_content(status_mode, media_remaining, display_text, display_color, timestamp):
+def render_screensaver_content(status_mode, media_remaining, display_text, display_color, timestamp, runout_text=""):
     # (Unverändert lassen)
     color_map = {"green": "#10B981", "blue": "#3B82F6", "orange": "#F59E0B", "red": "#EF4444", "gray": "#64748B"}
     accent_color = color_map.get(display_color, "#64748B")
@@ -566,6 +620,7 @@ def render_screensaver_content(status_mode, media_remaining, display_text, displ
         <div class="label-text">Verbleibende Bilder</div>
         <div class="big-number" style="color: {accent_color}; text-shadow: 0 0 40px {accent_color}40;">{media_remaining}</div>
         <div class="status-pill" style="color: {accent_color};"><span class="status-dot" style="background-color: {accent_color}; box-shadow: 0 0 10px {accent_color};"></span>{clean_text}</div>
+        {f'<div class="runout-info">{runout_text}</div>' if runout_text else ''}
         <div class="meta-info">Zuletzt aktualisiert: {timestamp}</div>
     </div>
     """
@@ -573,7 +628,7 @@ def render_screensaver_content(status_mode, media_remaining, display_text, displ
 
 def inject_screensaver_css():
     # (Unverändert lassen)
-    css = """<style>.stApp {background-color: #000000 !important; color: #E2E8F0 !important;} section[data-testid="stSidebar"] {display: none !important;} header, footer {visibility: hidden !important;} .screensaver-container {display: flex; flex-direction: column; align-items: center; justify-content: center; height: 85vh; text-align: center; font-family: 'Inter', sans-serif;} .big-number {font-size: 15vw; font-weight: 800; line-height: 1; margin-bottom: 2vh; font-variant-numeric: tabular-nums;} .label-text {font-size: 2vh; text-transform: uppercase; letter-spacing: 0.3em; color: #64748B;} .status-pill {background-color: #111827; border: 1px solid #1F2937; padding: 1.5vh 4vw; border-radius: 99px; font-size: 3vh; font-weight: 600; display: flex; align-items: center; gap: 12px; margin-top: 4vh; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.5);} .status-dot {height: 2vh; width: 2vh; border-radius: 50%;} .meta-info {margin-top: 5vh; color: #374151; font-family: monospace; font-size: 1.5vh;} .stButton {position: fixed !important; bottom: 40px !important; left: 50% !important; transform: translateX(-50%) !important; width: auto !important; z-index: 99999;} .stButton > button {background-color: transparent !important; border: 1px solid rgba(255, 255, 255, 0.2) !important; color: rgba(255, 255, 255, 0.4) !important; border-radius: 50px !important; padding: 8px 30px !important; font-size: 0.75rem !important; text-transform: uppercase; letter-spacing: 0.15em; transition: all 0.3s ease !important;} .stButton > button:hover {border-color: #ffffff !important; color: #ffffff !important; background-color: rgba(255, 255, 255, 0.1) !important; box-shadow: 0 0 15px rgba(255, 255, 255, 0.2); transform: translateY(-2px);} .stButton > button:active, .stButton > button:focus {border-color: #ffffff !important; color: #ffffff !important; background-color: rgba(255, 255, 255, 0.2) !important;}</style>"""
+    css = """<style>.stApp {background-color: #000000 !important; color: #E2E8F0 !important;} section[data-testid="stSidebar"] {display: none !important;} header, footer {visibility: hidden !important;} .screensaver-container {display: flex; flex-direction: column; align-items: center; justify-content: center; height: 85vh; text-align: center; font-family: 'Inter', sans-serif;} .big-number {font-size: 15vw; font-weight: 800; line-height: 1; margin-bottom: 2vh; font-variant-numeric: tabular-nums;} .label-text {font-size: 2vh; text-transform: uppercase; letter-spacing: 0.3em; color: #64748B;} .status-pill {background-color: #111827; border: 1px solid #1F2937; padding: 1.5vh 4vw; border-radius: 99px; font-size: 3vh; font-weight: 600; display: flex; align-items: center; gap: 12px; margin-top: 4vh; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.5);} .status-dot {height: 2vh; width: 2vh; border-radius: 50%;} .runout-info {margin-top: 3vh; color: #94A3B8; font-size: 2.5vh; font-variant-numeric: tabular-nums;} .meta-info {margin-top: 5vh; color: #374151; font-family: monospace; font-size: 1.5vh;} .stButton {position: fixed !important; bottom: 40px !important; left: 50% !important; transform: translateX(-50%) !important; width: auto !important; z-index: 99999;} .stButton > button {background-color: transparent !important; border: 1px solid rgba(255, 255, 255, 0.2) !important; color: rgba(255, 255, 255, 0.4) !important; border-radius: 50px !important; padding: 8px 30px !important; font-size: 0.75rem !important; text-transform: uppercase; letter-spacing: 0.15em; transition: all 0.3s ease !important;} .stButton > button:hover {border-color: #ffffff !important; color: #ffffff !important; background-color: rgba(255, 255, 255, 0.1) !important; box-shadow: 0 0 15px rgba(255, 255, 255, 0.2); transform: translateY(-2px);} .stButton > button:active, .stButton > button:focus {border-color: #ffffff !important; color: #ffffff !important; background-color: rgba(255, 255, 255, 0.2) !important;}</style>"""
     st.markdown(css, unsafe_allow_html=True)
 
 